@@ -0,0 +1,44 @@
+"""
+Operations that act on many users at once. They are not scoped to one
+user_id like the other routes, so every request must carry the
+X-Admin-Token header matching ADMIN_API_TOKEN; with no token configured
+the routes are disabled.
+"""
+import os
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from database.database import SessionLocal
+from database import schemas
+import plan_batch
+
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin routes are disabled")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.post("/training-plans/batch", response_model=schemas.PlanBatchResponse)
+async def create_training_plans_batch(batch: schemas.PlanBatchRequest):
+    """
+    Generate the same plan request for up to 1000 users, e.g. a coach's
+    athletes, in one call. Each user gets their own result: 201 with the new
+    plan's id, 404 for unknown users or 400 if their plan failed, without
+    failing the rest.
+    """
+    if batch.request.end_date <= batch.request.start_date:
+        raise HTTPException(status_code=400, detail="end_date must be after start_date")
+    return await run_in_threadpool(_create_training_plans_batch, batch)
+
+def _create_training_plans_batch(batch: schemas.PlanBatchRequest):
+    # Waits on the worker processes, so it runs in a worker thread on its own sync session
+    db = SessionLocal()
+    try:
+        return plan_batch.create_training_plans(db, batch)
+    finally:
+        db.close()
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from database.database import get_db
-from database import schemas, crud
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from database.database import DbSession, SessionLocal, get_session
+from database import changes, schemas, crud
+from database.async_crud import run_crud
+from api.etag import make_etag, not_modified
+from api.idempotency import idempotent
+import calendar_sync
 from datetime import datetime
 
 router = APIRouter()
@@ -11,27 +17,58 @@ router = APIRouter()
 async def create_event(
     event: schemas.EventCreate,
     user_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, description="Retries with the same key return the first response"),
+    db: DbSession = Depends(get_session)
 ):
-    return crud.create_event(db=db, event=event, user_id=user_id)
+    async def create():
+        return schemas.Event.model_validate(await run_crud(db, crud.create_event, event=event, user_id=user_id))
+    
+    return await idempotent(request, db, user_id, idempotency_key, create, schemas.Event,
+                            status_code=status.HTTP_201_CREATED)
 
 
-@router.get("/events", response_model=List[schemas.Event])
-async def get_all_events(
+@router.post("/events/batch", response_model=schemas.EventBatchResponse)
+async def batch_events(
+    batch: schemas.EventBatchRequest,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_session)
 ):
-    events = crud.get_all_events(db)
-    return events
+    """
+    Create, update and delete up to 1000 events of each kind in one transaction.
+    Each item gets its own status; items for missing or other users' events
+    are skipped without failing the rest.
+    """
+    try:
+        return await run_crud(db, crud.apply_event_batch, user_id, batch)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Failed to apply event batch: {str(e)}")
+
+
+@router.get("/events", response_model=schemas.EventPage)
+async def get_user_events(
+    user_id: int,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: DbSession = Depends(get_session)
+):
+    """
+    A page of the user's stored events in start time order; pass next_cursor back
+    as cursor for the next page. Series occurrences are read by date range instead.
+    """
+    try:
+        return await run_crud(db, crud.get_user_events_page, user_id, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @router.get("/events/{event_id}", response_model=schemas.Event)
 async def get_event(
     event_id: int,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_session)
 ):
-    event = crud.get_event(db, event_id=event_id)
+    event = await run_crud(db, crud.get_event, event_id=event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     if event.user_id != user_id:
@@ -42,25 +79,34 @@ async def get_event(
 async def get_events_by_date(
     start_date: datetime,
     end_date: datetime,
-    db: Session = Depends(get_db)
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_session)
 ):
-    events = crud.get_events_by_date(db, start_date=start_date, end_date=end_date)
-    return events
+    version = await run_crud(db, crud.get_user_data_version, user_id)
+    unchanged = not_modified(request, response, make_etag("events", user_id, start_date, end_date, version))
+    if unchanged:
+        return unchanged
+    
+    # Already-encoded JSON; returned as is rather than re-validated through response_model
+    body = await run_crud(db, crud.get_user_events_by_date_json, user_id, start_date, end_date, version=version)
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
 
 @router.put("/events/{event_id}", response_model=schemas.Event)
 async def update_event(
     event_id: int,
     event_update: schemas.EventUpdate,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_session)
 ):
-    db_event = crud.get_event(db, event_id=event_id)
+    db_event = await run_crud(db, crud.get_event, event_id=event_id)
     if not db_event:
         raise HTTPException(status_code=404, detail="Event not found")
     if db_event.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this event")
     
-    updated_event = crud.update_event(db, event_id=event_id, event=event_update)
+    updated_event = await run_crud(db, crud.update_event, event_id=event_id, event=event_update)
     return updated_event
 
 
@@ -68,13 +114,140 @@ async def update_event(
 async def delete_event(
     event_id: int,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_session)
 ):
-    db_event = crud.get_event(db, event_id=event_id)
+    db_event = await run_crud(db, crud.get_event, event_id=event_id)
     if not db_event:
         raise HTTPException(status_code=404, detail="Event not found")
     if db_event.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this event")
     
-    crud.delete_event(db, event_id=event_id)
-    return None
\ No newline at end of file
+    await run_crud(db, crud.delete_event, event_id=event_id)
+    return None
+
+
+@router.post("/series", response_model=schemas.EventSeries, status_code=status.HTTP_201_CREATED)
+async def create_event_series(
+    series: schemas.EventSeriesCreate,
+    user_id: int,
+    db: DbSession = Depends(get_session)
+):
+    """
+    Create a recurring event from a template and an RRULE. Its occurrences
+    appear in date range reads with a null id and their series_id and
+    recurrence_id set; edit or cancel one through the occurrence routes below.
+    """
+    return await run_crud(db, crud.create_event_series, series, user_id)
+
+
+@router.delete("/series/{series_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_event_series(
+    series_id: int,
+    user_id: int,
+    db: DbSession = Depends(get_session)
+):
+    """Delete a series, every occurrence and the edited occurrences stored for it."""
+    await _get_user_series(db, series_id, user_id)
+    await run_crud(db, crud.delete_event_series, series_id)
+    return None
+
+
+@router.put("/series/{series_id}/occurrences/{recurrence_id}", response_model=List[schemas.Event])
+async def update_series_occurrence(
+    series_id: int,
+    recurrence_id: datetime,
+    event_update: schemas.EventUpdate,
+    user_id: int,
+    event_type: Optional[str] = Query(None, description="Which event of a plan session to update; defaults to the workout"),
+    db: DbSession = Depends(get_session)
+):
+    """
+    Edit one occurrence (identified by its original start) of a series. Its
+    events are stored as regular events from then on and are returned.
+    """
+    await _get_user_series(db, series_id, user_id)
+    try:
+        events = await run_crud(db, crud.update_series_occurrence, series_id, recurrence_id, event_update,
+                                event_type=event_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if events is None:
+        raise HTTPException(status_code=404, detail="Occurrence not found")
+    return events
+
+
+@router.delete("/series/{series_id}/occurrences/{recurrence_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_series_occurrence(
+    series_id: int,
+    recurrence_id: datetime,
+    user_id: int,
+    db: DbSession = Depends(get_session)
+):
+    await _get_user_series(db, series_id, user_id)
+    if not await run_crud(db, crud.delete_series_occurrence, series_id, recurrence_id):
+        raise HTTPException(status_code=404, detail="Occurrence not found")
+    return None
+
+async def _get_user_series(db: DbSession, series_id: int, user_id: int):
+    series = await run_crud(db, crud.get_event_series, series_id)
+    if not series:
+        raise HTTPException(status_code=404, detail="Event series not found")
+    if series.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this event series")
+    return series
+
+
+@router.get("/changes", response_class=StreamingResponse)
+async def stream_changes(user_id: int, request: Request):
+    """
+    Server-sent events for every committed change to the user's events.
+    Each `change` event carries a CalendarChange: apply `upserted` and
+    `deleted` to the events on screen, or refetch when `reset` is set.
+    Changes made while disconnected are not replayed, so refetch on reconnect.
+    """
+    async def stream():
+        async with changes.broker.subscribe(user_id) as subscription:
+            yield b"retry: 3000\n\n"
+            while not await request.is_disconnected():
+                message = await subscription.get(timeout=changes.CHANGE_KEEPALIVE_SECONDS)
+                if message is None:
+                    yield b": keepalive\n\n"
+                else:
+                    yield b"event: change\ndata: " + message + b"\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.post("/connections", response_model=schemas.CalendarConnection, status_code=status.HTTP_201_CREATED)
+async def create_calendar_connection(
+    connection: schemas.CalendarConnectionCreate,
+    user_id: int,
+    db: DbSession = Depends(get_session)
+):
+    """Connect an external calendar; its events are imported by POST /calendar/sync."""
+    if connection.provider not in calendar_sync.PROVIDERS:
+        raise HTTPException(status_code=400, detail=f"Unknown calendar provider {connection.provider!r}")
+    try:
+        return await run_crud(db, crud.create_calendar_connection, user_id, connection)
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="This calendar is already connected")
+
+
+@router.get("/connections", response_model=List[schemas.CalendarConnection])
+async def get_calendar_connections(user_id: int, db: DbSession = Depends(get_session)):
+    return await run_crud(db, crud.get_calendar_connections, user_id=user_id)
+
+
+@router.post("/sync", response_model=List[schemas.CalendarSyncResult])
+async def sync_calendars(user_id: int):
+    """Import what changed in the user's connected calendars since their last sync."""
+    return await run_in_threadpool(_sync_user_calendars, user_id)
+
+def _sync_user_calendars(user_id: int):
+    # Provider calls block, so the pass runs in a worker thread on its own sync session
+    db = SessionLocal()
+    try:
+        return calendar_sync.sync_calendars(db, user_id=user_id)
+    finally:
+        db.close()
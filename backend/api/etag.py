@@ -0,0 +1,23 @@
+import hashlib
+from fastapi import Request, Response
+
+# Conditional GET helpers: routes compute a cheap version of what they would
+# return, and skip loading and serializing rows when the client already has it.
+
+def make_etag(*version) -> str:
+    digest = hashlib.sha1(repr(version).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def not_modified(request: Request, response: Response, etag: str):
+    """
+    Return a 304 response if the request's If-None-Match already has `etag`,
+    otherwise tag `response` with it and return None.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in candidates or etag.removeprefix("W/") in candidates:
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
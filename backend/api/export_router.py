@@ -0,0 +1,31 @@
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from database.database import SessionLocal
+from database import schemas, crud
+
+router = APIRouter()
+
+@router.get("/events")
+async def export_user_events(user_id: int):
+    """
+    Stream a user's full event history as NDJSON, one schemas.Event per line,
+    then one schemas.EventSeriesExport (told apart by its rrule) per
+    recurring series, with its exceptions. Occurrences are not expanded, as a
+    series may never end; edited occurrences are among the events.
+
+    Rows are read from a server-side cursor and serialized a batch at a time,
+    so memory use does not grow with the size of the history.
+    """
+    return StreamingResponse(_ndjson_events(user_id), media_type="application/x-ndjson")
+
+def _ndjson_events(user_id: int):
+    # The stream outlives the request's dependencies, so it owns its session
+    db = SessionLocal()
+    try:
+        for rows in crud.iter_user_event_batches(db, user_id):
+            yield "".join(schemas.Event.model_validate(row).model_dump_json() + "\n" for row in rows)
+        series_list = crud.get_user_event_series(db, user_id)
+        if series_list:
+            yield "".join(series.model_dump_json() + "\n" for series in series_list)
+    finally:
+        db.close()
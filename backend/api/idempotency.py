@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import os
+import secrets
+from typing import Any, Awaitable, Callable, Optional
+from fastapi import HTTPException, Request, Response
+from pydantic import TypeAdapter
+from database import crud
+from database.async_crud import run_crud
+
+# Idempotency-Key support for POST routes: the first request with a key runs
+# and its response is stored; retries with the same key get that response
+# back without running again, and duplicates that arrive while the first is
+# still running wait for it.
+
+# How long a finished request's response is kept
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+# How long a duplicate waits for the original request before giving up with 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+# How long an unfinished claim holds the key: longer than any request can run,
+# since a retry after it lapses runs the work again; it only matters when the
+# original request died without releasing the key
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "900"))
+_POLL_SECONDS = 0.1
+_MAX_KEY_LENGTH = 255
+
+async def _fingerprint(request: Request, user_id: int) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{user_id}\n{request.method} {request.url.path}\n".encode())
+    digest.update(str(sorted(request.query_params.multi_items())).encode())
+    digest.update(await request.body())
+    return digest.hexdigest()
+
+def _replay(record) -> Response:
+    return Response(content=record.response_body, status_code=record.status_code,
+                    media_type="application/json", headers={"Idempotent-Replayed": "true"})
+
+async def idempotent(request: Request, db, user_id: int, key: Optional[str],
+                     work: Callable[[], Awaitable[Any]], response_model: Any, status_code: int = 200):
+    """
+    Run `work` at most once per (user, route, key) and return its response.
+
+    Without a key `work` simply runs. Whatever it returns is serialized with
+    `response_model` (a Response it returns is stored as is), and failures
+    release the key so the client can retry.
+    """
+    if key is None:
+        return await work()
+    if not key or len(key) > _MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1 to {_MAX_KEY_LENGTH} characters")
+
+    scope = f"{request.method} {request.url.path}"
+    request_hash = await _fingerprint(request, user_id)
+    claim_token = secrets.token_hex(16)
+    deadline = asyncio.get_running_loop().time() + IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        record = await run_crud(db, crud.claim_idempotency_key, user_id, scope, key, request_hash,
+                                claim_token, IDEMPOTENCY_LEASE_SECONDS)
+        if record is None:
+            break
+        if record.request_hash != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        if record.status_code is not None:
+            return _replay(record)
+
+        # Another request holds the key: wait for its response, or for it to fail and release the key
+        while record is not None and record.status_code is None:
+            if asyncio.get_running_loop().time() >= deadline:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(_POLL_SECONDS)
+            record = await run_crud(db, crud.get_idempotency_key, user_id, scope, key)
+        if record is not None:
+            return _replay(record)
+
+    try:
+        result = await work()
+    except BaseException:
+        await run_crud(db, crud.release_idempotency_key, user_id, scope, key, claim_token)
+        raise
+
+    if isinstance(result, Response):
+        body, status_code = result.body.decode(), result.status_code
+    else:
+        body = TypeAdapter(response_model).dump_json(result).decode()
+        result = Response(content=body, status_code=status_code, media_type="application/json")
+    await run_crud(db, crud.complete_idempotency_key, user_id, scope, key, claim_token,
+                   status_code, body, IDEMPOTENCY_KEY_TTL)
+    return result
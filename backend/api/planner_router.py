@@ -3,19 +3,27 @@
 - GET suggestions/optimal?date=2025-06-15
 - GET suggestions/optimal?duration=60&difficulty=moderate"""
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from database.database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse
+from database.database import DbSession, get_session
 from database import schemas, crud
-from typing import List
+from database.async_crud import run_crud
+from api.etag import make_etag, not_modified
+from api.idempotency import idempotent
+from jobs import QueueFullError, plan_jobs
+from typing import List, Optional, Union
 
 router = APIRouter()
 
-@router.post("/create-training-plan", response_model=schemas.PlanGenerationResponse)
+@router.post("/create-training-plan", response_model=schemas.PlanGenerationResponse,
+             responses={202: {"model": schemas.PlanJob, "description": "Queued as a background job"}})
 async def create_training_plan(
     request: schemas.PlanGenerationRequest,
     user_id: int,
-    db: Session = Depends(get_db)
+    http_request: Request,
+    background: bool = Query(False, description="Queue the plan and return a job to poll at /planner/jobs/{id}"),
+    idempotency_key: Optional[str] = Header(None, description="Retries with the same key return the first response"),
+    db: DbSession = Depends(get_session)
 ):
     """
     Generate a training plan with events based on user preferences.
@@ -27,33 +35,106 @@ async def create_training_plan(
     4. Create prep and cooldown events if specified
     5. Link all events to a training plan
     6. Return the created training plan and events
+    
+    With background=true it returns 202 and a job id at once instead.
+    """
+    async def generate():
+        if background:
+            try:
+                job = plan_jobs.submit(user_id, request)
+            except QueueFullError as e:
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=job.model_dump(mode="json"),
+                                headers={"Location": f"/planner/jobs/{job.id}"})
+        
+        try:
+            return await run_crud(db, crud.create_training_plan_with_events, user_id, request)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to create training plan: {str(e)}"
+            )
+    
+    return await idempotent(http_request, db, user_id, idempotency_key, generate, schemas.PlanGenerationResponse)
+
+@router.post("/preview-training-plan", response_model=schemas.PlanPreview)
+async def preview_training_plan(
+    request: schemas.PlanGenerationRequest,
+    user_id: int,
+    db: DbSession = Depends(get_session)
+):
+    """
+    Show the plan and events create-training-plan would create, without saving
+    anything. The user's busy times for the window are memoized, so previews
+    with different preferences and the final create reuse them.
     """
     try:
-        result = crud.create_training_plan_with_events(db, user_id, request)
-        return result
+        return await run_crud(db, crud.preview_training_plan, user_id, request)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Failed to create training plan: {str(e)}"
+            detail=f"Failed to preview training plan: {str(e)}"
         )
 
-@router.get("/training-plans", response_model=List[schemas.TrainingPlan])
+@router.post("/group-slots", response_model=List[schemas.GroupSlot])
+async def find_group_slots(
+    request: schemas.GroupSlotRequest,
+    user_id: int,
+    db: DbSession = Depends(get_session)
+):
+    """
+    Find times for a group session: slots of the requested duration in the
+    window when all of the users (or at least min_available of them) are
+    free, best first. Every user's calendar is read in a single query.
+    The requesting user must be one of the group, and slots only say how
+    many are free, not who is busy.
+    """
+    if user_id not in request.user_ids:
+        raise HTTPException(status_code=403, detail="Not authorized to search a group you are not in")
+    if request.end_date <= request.start_date:
+        raise HTTPException(status_code=400, detail="end_date must be after start_date")
+    unknown = set(request.user_ids) - await run_crud(db, crud.get_existing_user_ids, request.user_ids)
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Users not found: {sorted(unknown)}")
+    return await run_crud(db, crud.find_group_time_slots, request)
+
+@router.get("/jobs/{job_id}", response_model=schemas.PlanJob)
+async def get_plan_job(job_id: str, user_id: int):
+    """Get the status of a background plan generation job, and its result once finished."""
+    job = plan_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this job")
+    return job
+
+@router.get("/training-plans", response_model=List[Union[schemas.TrainingPlanWithEvents, schemas.TrainingPlan]])
 async def get_user_training_plans(
     user_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    include: Optional[str] = Query(None, description="Comma-separated extras to embed; 'events' adds each plan's events"),
+    db: DbSession = Depends(get_session)
 ):
     """Get all training plans for a user."""
-    training_plans = crud.get_user_training_plans(db, user_id)
-    return training_plans
+    include_events = "events" in (include or "").split(",")
+    version = await run_crud(db, crud.get_user_data_version, user_id)
+    unchanged = not_modified(request, response, make_etag("training-plans", user_id, include_events, version))
+    if unchanged:
+        return unchanged
+    
+    training_plans = await run_crud(db, crud.get_user_training_plans, user_id, include_events=include_events)
+    plan_schema = schemas.TrainingPlanWithEvents if include_events else schemas.TrainingPlan
+    return [plan_schema.model_validate(plan) for plan in training_plans]
 
 @router.get("/training-plans/{plan_id}", response_model=schemas.TrainingPlan)
 async def get_training_plan(
     plan_id: int,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_session)
 ):
     """Get a specific training plan by ID."""
-    plan = crud.get_training_plan(db, plan_id)
+    plan = await run_crud(db, crud.get_training_plan, plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Training plan not found")
     if plan.user_id != user_id:
@@ -64,49 +145,56 @@ async def get_training_plan(
 async def get_training_plan_events(
     plan_id: int,
     user_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_session)
 ):
     """Get all events associated with a training plan."""
-    plan = crud.get_training_plan(db, plan_id)
+    plan = await run_crud(db, crud.get_training_plan, plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Training plan not found")
     if plan.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to access this training plan")
     
-    events = crud.get_training_plan_events(db, plan_id)
-    return events
+    version = await run_crud(db, crud.get_user_data_version, plan.user_id)
+    unchanged = not_modified(request, response, make_etag("training-plan-events", plan_id, version))
+    if unchanged:
+        return unchanged
+    
+    body = await run_crud(db, crud.get_training_plan_events_json, plan_id)
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
 
 @router.put("/training-plans/{plan_id}/status")
 async def update_training_plan_status(
     plan_id: int,
     status: schemas.TrainingPlanStatus,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_session)
 ):
     """Update the status of a training plan."""
-    plan = crud.get_training_plan(db, plan_id)
+    plan = await run_crud(db, crud.get_training_plan, plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Training plan not found")
     if plan.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this training plan")
     
-    updated_plan = crud.update_training_plan_status(db, plan_id, status)
+    updated_plan = await run_crud(db, crud.update_training_plan_status, plan_id, status)
     return {"message": f"Training plan status updated to {status.value}"}
 
 @router.delete("/training-plans/{plan_id}")
 async def delete_training_plan(
     plan_id: int,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_session)
 ):
     """Delete a training plan and all associated events."""
-    plan = crud.get_training_plan(db, plan_id)
+    plan = await run_crud(db, crud.get_training_plan, plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Training plan not found")
     if plan.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this training plan")
     
-    success = crud.delete_training_plan(db, plan_id)
+    success = await run_crud(db, crud.delete_training_plan, plan_id)
     if success:
         return {"message": "Training plan deleted successfully"}
     else:
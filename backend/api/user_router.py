@@ -1,47 +1,53 @@
-from fastapi import APIRouter, UploadFile, File, Body, Depends, status, HTTPException
+from fastapi import APIRouter, UploadFile, File, Body, Depends, Query, status, HTTPException
 from io import StringIO, BytesIO
 from fastapi.responses import JSONResponse
-from typing import List
-from sqlalchemy.orm import Session
+from typing import List, Optional
 from database import schemas, crud
-from database.database import get_db
+from database.async_crud import run_crud
+from database.database import DbSession, get_session
 
 router = APIRouter(tags=["user"])
 
 @router.post("/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
-async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user_email = crud.get_user_by_email(db, email=user.email)
+async def create_user(user: schemas.UserCreate, db: DbSession = Depends(get_session)):
+    db_user_email = await run_crud(db, crud.get_user_by_email, email=user.email)
     if db_user_email:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    db_user_username = crud.get_user_by_username(db, username=user.username)
+    db_user_username = await run_crud(db, crud.get_user_by_username, username=user.username)
     if db_user_username:
         raise HTTPException(status_code=400, detail="Username already taken")
     
-    return crud.create_user(db=db, user=user)
+    return await run_crud(db, crud.create_user, user=user)
 
-@router.get("/", response_model=List[schemas.User])
-async def read_users( db: Session = Depends(get_db)):
-    users = crud.get_users(db)
-    return users
+@router.get("/", response_model=schemas.UserPage)
+async def read_users(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: DbSession = Depends(get_session)
+):
+    try:
+        return await run_crud(db, crud.get_users_page, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/{user_id}", response_model=schemas.User)
-async def read_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = crud.get_user(db, user_id=user_id)
+async def read_user(user_id: int, db: DbSession = Depends(get_session)):
+    db_user = await run_crud(db, crud.get_user, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 @router.put("/{user_id}", response_model=schemas.User)
-async def update_user(user_id: int, user: schemas.UserUpdate, db: Session = Depends(get_db)):
-    db_user = crud.update_user(db, user_id=user_id, user=user)
+async def update_user(user_id: int, user: schemas.UserUpdate, db: DbSession = Depends(get_session)):
+    db_user = await run_crud(db, crud.update_user, user_id=user_id, user=user)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(user_id: int, db: Session = Depends(get_db)):
-    success = crud.delete_user(db, user_id=user_id)
+async def delete_user(user_id: int, db: DbSession = Depends(get_session)):
+    success = await run_crud(db, crud.delete_user, user_id=user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     return None
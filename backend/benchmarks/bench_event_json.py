@@ -0,0 +1,93 @@
+"""
+Compare the response_model serialization path with the column-tuple fast
+JSON path on a window of calendar events.
+
+Run from the backend directory:
+    python -m benchmarks.bench_event_json --events 10000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from typing import List
+
+from benchmarks.suite import WINDOW_START
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=10000, help="events in the window")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # The database package reads its configuration at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_event_json.db')}"
+    os.environ["DATABASE_MODE"] = "sync"
+    from pydantic import TypeAdapter
+    from database import cache, crud, models, schemas, serialization
+    from database.database import SessionLocal, engine
+    from database.init_db import init_db
+    from benchmarks.suite import seed
+
+    init_db()
+    window_days = 365
+    user_id = seed(engine, [args.events], history_days=window_days)[args.events]
+    start, end = WINDOW_START - timedelta(days=1), WINDOW_START + timedelta(days=window_days + 1)
+    event_list = TypeAdapter(List[schemas.Event])
+
+    def response_model_path():
+        # What FastAPI does with a list of ORM rows and response_model=List[schemas.Event]
+        db = SessionLocal()
+        try:
+            rows = db.query(models.Event).filter(
+                models.Event.user_id == user_id,
+                models.Event.start_time >= start,
+                models.Event.end_time <= end
+            ).all()
+            content = event_list.dump_python(event_list.validate_python(rows, from_attributes=True), mode="json")
+            return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+        finally:
+            db.close()
+
+    def fast_path():
+        cache.invalidate_user(user_id)
+        db = SessionLocal()
+        try:
+            return crud.get_user_events_by_date_json(db, user_id, start, end)
+        finally:
+            db.close()
+
+    paths = [("response_model", response_model_path)]
+    orjson = serialization.orjson
+    if orjson is not None:
+        paths.append(("fast path (orjson)", fast_path))
+
+    def fallback_path():
+        serialization.orjson = None
+        try:
+            return fast_path()
+        finally:
+            serialization.orjson = orjson
+    paths.append(("fast path (TypeAdapter)", fallback_path))
+
+    print(f"{args.events} events in the window, best of {args.repeat}")
+    baseline = expected = None
+    for name, fn in paths:
+        seconds, body = best_of(args.repeat, fn)
+        if expected is None:
+            baseline, expected = seconds, body
+        assert body == expected, f"{name} produced different JSON"
+        print(f"  {name:<25} {seconds * 1000:9.1f} ms  {args.events / seconds:12,.0f} events/s  "
+              f"{baseline / seconds:5.1f}x")
+
+if __name__ == "__main__":
+    main()
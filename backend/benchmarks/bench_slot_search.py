@@ -0,0 +1,85 @@
+"""
+Compare slot search strategies on a synthetic calendar.
+
+Run from the backend directory:
+    python -m benchmarks.bench_slot_search --days 365 --events 5000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from database.freebusy import find_free_slots, TIME_OF_DAY_RANGES
+
+def legacy_find_free_slots(intervals, start_date, end_date, duration_minutes, preferred_times):
+    """The original days x hours x events nested loop, kept as the baseline."""
+    available_slots = []
+    current_date = start_date.date()
+    while current_date <= end_date.date():
+        for time_preference in preferred_times:
+            if time_preference in TIME_OF_DAY_RANGES:
+                start_hour, end_hour = TIME_OF_DAY_RANGES[time_preference]
+                for hour in range(start_hour, end_hour):
+                    slot_start = datetime.combine(current_date, datetime.min.time().replace(hour=hour),
+                                                  tzinfo=start_date.tzinfo or timezone.utc)
+                    slot_end = slot_start + timedelta(minutes=duration_minutes)
+                    if not any(slot_start < end and slot_end > start and end > start for start, end in intervals):
+                        available_slots.append({
+                            'start_time': slot_start,
+                            'end_time': slot_end,
+                            'date': current_date,
+                            'time_preference': time_preference
+                        })
+        current_date += timedelta(days=1)
+    return available_slots
+
+def synthetic_events(start_date, days, count, seed=0):
+    rng = random.Random(seed)
+    intervals = []
+    for _ in range(count):
+        start = start_date + timedelta(minutes=rng.randrange(days * 24 * 60))
+        intervals.append((start, start + timedelta(minutes=rng.choice([30, 45, 60, 90, 120]))))
+    return intervals
+
+def best_of(repeat, fn, *args, **kwargs):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--duration", type=int, default=90, help="prep + workout + cooldown minutes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true", help="skip the slow nested-loop baseline")
+    args = parser.parse_args()
+
+    start_date = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    end_date = start_date + timedelta(days=args.days)
+    intervals = synthetic_events(start_date, args.days, args.events)
+    preferred_times = list(TIME_OF_DAY_RANGES)
+
+    runs = [
+        ("interval", lambda: find_free_slots(intervals, start_date, end_date, args.duration, preferred_times)),
+        ("bitmap (1 min)", lambda: find_free_slots(intervals, start_date, end_date, args.duration,
+                                                   preferred_times, mode="bitmap")),
+        ("bitmap (5 min)", lambda: find_free_slots(intervals, start_date, end_date, args.duration,
+                                                   preferred_times, mode="bitmap", resolution_minutes=5)),
+    ]
+    if not args.skip_legacy:
+        runs.insert(0, ("legacy loop", lambda: legacy_find_free_slots(intervals, start_date, end_date,
+                                                                      args.duration, preferred_times)))
+
+    print(f"{args.days} days, {args.events} events, {args.duration} minute slots")
+    baseline = None
+    for name, run in runs:
+        seconds, slots = best_of(args.repeat, run)
+        baseline = baseline or seconds
+        print(f"  {name:<16} {seconds * 1000:10.2f} ms  {len(slots):6d} slots  {baseline / seconds:8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Database-backed benchmarks for slot search, plan generation, calendar reads
+and the main HTTP routes.
+
+Seeds synthetic users with 0, 1k and 50k events, times each operation for
+each of them and writes the results to JSON, so runs on different commits can
+be compared.
+
+Run from the backend directory:
+    python -m benchmarks.suite run --output before.json
+    python -m benchmarks.suite run --output after.json
+    python -m benchmarks.suite compare before.json after.json
+
+By default a throwaway SQLite file is used. --database-url can point at a
+local PostgreSQL database instead; the suite drops and recreates every table
+there, so it also needs --reset-schema.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+WINDOW_START = datetime(2025, 1, 6, tzinfo=timezone.utc)
+WINDOW_DAYS = 365
+PLAN_WEEKS = 12
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="seed a database and time every benchmark")
+    run.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    run.add_argument("--reset-schema", action="store_true",
+                     help="allow dropping and recreating all tables in a non-SQLite database")
+    run.add_argument("--sizes", default="0,1000,50000", help="events per synthetic user, comma-separated")
+    run.add_argument("--history-days", type=int, default=3650,
+                     help="days the seeded events are spread over, centred on the benchmark window")
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--output", default="benchmark_results.json")
+
+    compare = commands.add_parser("compare", help="compare two result files")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--threshold", type=float, default=0.10,
+                         help="slowdown ratio above which a result counts as a regression")
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    if args.command == "compare":
+        sys.exit(compare(args.baseline, args.candidate, args.threshold))
+    run(args)
+
+def run(args):
+    database_url = args.database_url
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+    elif not database_url.startswith("sqlite") and not args.reset_schema:
+        sys.exit("Refusing to drop tables in a non-SQLite database without --reset-schema")
+
+    # The database package reads its configuration at import time
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["DATABASE_MODE"] = "sync"
+    from sqlalchemy import event
+    from database.database import engine, Base
+    from database.init_db import init_db
+
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+
+    statement_count = [0]
+    event.listen(engine, "before_cursor_execute", lambda *_: statement_count.__setitem__(0, statement_count[0] + 1))
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    print(f"Seeding {', '.join(str(size) for size in sizes)} event users into {engine.url.render_as_string()}")
+    users = seed(engine, sizes, args.history_days)
+
+    results = []
+    for size, user_id in users.items():
+        for name, fn, setup, teardown in benchmarks(user_id):
+            result = measure(fn, setup, teardown, args.repeat, statement_count)
+            result.update(name=name, events=size)
+            results.append(result)
+            print(f"  {name:<45} {size:>7} events  median {result['median_ms']:9.2f} ms  "
+                  f"{result['statements']:>5} statements")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "dialect": engine.dialect.name,
+            "repeat": args.repeat,
+            "history_days": args.history_days,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+def seed(engine, sizes, history_days, seed=0):
+    """Create one user per size with that many events spread around the benchmark window."""
+    from sqlalchemy import insert
+    from database import models
+
+    rng = random.Random(seed)
+    history_start = WINDOW_START + timedelta(days=WINDOW_DAYS / 2 - history_days / 2)
+    users = {}
+    with engine.begin() as connection:
+        for size in sizes:
+            user_id = connection.execute(
+                insert(models.User.__table__)
+                .values(email=f"bench{size}@example.com", username=f"bench{size}", hashed_password="x")
+                .returning(models.User.__table__.c.id)
+            ).scalar_one()
+            users[size] = user_id
+
+            rows = []
+            for i in range(size):
+                start = history_start + timedelta(minutes=rng.randrange(history_days * 24 * 60))
+                rows.append({
+                    "title": f"Event {i}",
+                    "start_time": start,
+                    "end_time": start + timedelta(minutes=rng.choice([30, 45, 60, 90, 120])),
+                    "user_id": user_id,
+                })
+            for chunk_start in range(0, len(rows), 5000):
+                connection.execute(insert(models.Event.__table__), rows[chunk_start:chunk_start + 5000])
+
+    # Raw inserts skip the busy_days upkeep the crud writers do
+    from sqlalchemy.orm import Session
+    from database import crud
+    with Session(engine) as db:
+        crud.rebuild_busy_days(db)
+    return users
+
+def benchmarks(user_id):
+    """(name, fn, setup, teardown) tuples; setup and teardown run untimed around every call."""
+    from fastapi.testclient import TestClient
+    from database import crud, schemas
+    from database import cache
+    from database.database import SessionLocal
+    from database.freebusy import np
+    from main import app
+
+    window_end = WINDOW_START + timedelta(days=WINDOW_DAYS)
+    week_end = WINDOW_START + timedelta(days=7)
+    plan_request = schemas.PlanGenerationRequest(
+        start_date=WINDOW_START,
+        end_date=WINDOW_START + timedelta(weeks=PLAN_WEEKS),
+        frequency=3,
+        time_of_day="evening",
+        duration=60,
+        prep_time=15,
+        cooldown_time=15,
+        workout_types=["cycling", "running"],
+        difficulty_level="moderate",
+        days_of_week=["monday", "wednesday", "friday"],
+    )
+    client = TestClient(app)
+
+    def cold_cache():
+        cache.invalidate_user(user_id)
+
+    def with_session(fn):
+        def call():
+            db = SessionLocal()
+            try:
+                return fn(db)
+            finally:
+                db.close()
+        return call
+
+    def slot_search(mode):
+        return with_session(lambda db: crud.find_available_time_slots(
+            db, user_id, WINDOW_START, window_end, 90, ["morning", "afternoon", "evening"], mode=mode
+        ))
+
+    # Plans created while timing are deleted afterwards so every run sees the same calendar
+    created_plans = []
+
+    def create_plan(db, request=plan_request):
+        response = crud.create_training_plan_with_events(db, user_id, request)
+        created_plans.append(response.training_plan.id)
+        return response
+
+    recurring_plan_request = plan_request.model_copy(update={"recurring": True})
+
+    def delete_created_plans():
+        db = SessionLocal()
+        try:
+            while created_plans:
+                crud.delete_training_plan(db, created_plans.pop())
+        finally:
+            db.close()
+
+    def post_plan():
+        response = client.post(f"/planner/create-training-plan?user_id={user_id}",
+                               content=plan_request.model_dump_json(),
+                               headers={"Content-Type": "application/json"})
+        created_plans.append(response.json()["training_plan"]["id"])
+        return response
+
+    week_path = f"/calendar/events/{WINDOW_START.isoformat()}/{week_end.isoformat()}"
+
+    def read_window(db):
+        return crud.get_user_events_by_date(db, user_id, WINDOW_START, window_end)
+
+    def read_window_json(db):
+        return crud.get_user_events_by_date_json(db, user_id, WINDOW_START, window_end)
+
+    suite = [
+        ("find_available_time_slots[interval]", slot_search("interval"), cold_cache, None),
+        ("find_available_time_slots[summary]", slot_search("summary"), cold_cache, None),
+        ("get_user_events_by_date[cold]", with_session(read_window), cold_cache, None),
+        ("get_user_events_by_date[warm]", with_session(read_window), None, None),
+        ("get_user_events_by_date_json[cold]", with_session(read_window_json), cold_cache, None),
+        ("create_training_plan_with_events", with_session(create_plan), cold_cache, delete_created_plans),
+        ("create_training_plan_with_events[recurring]",
+         with_session(lambda db: create_plan(db, recurring_plan_request)), cold_cache, delete_created_plans),
+        ("GET /calendar/events/{start}/{end}", lambda: client.get(week_path, params={"user_id": user_id}),
+         cold_cache, None),
+        ("GET /calendar/events", lambda: client.get("/calendar/events", params={"user_id": user_id}),
+         None, None),
+        ("GET /planner/training-plans", lambda: client.get("/planner/training-plans",
+                                                           params={"user_id": user_id}), None, None),
+        ("POST /planner/create-training-plan", post_plan, cold_cache, delete_created_plans),
+    ]
+    if np is not None:
+        suite.insert(1, ("find_available_time_slots[bitmap]", slot_search("bitmap"), cold_cache, None))
+    return suite
+
+def measure(fn, setup, teardown, repeat, statement_count):
+    timings = []
+    statements = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        before = statement_count[0]
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+        statements = statement_count[0] - before
+        if teardown is not None:
+            teardown()
+    timings.sort()
+    return {
+        "runs": repeat,
+        "min_ms": timings[0],
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "p95_ms": timings[min(len(timings) - 1, round(0.95 * (len(timings) - 1)))],
+        "statements": statements,
+    }
+
+def compare(baseline_path, candidate_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+
+    baseline_results = {(r["name"], r["events"]): r for r in baseline["results"]}
+    print(f"baseline {baseline['meta'].get('commit') or baseline_path} -> "
+          f"candidate {candidate['meta'].get('commit') or candidate_path}")
+
+    regressions = 0
+    for result in candidate["results"]:
+        before = baseline_results.get((result["name"], result["events"]))
+        if before is None:
+            continue
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"  {result['name']:<45} {result['events']:>7} events  "
+              f"{before['median_ms']:9.2f} -> {result['median_ms']:9.2f} ms  {ratio:6.2f}x{flag}")
+    return 1 if regressions else 0
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+if __name__ == "__main__":
+    main()
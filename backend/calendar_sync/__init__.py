@@ -0,0 +1,28 @@
+"""
+Import events from external calendars (Google Calendar) into users' events.
+
+Each user's calendars are stored as CalendarConnection rows with the sync
+token of the last pass, so every pass after the first only downloads what
+changed. Run a pass for every connection from the backend directory with:
+    python -m calendar_sync
+"""
+from .provider import CalendarProvider, ChangePage, ExternalEvent, FakeCalendarProvider, PageRequest, SyncTokenExpired
+from .sync import sync_calendars
+
+def _google():
+    from .google import GoogleCalendarProvider
+    return GoogleCalendarProvider()
+
+# provider name -> factory
+PROVIDERS = {
+    "google": _google,
+}
+
+_instances = {}
+
+def get_provider(name: str) -> CalendarProvider:
+    if name not in _instances:
+        if name not in PROVIDERS:
+            raise ValueError(f"Unknown calendar provider {name!r}")
+        _instances[name] = PROVIDERS[name]()
+    return _instances[name]
@@ -0,0 +1,18 @@
+import argparse
+from database.database import SessionLocal
+from . import sync_calendars
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import changes from every connected external calendar.")
+    parser.add_argument("--user-id", type=int, help="only sync this user's calendars")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        results = sync_calendars(db, user_id=args.user_id)
+    finally:
+        db.close()
+    for result in results:
+        status = f"error: {result.error}" if result.error else f"{result.upserted} upserted, {result.deleted} deleted"
+        kind = "full" if result.full_sync else "incremental"
+        print(f"connection {result.connection_id} (user {result.user_id}, {kind}): {status}")
@@ -0,0 +1,97 @@
+import json
+import os
+from datetime import date, datetime, time, timezone
+from typing import List, Sequence, Union
+from .provider import CalendarProvider, ChangePage, ExternalEvent, PageRequest, SyncTokenExpired
+
+# Point at a local fake server to run the whole pipeline without Google
+GOOGLE_CALENDAR_ROOT_URL = os.getenv("GOOGLE_CALENDAR_ROOT_URL", "https://www.googleapis.com/")
+
+SCOPES = ["https://www.googleapis.com/auth/calendar.readonly"]
+
+class GoogleCalendarProvider(CalendarProvider):
+    """
+    Google Calendar events.list with sync tokens. Page requests for many users
+    go out together as one batch HTTP request, each with its own credentials.
+    """
+    name = "google"
+    # Google's limit on calls per Calendar batch request
+    batch_size = 50
+
+    def __init__(self, root_url: str = GOOGLE_CALENDAR_ROOT_URL, page_size: int = 2500):
+        from googleapiclient.discovery import build
+        from googleapiclient.http import build_http
+
+        root_url = root_url.rstrip("/") + "/"
+        self.page_size = page_size
+        self.batch_uri = f"{root_url}batch/calendar/v3"
+        self._service = build("calendar", "v3", http=build_http(), static_discovery=True,
+                              client_options={"api_endpoint": f"{root_url}calendar/v3/"})
+
+    def fetch_pages(self, requests: Sequence[PageRequest]) -> List[Union[ChangePage, Exception]]:
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from google_auth_httplib2 import AuthorizedHttp
+        from googleapiclient.errors import HttpError
+        from googleapiclient.http import BatchHttpRequest, build_http
+
+        results: List[Union[ChangePage, Exception]] = [None] * len(requests)
+        refreshed = {}
+
+        def on_response(request_id, response, exception):
+            index = int(request_id)
+            if exception is None:
+                results[index] = self._change_page(response, refreshed.get(index))
+            elif isinstance(exception, HttpError) and exception.resp.status == 410:
+                results[index] = SyncTokenExpired(str(exception))
+            else:
+                results[index] = exception
+
+        batch = BatchHttpRequest(callback=on_response, batch_uri=self.batch_uri)
+        for index, request in enumerate(requests):
+            credentials = Credentials.from_authorized_user_info(request.credentials, SCOPES)
+            if not credentials.valid:
+                try:
+                    credentials.refresh(Request())
+                except Exception as e:
+                    results[index] = e
+                    continue
+                refreshed[index] = json.loads(credentials.to_json())
+
+            params = {"calendarId": request.calendar_id, "singleEvents": True, "maxResults": self.page_size}
+            if request.sync_token:
+                params["syncToken"] = request.sync_token
+            if request.page_token:
+                params["pageToken"] = request.page_token
+            api_request = self._service.events().list(**params)
+            api_request.http = AuthorizedHttp(credentials, http=build_http())
+            batch.add(api_request, request_id=str(index))
+
+        if any(result is None for result in results):
+            batch.execute()
+        return results
+
+    def _change_page(self, response: dict, credentials) -> ChangePage:
+        return ChangePage(
+            events=[_external_event(item) for item in response.get("items", [])],
+            next_page_token=response.get("nextPageToken"),
+            next_sync_token=response.get("nextSyncToken"),
+            credentials=credentials
+        )
+
+def _external_event(item: dict) -> ExternalEvent:
+    if item.get("status") == "cancelled":
+        return ExternalEvent(item["id"], cancelled=True)
+    return ExternalEvent(
+        item["id"],
+        title=item.get("summary") or "(No title)",
+        description=item.get("description"),
+        start_time=_event_time(item["start"]),
+        end_time=_event_time(item["end"])
+    )
+
+def _event_time(value: dict) -> datetime:
+    if "dateTime" in value:
+        return datetime.fromisoformat(value["dateTime"])
+    # All-day events: midnight UTC on their date (the end date is exclusive)
+    return datetime.combine(date.fromisoformat(value["date"]), time(), tzinfo=timezone.utc)
@@ -0,0 +1,101 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Union
+
+@dataclass
+class ExternalEvent:
+    """An event as the provider reports it; cancelled events only carry their id."""
+    external_id: str
+    cancelled: bool = False
+    title: Optional[str] = None
+    description: Optional[str] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+
+@dataclass
+class PageRequest:
+    calendar_id: str
+    credentials: Optional[dict] = None
+    sync_token: Optional[str] = None  # None asks for a full listing
+    page_token: Optional[str] = None
+
+@dataclass
+class ChangePage:
+    events: List[ExternalEvent]
+    # Exactly one of these is set: more pages follow, or this was the last one
+    next_page_token: Optional[str] = None
+    next_sync_token: Optional[str] = None
+    # Refreshed credentials to store, if the provider had to refresh them
+    credentials: Optional[dict] = None
+
+class SyncTokenExpired(Exception):
+    """The provider no longer accepts the sync token; a full sync is needed."""
+
+class CalendarProvider(ABC):
+    """
+    Source of external calendar changes. The sync pipeline only talks to
+    providers through this interface, so it can run against a fake.
+    """
+    name: str = ""
+    # Most page requests fetch_pages is given at once
+    batch_size: int = 50
+
+    @abstractmethod
+    def fetch_pages(self, requests: Sequence[PageRequest]) -> List[Union[ChangePage, Exception]]:
+        """
+        Fetch one page for each request, ideally in a single round trip.
+        Failures are returned in place of the page (SyncTokenExpired when the
+        token must be discarded) rather than raised.
+        """
+
+class FakeCalendarProvider(CalendarProvider):
+    """
+    In-memory provider with the same sync token semantics as Google Calendar,
+    for exercising the pipeline locally.
+    """
+
+    def __init__(self, name: str = "fake", page_size: int = 100):
+        self.name = name
+        self.page_size = page_size
+        # calendar id -> ordered log of every change; a sync token is "epoch:position" in it
+        self.changes: Dict[str, List[ExternalEvent]] = {}
+        self.epoch = 0
+        self.batches: List[int] = []
+
+    def put_event(self, calendar_id: str, event: ExternalEvent) -> None:
+        self.changes.setdefault(calendar_id, []).append(event)
+
+    def cancel_event(self, calendar_id: str, external_id: str) -> None:
+        self.changes.setdefault(calendar_id, []).append(ExternalEvent(external_id, cancelled=True))
+
+    def expire_sync_tokens(self) -> None:
+        self.epoch += 1
+
+    def fetch_pages(self, requests):
+        self.batches.append(len(requests))
+        return [self._fetch_page(request) for request in requests]
+
+    def _fetch_page(self, request: PageRequest):
+        log = self.changes.get(request.calendar_id, [])
+        if request.sync_token is None:
+            since = 0
+        else:
+            epoch, since = map(int, request.sync_token.split(":"))
+            if epoch != self.epoch:
+                return SyncTokenExpired(f"Sync token {request.sync_token} has expired")
+
+        latest = {}
+        for event in log[since:]:
+            latest.pop(event.external_id, None)
+            latest[event.external_id] = event
+        events = list(latest.values())
+        if request.sync_token is None:
+            # Like Google, a full listing leaves out deleted events
+            events = [event for event in events if not event.cancelled]
+
+        offset = int(request.page_token or 0)
+        page = events[offset:offset + self.page_size]
+        if offset + self.page_size < len(events):
+            return ChangePage(page, next_page_token=str(offset + self.page_size))
+        return ChangePage(page, next_sync_token=f"{self.epoch}:{len(log)}")
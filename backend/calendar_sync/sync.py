@@ -0,0 +1,114 @@
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from database import crud, schemas
+from .provider import CalendarProvider, ChangePage, PageRequest, SyncTokenExpired
+
+class _ConnectionSync:
+    """Paging state for one connection during a sync pass."""
+
+    def __init__(self, connection):
+        self.connection_id = connection.id
+        self.user_id = connection.user_id
+        self.calendar_id = connection.calendar_id
+        self.credentials = connection.credentials
+        self.credentials_changed = False
+        self.sync_token = connection.sync_token
+        self.page_token = None
+        # External ids seen during a full sync; anything else imported is gone
+        self.seen = set() if self.sync_token is None else None
+        self.done = False
+        self.result = schemas.CalendarSyncResult(
+            connection_id=connection.id,
+            user_id=connection.user_id,
+            full_sync=self.sync_token is None
+        )
+
+    def next_request(self) -> PageRequest:
+        return PageRequest(self.calendar_id, self.credentials, self.sync_token, self.page_token)
+
+    def receive(self, db: Session, page):
+        if isinstance(page, SyncTokenExpired):
+            # Start over with a full listing
+            self.sync_token = self.page_token = None
+            self.seen = set()
+            self.result.full_sync = True
+            return
+        if isinstance(page, Exception):
+            self.result.error = str(page) or type(page).__name__
+            self.done = True
+            return
+
+        if page.credentials is not None:
+            self.credentials = page.credentials
+            self.credentials_changed = True
+        self._apply(db, page)
+        if page.next_page_token:
+            self.page_token = page.next_page_token
+            return
+
+        self.result.deleted += crud.finish_calendar_sync(
+            db, self.connection_id, self.user_id, page.next_sync_token,
+            credentials=self.credentials if self.credentials_changed else None,
+            keep_external_ids=self.seen
+        )
+        self.done = True
+
+    def _apply(self, db: Session, page: ChangePage):
+        upserts = {}
+        cancelled_ids = set()
+        # Keep only the last change per event; a page may hold several
+        for event in page.events:
+            if event.cancelled:
+                upserts.pop(event.external_id, None)
+                cancelled_ids.add(event.external_id)
+            else:
+                cancelled_ids.discard(event.external_id)
+                upserts[event.external_id] = {
+                    "external_id": event.external_id,
+                    "title": event.title,
+                    "description": event.description,
+                    "start_time": event.start_time,
+                    "end_time": event.end_time,
+                }
+        if self.seen is not None:
+            self.seen.update(upserts)
+        upserted, deleted = crud.apply_calendar_changes(
+            db, self.connection_id, self.user_id, list(upserts.values()), list(cancelled_ids)
+        )
+        self.result.upserted += upserted
+        self.result.deleted += deleted
+
+def sync_calendars(db: Session, user_id: Optional[int] = None,
+                   providers: Optional[Dict[str, CalendarProvider]] = None) -> List[schemas.CalendarSyncResult]:
+    """
+    Import changes from every external calendar of one user, or of everyone.
+
+    Connections with a sync token fetch only what changed since the last
+    pass; the others (new, or whose token expired) get a full listing. Each
+    round asks every unfinished connection of a provider for its next page in
+    batches of provider.batch_size, and each page is written with one bulk
+    upsert. `providers` overrides the provider used for a name, e.g. a fake.
+    """
+    from . import get_provider
+
+    providers = dict(providers or {})
+    states_by_provider: Dict[str, List[_ConnectionSync]] = {}
+    for connection in crud.get_calendar_connections(db, user_id=user_id):
+        states_by_provider.setdefault(connection.provider, []).append(_ConnectionSync(connection))
+
+    results = []
+    for provider_name, states in states_by_provider.items():
+        if provider_name not in providers:
+            providers[provider_name] = get_provider(provider_name)
+        provider = providers[provider_name]
+
+        pending = states
+        while pending:
+            for start in range(0, len(pending), provider.batch_size):
+                chunk = pending[start:start + provider.batch_size]
+                pages = provider.fetch_pages([state.next_request() for state in chunk])
+                for state, page in zip(chunk, pages):
+                    state.receive(db, page)
+            pending = [state for state in pending if not state.done]
+        results.extend(state.result for state in states)
+    return results
@@ -0,0 +1,290 @@
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime
+from typing import List, Tuple
+from . import models, schemas, crud
+from .cache import busy_cache, event_cache
+from .freebusy import find_free_slots
+
+# crud function -> its native async version
+_ASYNC_VERSIONS = {}
+
+def _async_version_of(sync_fn):
+    def register(async_fn):
+        _ASYNC_VERSIONS[sync_fn] = async_fn
+        return async_fn
+    return register
+
+# crud functions that spend most of their time computing (slot search, JSON
+# encoding, building results for large batches). AsyncSession.run_sync would
+# run them on the event loop and stall every other request meanwhile, so in
+# async mode they run in a worker thread on a sync session of their own.
+_CPU_BOUND = {
+    crud.preview_training_plan,
+    crud.create_training_plan_with_events,
+    crud.find_group_time_slots,
+    crud.get_user_events_by_date_json,
+    crud.get_training_plan_events_json,
+    crud.apply_event_batch,
+}
+
+def _call_with_own_session(fn, *args, **kwargs):
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
+
+async def run_crud(db, fn, *args, **kwargs):
+    """
+    Call a crud function on whichever kind of session DATABASE_MODE provides.
+
+    Sync sessions run the function in a worker thread so queries never block
+    the event loop. Async sessions use the native async version below when
+    there is one, run the CPU-bound functions above in a worker thread, and
+    otherwise run the sync function through AsyncSession.run_sync, which
+    still does its IO on asyncpg. Every crud function commits its own
+    writes, so none of them depends on sharing the caller's transaction.
+    """
+    if isinstance(db, AsyncSession):
+        async_fn = _ASYNC_VERSIONS.get(fn)
+        if async_fn is not None:
+            return await async_fn(db, *args, **kwargs)
+        if fn in _CPU_BOUND:
+            return await run_in_threadpool(_call_with_own_session, fn, *args, **kwargs)
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+# User CRUD operations
+@_async_version_of(crud.get_user)
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.scalar(select(models.User).where(models.User.id == user_id))
+
+@_async_version_of(crud.get_user_by_email)
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email))
+
+@_async_version_of(crud.get_user_by_username)
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).where(models.User.username == username))
+
+@_async_version_of(crud.get_users)
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.scalars(select(models.User).offset(skip).limit(limit))
+    return result.all()
+
+@_async_version_of(crud.create_user)
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    fake_hashed_password = user.password + "_hashed"
+    db_user = models.User(
+        email=user.email,
+        username=user.username,
+        hashed_password=fake_hashed_password
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+@_async_version_of(crud.update_user)
+async def update_user(db: AsyncSession, user_id: int, user: schemas.UserUpdate):
+    db_user = await get_user(db, user_id)
+    if not db_user:
+        return None
+
+    user_data = user.model_dump(exclude_unset=True)
+
+    if "password" in user_data:
+        user_data["hashed_password"] = user_data.pop("password") + "_hashed"
+
+    for key, value in user_data.items():
+        setattr(db_user, key, value)
+
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+@_async_version_of(crud.delete_user)
+async def delete_user(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        delete(models.User).where(models.User.id == user_id).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if not result.rowcount:
+        return False
+    crud._events_changed(user_id, reset=True)
+    return True
+
+# Event operations
+@_async_version_of(crud.create_event)
+async def create_event(db: AsyncSession, event: schemas.EventCreate, user_id: int):
+    db_event = models.Event(
+        **event.model_dump(),
+        user_id=user_id
+    )
+    db.add(db_event)
+    await db.run_sync(crud._refresh_busy_days, user_id, [(db_event.start_time, db_event.end_time)])
+    await db.run_sync(crud._bump_data_version, user_id)
+    await db.commit()
+    await db.refresh(db_event)
+    crud._events_changed(user_id, upserted=[db_event])
+    return db_event
+
+@_async_version_of(crud.get_all_events)
+async def get_all_events(db: AsyncSession):
+    result = await db.scalars(select(models.Event))
+    return result.all()
+
+@_async_version_of(crud.get_event)
+async def get_event(db: AsyncSession, event_id: int):
+    return await db.scalar(select(models.Event).where(models.Event.id == event_id))
+
+@_async_version_of(crud.get_events_by_date)
+async def get_events_by_date(db: AsyncSession, start_date: datetime, end_date: datetime):
+    result = await db.scalars(select(models.Event).where(
+        models.Event.start_time >= start_date,
+        models.Event.end_time <= end_date
+    ))
+    return result.all()
+
+@_async_version_of(crud.get_user_events_by_date)
+async def get_user_events_by_date(db: AsyncSession, user_id: int, start_date: datetime, end_date: datetime):
+    cache_key = event_cache.key(user_id, start_date, end_date)
+    events = event_cache.get(cache_key)
+    if events is None:
+        result = await db.scalars(select(models.Event).where(
+            models.Event.user_id == user_id,
+            models.Event.start_time >= start_date,
+            models.Event.end_time <= end_date
+        ))
+        events = [schemas.Event.model_validate(event) for event in result.all()]
+        occurrences = await db.run_sync(crud.expand_series, start_date, end_date,
+                                        models.EventSeries.user_id == user_id)
+        events.extend(schemas.Event(**row) for row in occurrences)
+        event_cache.set(cache_key, events)
+    return events
+
+@_async_version_of(crud.update_event)
+async def update_event(db: AsyncSession, event_id: int, event: schemas.EventUpdate):
+    db_event = await get_event(db, event_id)
+    if not db_event:
+        return None
+
+    event_data = event.model_dump(exclude_unset=True)
+    old_span = (db_event.start_time, db_event.end_time)
+
+    for key, value in event_data.items():
+        setattr(db_event, key, value)
+
+    await db.run_sync(crud._refresh_busy_days, db_event.user_id, [old_span, (db_event.start_time, db_event.end_time)])
+    await db.run_sync(crud._bump_data_version, db_event.user_id)
+    await db.commit()
+    await db.refresh(db_event)
+    crud._events_changed(db_event.user_id, upserted=[db_event])
+    return db_event
+
+@_async_version_of(crud.delete_event)
+async def delete_event(db: AsyncSession, event_id: int):
+    db_event = await get_event(db, event_id)
+    if not db_event:
+        return False
+    await db.delete(db_event)
+    await db.run_sync(crud._refresh_busy_days, db_event.user_id, [(db_event.start_time, db_event.end_time)])
+    await db.run_sync(crud._bump_data_version, db_event.user_id)
+    await db.commit()
+    crud._events_changed(db_event.user_id, deleted=[event_id])
+    return True
+
+# Training plan operations
+@_async_version_of(crud.get_training_plan)
+async def get_training_plan(db: AsyncSession, plan_id: int):
+    # Preferences are loaded up front: async sessions cannot lazy load during serialization
+    return await db.scalar(
+        select(models.TrainingPlan)
+        .options(joinedload(models.TrainingPlan.preferences))
+        .where(models.TrainingPlan.id == plan_id)
+    )
+
+@_async_version_of(crud.get_user_training_plans)
+async def get_user_training_plans(db: AsyncSession, user_id: int, include_events: bool = False):
+    stmt = select(models.TrainingPlan).options(joinedload(models.TrainingPlan.preferences))
+    if include_events:
+        stmt = stmt.options(
+            selectinload(models.TrainingPlan.events),
+            selectinload(models.TrainingPlan.series).selectinload(models.EventSeries.exceptions)
+        )
+    result = await db.scalars(stmt.where(models.TrainingPlan.user_id == user_id))
+    plans = result.all()
+    return [crud._with_series_events(plan) for plan in plans] if include_events else plans
+
+@_async_version_of(crud.get_training_plan_events)
+async def get_training_plan_events(db: AsyncSession, plan_id: int):
+    result = await db.scalars(select(models.Event).where(models.Event.training_plan_id == plan_id))
+    events = [schemas.Event.model_validate(event) for event in result.all()]
+    occurrences = await db.run_sync(crud.expand_series, None, None, models.EventSeries.training_plan_id == plan_id)
+    events.extend(schemas.Event(**row) for row in occurrences)
+    return events
+
+@_async_version_of(crud.update_training_plan_status)
+async def update_training_plan_status(db: AsyncSession, plan_id: int, status: schemas.TrainingPlanStatus):
+    db_plan = await get_training_plan(db, plan_id)
+    if not db_plan:
+        return None
+
+    db_plan.status = models.TrainingPlanStatus(status.value)
+    await db.run_sync(crud._bump_data_version, db_plan.user_id)
+    await db.commit()
+    return db_plan
+
+@_async_version_of(crud.delete_training_plan)
+async def delete_training_plan(db: AsyncSession, plan_id: int):
+    plan_events = await db.run_sync(crud._plan_events, plan_id)
+    has_series = await db.run_sync(crud._plan_has_series, plan_id)
+    result = await db.execute(
+        delete(models.TrainingPlan).where(models.TrainingPlan.id == plan_id)
+        .returning(models.TrainingPlan.user_id).execution_options(synchronize_session=False)
+    )
+    user_id = result.scalar_one_or_none()
+    if user_id is not None:
+        await db.run_sync(crud._refresh_busy_days, user_id,
+                          [(start_time, end_time) for _, start_time, end_time in plan_events])
+        await db.run_sync(crud._bump_data_version, user_id)
+    await db.commit()
+    if user_id is None:
+        return False
+    crud._events_changed(user_id, deleted=[event_id for event_id, _, _ in plan_events], reset=has_series)
+    return True
+
+@_async_version_of(crud.get_busy_intervals)
+async def get_busy_intervals(db: AsyncSession, user_id: int, start_date: datetime, end_date: datetime,
+                             cached: bool = True) -> List[Tuple[datetime, datetime]]:
+    cache_key = busy_cache.key(user_id, start_date, end_date)
+    intervals = busy_cache.get(cache_key) if cached else None
+    if intervals is None:
+        result = await db.execute(crud._busy_intervals_query(user_id, start_date, end_date))
+        intervals = [tuple(row) for row in result]
+        intervals = await db.run_sync(crud._with_series_intervals, user_id, start_date, end_date, intervals)
+        busy_cache.set(cache_key, intervals)
+    return intervals
+
+@_async_version_of(crud.find_available_time_slots)
+async def find_available_time_slots(db: AsyncSession, user_id: int, start_date: datetime, end_date: datetime,
+                                    duration_minutes: int, preferred_times: List[str],
+                                    mode: str = "interval", resolution_minutes: int = 1,
+                                    cached: bool = True) -> List[dict]:
+    if mode == "summary":
+        intervals = await db.run_sync(crud.get_busy_intervals_from_summary, user_id, start_date, end_date,
+                                      cached=cached)
+        mode = "interval"
+    else:
+        intervals = await get_busy_intervals(db, user_id, start_date, end_date, cached=cached)
+    # The search is CPU bound; keep it off the event loop
+    return await run_in_threadpool(
+        find_free_slots, intervals,
+        start_date, end_date, duration_minutes, preferred_times,
+        mode=mode, resolution_minutes=resolution_minutes
+    )
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+from pydantic import TypeAdapter
+from . import schemas
+
+# Calendar window cache settings; set CALENDAR_CACHE_URL to a redis:// URL to
+# share the cache between workers instead of keeping one per process
+CALENDAR_CACHE_URL = os.getenv("CALENDAR_CACHE_URL", "")
+CALENDAR_CACHE_TTL = float(os.getenv("CALENDAR_CACHE_TTL", "60"))
+CALENDAR_CACHE_SIZE = int(os.getenv("CALENDAR_CACHE_SIZE", "1024"))
+# Busy intervals behind slot search live longer so a user can try several
+# plan previews over the same window without re-reading their calendar
+BUSY_CACHE_TTL = float(os.getenv("BUSY_CACHE_TTL", "900"))
+
+class LRUCache:
+    """Thread-safe in-process cache with a size bound (least recently used goes first) and per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Key -> (value, expires_at), oldest first. A counter is only dropped
+        # once it has gone unused for twice the entry TTL: every entry keyed
+        # with it was set soon after a read of it, so has expired by then,
+        # and restarting from 0 resurrects nothing
+        self._counters: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def counter(self, key: str) -> int:
+        with self._lock:
+            return self._touch_counter(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            return self._touch_counter(key, 1)
+
+    def _touch_counter(self, key: str, increment: int) -> int:
+        # Call with the lock held
+        now = time.monotonic()
+        while self._counters:
+            oldest = next(iter(self._counters))
+            if self._counters[oldest][1] > now:
+                break
+            del self._counters[oldest]
+        value = self._counters.pop(key, (0, None))[0] + increment
+        self._counters[key] = (value, now + 2 * self.ttl_seconds)
+        return value
+
+class RedisCache:
+    """
+    Same interface as LRUCache backed by a Redis-compatible server, so several
+    workers share entries and invalidations. Needs the `redis` package.
+    Size is bounded by the server's own eviction policy.
+    """
+
+    def __init__(self, url: str, ttl_seconds: float = 60.0, dumps: Callable[[Any], bytes] = None,
+                 loads: Callable[[bytes], Any] = None):
+        import redis
+
+        self.ttl_seconds = ttl_seconds
+        self._client = redis.Redis.from_url(url)
+        self._dumps = dumps
+        self._loads = loads
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(key)
+        if raw is None:
+            return None
+        return self._loads(raw) if self._loads else raw
+
+    def set(self, key: str, value: Any) -> None:
+        raw = self._dumps(value) if self._dumps else value
+        self._client.set(key, raw, px=int(self.ttl_seconds * 1000))
+
+    # Counters expire like LRUCache's: after going unused for twice the entry TTL
+
+    def counter(self, key: str) -> int:
+        pipeline = self._client.pipeline()
+        pipeline.get(key)
+        pipeline.pexpire(key, int(self.ttl_seconds * 2000))
+        raw, _ = pipeline.execute()
+        return int(raw or 0)
+
+    def incr(self, key: str) -> int:
+        pipeline = self._client.pipeline()
+        pipeline.incr(key)
+        pipeline.pexpire(key, int(self.ttl_seconds * 2000))
+        value, _ = pipeline.execute()
+        return value
+
+def make_backend(url: str = CALENDAR_CACHE_URL, ttl_seconds: float = CALENDAR_CACHE_TTL,
+                 max_entries: int = CALENDAR_CACHE_SIZE, dumps=None, loads=None):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url, ttl_seconds, dumps=dumps, loads=loads)
+    return LRUCache(max_entries, ttl_seconds)
+
+_event_list = TypeAdapter(List[schemas.Event])
+_interval_list = TypeAdapter(List[Tuple[datetime, datetime]])
+
+class EventWindowCache:
+    """
+    Caches a user's events for a (start, end) window.
+
+    Each user has a generation number that is part of every key. Writes bump
+    it, which invalidates all of that user's windows at once; a read that
+    raced with a write stores its result under the old generation, where it
+    is never read again.
+    """
+
+    def __init__(self, backend, namespace: str = "calendar"):
+        self.backend = backend
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, user_id: int, start: datetime, end: datetime, variant: str = "") -> str:
+        """`variant` keeps differently derived values for the same window apart."""
+        generation = self.backend.counter(f"{self.namespace}:generation:{user_id}")
+        key = f"{self.namespace}:{user_id}:{generation}:{start.isoformat()}:{end.isoformat()}"
+        return f"{key}:{variant}" if variant else key
+
+    def get(self, key: str) -> Optional[list]:
+        events = self.backend.get(key)
+        if events is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return events
+
+    def set(self, key: str, events: list) -> list:
+        self.backend.set(key, events)
+        return events
+
+    def invalidate_user(self, user_id: int) -> None:
+        self.backend.incr(f"{self.namespace}:generation:{user_id}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+event_cache = EventWindowCache(make_backend(dumps=_event_list.dump_json, loads=_event_list.validate_json))
+# The same windows already encoded as JSON, for the calendar read route
+event_json_cache = EventWindowCache(make_backend(), namespace="calendar-json")
+# Sorted (start, end) pairs of a user's events in a window, for slot search
+# (variant "summary" for the pairs read from busy_days)
+busy_cache = EventWindowCache(
+    make_backend(ttl_seconds=BUSY_CACHE_TTL, dumps=_interval_list.dump_json, loads=_interval_list.validate_json),
+    namespace="busy"
+)
+
+def invalidate_user(user_id: int) -> None:
+    """Drop every cached window of a user's events."""
+    event_cache.invalidate_user(user_id)
+    event_json_cache.invalidate_user(user_id)
+    busy_cache.invalidate_user(user_id)
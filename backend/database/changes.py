@@ -0,0 +1,170 @@
+"""
+Per-user calendar change notifications.
+
+Event writers publish a CalendarChange after committing, with the events
+they wrote and the ids they removed, and GET /calendar/changes pushes them to
+clients as server-sent events so open calendars apply deltas instead of
+refetching. The default broker only reaches clients connected to the same
+process; set CHANGE_BROKER_URL to a redis:// URL to fan changes out across
+workers (requires the `redis` extra).
+"""
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, Optional, Set
+from . import schemas
+
+CHANGE_BROKER_URL = os.getenv("CHANGE_BROKER_URL", "")
+# Changes a slow client can fall behind by before it is told to refetch
+CHANGE_QUEUE_SIZE = int(os.getenv("CHANGE_QUEUE_SIZE", "256"))
+# Larger writes (e.g. a full calendar sync) are announced as a reset instead of listed
+CHANGE_MAX_EVENTS = int(os.getenv("CHANGE_MAX_EVENTS", "500"))
+# Idle streams send a comment this often so proxies keep them open
+CHANGE_KEEPALIVE_SECONDS = float(os.getenv("CHANGE_KEEPALIVE_SECONDS", "15"))
+
+class Subscription:
+    """Queue of encoded changes for one connected client, read on its event loop."""
+
+    def __init__(self, user_id: int, max_pending: int = CHANGE_QUEUE_SIZE):
+        self.user_id = user_id
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[bytes]" = asyncio.Queue(max_pending)
+
+    def deliver(self, message: bytes) -> None:
+        """Queue a message; safe to call from any thread."""
+        try:
+            self._loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            pass  # the client's loop is gone
+
+    def _put(self, message: bytes) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client cannot catch up from deltas any more
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(_encode(schemas.CalendarChange(user_id=self.user_id, reset=True)))
+
+    async def get(self, timeout: float) -> Optional[bytes]:
+        """The next change, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class InProcessBroker:
+    """Delivers changes to subscribers in this process only."""
+    shared = False
+
+    def __init__(self, max_pending: int = CHANGE_QUEUE_SIZE):
+        self.max_pending = max_pending
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def has_subscribers(self, user_id: int) -> bool:
+        return bool(self._subscribers.get(user_id))
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def publish(self, user_id: int, message: bytes) -> None:
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int):
+        subscription = Subscription(user_id, self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                subscriptions = self._subscribers.get(user_id)
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[user_id]
+
+class RedisBroker(InProcessBroker):
+    """
+    Publishes on a Redis-compatible server (channel changes:<user_id>) so
+    clients connected to any worker or process see every change. Each worker
+    keeps one pattern subscription and fans messages out to its own clients.
+    """
+    shared = True
+
+    def __init__(self, url: str, max_pending: int = CHANGE_QUEUE_SIZE):
+        import redis
+
+        super().__init__(max_pending)
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+        self._listener: Optional[asyncio.Task] = None
+
+    def has_subscribers(self, user_id: int) -> bool:
+        # Clients may be connected to another worker
+        return True
+
+    def publish(self, user_id: int, message: bytes) -> None:
+        self._client.publish(f"changes:{user_id}", message)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        async with super().subscribe(user_id) as subscription:
+            yield subscription
+
+    async def _listen(self):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.psubscribe("changes:*")
+            async for message in pubsub.listen():
+                if message["type"] == "pmessage":
+                    user_id = int(message["channel"].rsplit(b":", 1)[1])
+                    super().publish(user_id, message["data"])
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+def make_broker(url: str = CHANGE_BROKER_URL):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url)
+    return InProcessBroker()
+
+broker = make_broker()
+
+def _encode(change: schemas.CalendarChange) -> bytes:
+    return change.model_dump_json().encode()
+
+def publish_events(user_id: int, upserted: Iterable = (), deleted: Iterable[int] = (), reset: bool = False) -> None:
+    """
+    Announce a committed write to a user's events: `upserted` are the events
+    created or updated (ORM rows or schemas.Event), `deleted` the removed ids.
+    """
+    if not broker.has_subscribers(user_id):
+        return
+    upserted = list(upserted)
+    deleted = list(deleted)
+    if not (upserted or deleted or reset):
+        return
+    # Series occurrences have no id for a later change to refer to
+    if len(upserted) + len(deleted) > CHANGE_MAX_EVENTS or any(event.id is None for event in upserted):
+        reset = True
+    if reset:
+        change = schemas.CalendarChange(user_id=user_id, reset=True)
+    else:
+        change = schemas.CalendarChange(
+            user_id=user_id,
+            upserted=[schemas.Event.model_validate(event) for event in upserted],
+            deleted=deleted
+        )
+    broker.publish(user_id, _encode(change))
@@ -1,8 +1,23 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+import os
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import and_, or_, bindparam, delete, func, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
 from . import models, schemas
+from . import cache, changes
+from .cache import busy_cache, event_cache, event_json_cache
+from .freebusy import (
+    busy_day_intervals, busy_day_masks, decode_day_mask, encode_day_mask, find_free_slots, find_group_slots,
+    utc_day_start, utc_days
+)
+from .pagination import encode_cursor, decode_cursor
+from .recurrence import RecurrenceRule
+from .scheduling import select_weekly_slots, spread_days
+from .serialization import EVENT_COLUMNS, EVENT_FIELDS, dumps_rows
+
+# Slot search mode for plan generation; "interval" scans raw events instead of busy_days
+PLAN_SLOT_SEARCH_MODE = os.getenv("PLAN_SLOT_SEARCH_MODE", "summary")
 
 # User CRUD operations
 def get_user(db: Session, user_id: int):
@@ -17,6 +32,17 @@ def get_user_by_username(db: Session, username: str):
 def get_users(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.User).offset(skip).limit(limit).all()
 
+def get_users_page(db: Session, limit: int = 100, cursor: Optional[str] = None) -> schemas.UserPage:
+    """Users ordered by id, one page at a time; pass the previous page's next_cursor to continue."""
+    query = db.query(models.User)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.filter(models.User.id > last_id)
+    
+    users = query.order_by(models.User.id).limit(limit + 1).all()
+    next_cursor = encode_cursor(users[limit - 1].id) if len(users) > limit else None
+    return schemas.UserPage(items=users[:limit], next_cursor=next_cursor)
+
 def create_user(db: Session, user: schemas.UserCreate):
     fake_hashed_password = user.password + "_hashed"
     db_user = models.User(
@@ -47,11 +73,14 @@ def update_user(db: Session, user_id: int, user: schemas.UserUpdate):
     return db_user
 
 def delete_user(db: Session, user_id: int):
-    db_user = get_user(db, user_id)
-    if not db_user:
-        return False
-    db.delete(db_user)
+    # One statement; the database cascades to the user's plans and events
+    deleted = db.execute(
+        delete(models.User).where(models.User.id == user_id).execution_options(synchronize_session=False)
+    ).rowcount
     db.commit()
+    if not deleted:
+        return False
+    _events_changed(user_id, reset=True)
     return True
 
 # Event operations
@@ -61,13 +90,65 @@ def create_event(db: Session, event: schemas.EventCreate, user_id: int):
         user_id=user_id
     )
     db.add(db_event)
+    _refresh_busy_days(db, user_id, [(db_event.start_time, db_event.end_time)])
+    _bump_data_version(db, user_id)
     db.commit()
     db.refresh(db_event)
+    _events_changed(user_id, upserted=[db_event])
     return db_event
 
 def get_all_events(db: Session):
     return db.query(models.Event).all()
 
+def get_user_events_page(db: Session, user_id: int, limit: int = 100,
+                         cursor: Optional[str] = None) -> schemas.EventPage:
+    """
+    A user's stored events ordered by (start_time, id), one page at a time.
+    Series occurrences are not generated here (a series may never end):
+    the page lists a series' override events only, like the export.
+    """
+    query = db.query(models.Event).filter(models.Event.user_id == user_id)
+    if cursor:
+        last_start, last_id = decode_cursor(cursor, datetime, int)
+        query = query.filter(tuple_(models.Event.start_time, models.Event.id) > tuple_(last_start, last_id))
+    
+    events = query.order_by(models.Event.start_time, models.Event.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(events) > limit:
+        last = events[limit - 1]
+        next_cursor = encode_cursor(last.start_time, last.id)
+    return schemas.EventPage(items=events[:limit], next_cursor=next_cursor)
+
+def iter_user_event_batches(db: Session, user_id: int, batch_size: int = 1000):
+    """
+    Yield all of a user's stored events in (start_time, id) order as lists of
+    column rows; their series are read with get_user_event_series.
+
+    Rows are streamed from a server-side cursor `batch_size` at a time and are
+    not added to the session, so memory stays flat however long the history is.
+    """
+    stmt = (
+        select(*models.Event.__table__.columns)
+        .where(models.Event.user_id == user_id)
+        .order_by(models.Event.start_time, models.Event.id)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from db.execute(stmt).partitions()
+
+def get_user_event_series(db: Session, user_id: int) -> List[schemas.EventSeriesExport]:
+    """Every series of a user in id order, each with the recurrence ids of its exceptions."""
+    series_list = db.scalars(
+        select(models.EventSeries).options(selectinload(models.EventSeries.exceptions))
+        .where(models.EventSeries.user_id == user_id).order_by(models.EventSeries.id)
+    )
+    return [
+        schemas.EventSeriesExport(
+            **dict(schemas.EventSeries.model_validate(series)),
+            exceptions=sorted(exception.recurrence_id for exception in series.exceptions)
+        )
+        for series in series_list
+    ]
+
 def get_event(db: Session, event_id: int):
     return db.query(models.Event).filter(models.Event.id == event_id).first()
 
@@ -77,12 +158,57 @@ def get_events_by_date(db: Session, start_date: datetime, end_date: datetime):
         models.Event.end_time <= end_date
     ).all()
 
-def get_user_events_by_date(db: Session, user_id: int, start_date: datetime, end_date: datetime):
-    return db.query(models.Event).filter(
-        models.Event.user_id == user_id,
-        models.Event.start_time >= start_date,
-        models.Event.end_time <= end_date
-    ).all()
+def get_user_events_by_date(db: Session, user_id: int, start_date: datetime, end_date: datetime) -> List[schemas.Event]:
+    # Served from the calendar window cache; writes below invalidate it
+    cache_key = event_cache.key(user_id, start_date, end_date)
+    events = event_cache.get(cache_key)
+    if events is None:
+        events = [schemas.Event.model_validate(event) for event in db.query(models.Event).filter(
+            models.Event.user_id == user_id,
+            models.Event.start_time >= start_date,
+            models.Event.end_time <= end_date
+        ).all()]
+        events.extend(schemas.Event(**row) for row in
+                      expand_series(db, start_date, end_date, models.EventSeries.user_id == user_id))
+        event_cache.set(cache_key, events)
+    return events
+
+def get_user_events_by_date_json(db: Session, user_id: int, start_date: datetime, end_date: datetime,
+                                 version: Optional[int] = None) -> bytes:
+    """
+    get_user_events_by_date as ready-to-send JSON, encoded from column tuples.
+
+    Pass the get_user_data_version an ETag was made from: the body is cached
+    under it, so a worker whose cache missed another worker's write reads the
+    rows again instead of sending an old body under the new ETag.
+    """
+    variant = f"v{version}" if version is not None else ""
+    cache_key = event_json_cache.key(user_id, start_date, end_date, variant)
+    body = event_json_cache.get(cache_key)
+    if body is None:
+        rows = db.execute(select(*EVENT_COLUMNS).where(
+            models.Event.user_id == user_id,
+            models.Event.start_time >= start_date,
+            models.Event.end_time <= end_date
+        )).all()
+        rows.extend(_as_tuples(expand_series(db, start_date, end_date, models.EventSeries.user_id == user_id)))
+        body = event_json_cache.set(cache_key, dumps_rows(EVENT_FIELDS, rows))
+    return body
+
+def get_user_data_version(db: Session, user_id: int) -> int:
+    """The user's data_version: it changes whenever their events, series or plans do."""
+    return db.scalar(select(models.User.data_version).where(models.User.id == user_id)) or 0
+
+def _bump_data_version(db: Session, *user_ids: int):
+    """
+    Move the users' data_version on, in the current transaction. Call last
+    before committing, after _refresh_busy_days, so locks are always taken
+    in the same order.
+    """
+    users = models.User.__table__
+    # In id order, so concurrent writers for the same users can't deadlock
+    for user_id in sorted(set(user_ids)):
+        db.execute(update(users).where(users.c.id == user_id).values(data_version=users.c.data_version + 1))
 
 def update_event(db: Session, event_id: int, event: schemas.EventUpdate):
     db_event = get_event(db, event_id)
@@ -90,24 +216,303 @@ def update_event(db: Session, event_id: int, event: schemas.EventUpdate):
         return None
     
     event_data = event.model_dump(exclude_unset=True)
+    old_span = (db_event.start_time, db_event.end_time)
     
     for key, value in event_data.items():
         setattr(db_event, key, value)
     
+    _refresh_busy_days(db, db_event.user_id, [old_span, (db_event.start_time, db_event.end_time)])
+    _bump_data_version(db, db_event.user_id)
     db.commit()
     db.refresh(db_event)
+    _events_changed(db_event.user_id, upserted=[db_event])
     return db_event
 
+def apply_event_batch(db: Session, user_id: int, batch: schemas.EventBatchRequest) -> schemas.EventBatchResponse:
+    """
+    Create, update and delete many of a user's events in one transaction.
+
+    Ownership of every referenced id is checked with one query; ids that do
+    not exist or belong to someone else are reported per item and skipped,
+    everything else is applied with one statement per kind of change.
+    """
+    events = models.Event.__table__
+    referenced_ids = {item.id for item in batch.update} | set(batch.delete)
+    owners = {}
+    old_spans = {}
+    if referenced_ids:
+        rows = db.execute(select(events.c.id, events.c.user_id, events.c.start_time, events.c.end_time)
+                          .where(events.c.id.in_(referenced_ids)))
+        for event_id, owner_id, start_time, end_time in rows:
+            owners[event_id] = owner_id
+            old_spans[event_id] = (start_time, end_time)
+
+    def refused(event_id: int) -> Optional[schemas.EventBatchItemResult]:
+        if event_id not in owners:
+            return schemas.EventBatchItemResult(id=event_id, status=404, error="Event not found")
+        if owners[event_id] != user_id:
+            return schemas.EventBatchItemResult(id=event_id, status=403, error="Not authorized to modify this event")
+        return None
+
+    try:
+        created = [
+            schemas.EventBatchItemResult(id=event.id, status=201, event=schemas.Event.model_validate(event))
+            for event in _insert_events(db, [event.model_dump() for event in batch.create], user_id)
+        ]
+
+        # executemany needs the same columns in every row, so group updates by the fields they set
+        update_groups = {}
+        for item in batch.update:
+            if refused(item.id) is None:
+                values = item.model_dump(exclude_unset=True, exclude={"id"})
+                if values:
+                    update_groups.setdefault(tuple(sorted(values)), []).append(
+                        {"event_id": item.id, **{f"new_{column}": value for column, value in values.items()}}
+                    )
+        for columns, rows in update_groups.items():
+            db.execute(
+                update(events).where(events.c.id == bindparam("event_id"))
+                .values({column: bindparam(f"new_{column}") for column in columns}),
+                rows
+            )
+        updated_ids = {item.id for item in batch.update if refused(item.id) is None}
+        updated_events = {
+            event.id: schemas.Event.model_validate(event)
+            for event in db.scalars(select(models.Event).where(models.Event.id.in_(updated_ids))
+                                    .execution_options(populate_existing=True))
+        } if updated_ids else {}
+        updated = [
+            refused(item.id) or schemas.EventBatchItemResult(id=item.id, status=200, event=updated_events[item.id])
+            for item in batch.update
+        ]
+
+        deleted = []
+        delete_ids = set()
+        for event_id in batch.delete:
+            result = refused(event_id)
+            if result is None and event_id in delete_ids:
+                # Listed twice: the first one already deleted it
+                result = schemas.EventBatchItemResult(id=event_id, status=404, error="Event not found")
+            if result is None:
+                delete_ids.add(event_id)
+                result = schemas.EventBatchItemResult(id=event_id, status=204)
+            deleted.append(result)
+        if delete_ids:
+            db.execute(delete(events).where(events.c.id.in_(delete_ids)))
+
+        spans = [(result.event.start_time, result.event.end_time) for result in created]
+        spans += [old_spans[event_id] for event_id in updated_ids | delete_ids]
+        spans += [(event.start_time, event.end_time) for event in updated_events.values()]
+        _refresh_busy_days(db, user_id, spans)
+        _bump_data_version(db, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    _events_changed(user_id, upserted=[result.event for result in created] + list(updated_events.values()),
+                    deleted=delete_ids)
+    return schemas.EventBatchResponse(created=created, updated=updated, deleted=deleted)
+
+def _events_changed(user_id: int, upserted: Iterable = (), deleted: Iterable[int] = (), reset: bool = False):
+    """
+    Call after committing any change to a user's events, with the events
+    written and the ids removed, or reset=True when they are not known.
+    """
+    cache.invalidate_user(user_id)
+    changes.publish_events(user_id, upserted, deleted, reset)
+
+# Arbitrary key for the per-user advisory lock taken while rewriting busy_days
+_BUSY_DAYS_LOCK = 0x42757379
+
+def _day_ranges(days: List) -> List[tuple]:
+    """Sorted dates -> (first, last) pairs of consecutive runs."""
+    ranges = []
+    for day in days:
+        if ranges and (day - ranges[-1][1]).days == 1:
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+def _refresh_busy_days(db: Session, user_id: int, spans: Iterable[Tuple[datetime, datetime]]):
+    """
+    Recompute the user's busy_days rows for every day the (start, end) spans
+    touch, from their events as this transaction sees them. Call with the old
+    and new times of every event written, before committing.
+    """
+    days = sorted({
+        day for start, end in spans
+        if start is not None and end is not None
+        for day in utc_days(start, end)
+    })
+    if not days:
+        return
+    db.flush()
+    if db.get_bind().dialect.name == "postgresql":
+        # Serializes concurrent rewrites of the same user's days; the queries
+        # below then see every transaction that got the lock first
+        db.execute(select(func.pg_advisory_xact_lock(_BUSY_DAYS_LOCK, user_id)))
+
+    ranges = _day_ranges(days)
+    intervals = db.execute(select(models.Event.start_time, models.Event.end_time).where(
+        models.Event.user_id == user_id,
+        or_(*[
+            and_(models.Event.start_time < utc_day_start(last) + timedelta(days=1),
+                 models.Event.end_time > utc_day_start(first))
+            for first, last in ranges
+        ])
+    ))
+    masks = busy_day_masks(intervals, days)
+
+    busy_days = models.BusyDay.__table__
+    db.execute(delete(busy_days).where(
+        busy_days.c.user_id == user_id,
+        or_(*[busy_days.c.day.between(first, last) for first, last in ranges])
+    ))
+    rows = [{"user_id": user_id, "day": day, "blocks": encode_day_mask(mask)} for day, mask in masks.items() if mask]
+    if rows:
+        db.execute(insert(busy_days), rows)
+
+def _refresh_many_busy_days(db: Session, spans_by_user: Dict[int, List[Tuple[datetime, datetime]]]):
+    """
+    _refresh_busy_days for many users at once, e.g. after a batch of plans:
+    rewrites every listed user's rows from the first to the last day any of
+    the spans touch, with one read, one delete and one insert.
+    """
+    days = {
+        day for spans in spans_by_user.values() for start, end in spans
+        if start is not None and end is not None
+        for day in utc_days(start, end)
+    }
+    if not days:
+        return
+    user_ids = sorted(spans_by_user)
+    first, last = min(days), max(days)
+    db.flush()
+    if db.get_bind().dialect.name == "postgresql":
+        # In user order, so concurrent batches can't deadlock on each other's locks
+        for user_id in user_ids:
+            db.execute(select(func.pg_advisory_xact_lock(_BUSY_DAYS_LOCK, user_id)))
+
+    intervals = {user_id: [] for user_id in user_ids}
+    for user_id, start_time, end_time in db.execute(select(
+        models.Event.user_id, models.Event.start_time, models.Event.end_time
+    ).where(
+        models.Event.user_id.in_(user_ids),
+        models.Event.start_time < utc_day_start(last) + timedelta(days=1),
+        models.Event.end_time > utc_day_start(first)
+    )):
+        intervals[user_id].append((start_time, end_time))
+
+    busy_days = models.BusyDay.__table__
+    db.execute(delete(busy_days).where(busy_days.c.user_id.in_(user_ids), busy_days.c.day.between(first, last)))
+    window_days = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+    rows = [
+        {"user_id": user_id, "day": day, "blocks": encode_day_mask(mask)}
+        for user_id in user_ids
+        for day, mask in sorted(busy_day_masks(intervals[user_id], window_days).items())
+        if mask
+    ]
+    if rows:
+        db.execute(insert(busy_days), rows)
+
+def rebuild_busy_days(db: Session, user_id: Optional[int] = None, batch_size: int = 5000) -> int:
+    """
+    Recompute busy_days from scratch for one user or for everyone, e.g. after
+    importing events with raw SQL. Returns the number of rows written.
+    """
+    events = models.Event.__table__
+    busy_days = models.BusyDay.__table__
+    query = select(events.c.user_id, events.c.start_time, events.c.end_time).order_by(events.c.user_id)
+    delete_rows = delete(busy_days)
+    if user_id is not None:
+        query = query.where(events.c.user_id == user_id)
+        delete_rows = delete_rows.where(busy_days.c.user_id == user_id)
+
+    written = 0
+    try:
+        db.execute(delete_rows)
+        pending = []
+        current_user, current_intervals = None, []
+
+        def flush_user():
+            nonlocal written
+            masks = busy_day_masks(current_intervals)
+            pending.extend({"user_id": current_user, "day": day, "blocks": encode_day_mask(mask)}
+                           for day, mask in sorted(masks.items()))
+            while len(pending) >= batch_size:
+                db.execute(insert(busy_days), pending[:batch_size])
+                written += batch_size
+                del pending[:batch_size]
+
+        # Ordered by user, so each user's intervals are complete when the next begins
+        for row_user_id, start_time, end_time in db.execute(query.execution_options(yield_per=batch_size)):
+            if row_user_id != current_user:
+                if current_user is not None:
+                    flush_user()
+                current_user, current_intervals = row_user_id, []
+            current_intervals.append((start_time, end_time))
+        if current_user is not None:
+            flush_user()
+        if pending:
+            db.execute(insert(busy_days), pending)
+            written += len(pending)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return written
+
+def get_busy_intervals_from_summary(db: Session, user_id: int, start_date: datetime, end_date: datetime,
+                                    cached: bool = True) -> List[Tuple[datetime, datetime]]:
+    """
+    Busy intervals around a window read from busy_days: one row per day,
+    5-minute granularity. Memoized like get_busy_intervals; pass cached=False
+    to read the database when the result decides what gets written.
+    """
+    cache_key = busy_cache.key(user_id, start_date, end_date, "summary")
+    intervals = busy_cache.get(cache_key) if cached else None
+    if intervals is not None:
+        return intervals
+
+    # One extra day each side covers slots in non-UTC offsets and slots running past end_date
+    first_day = start_date.astimezone(timezone.utc).date() - timedelta(days=1)
+    last_day = end_date.astimezone(timezone.utc).date() + timedelta(days=1)
+    rows = db.execute(
+        select(models.BusyDay.day, models.BusyDay.blocks)
+        .where(models.BusyDay.user_id == user_id, models.BusyDay.day.between(first_day, last_day))
+        .order_by(models.BusyDay.day)
+    )
+    intervals = busy_day_intervals((day, decode_day_mask(blocks)) for day, blocks in rows)
+    # Series occurrences have no rows in busy_days; they are expanded for the same days
+    intervals = _with_series_intervals(db, user_id, utc_day_start(first_day),
+                                       utc_day_start(last_day) + timedelta(days=1), intervals)
+    return busy_cache.set(cache_key, intervals)
+
+def _insert_events(db: Session, rows: List[dict], user_id: int) -> List[models.Event]:
+    """Insert events with one multi-row INSERT ... RETURNING, without committing."""
+    if not rows:
+        return []
+    return list(db.scalars(
+        insert(models.Event).returning(models.Event, sort_by_parameter_order=True),
+        [{**row, "user_id": user_id} for row in rows]
+    ))
+
 def delete_event(db: Session, event_id: int):
     db_event = get_event(db, event_id)
     if not db_event:
         return False
+    user_id = db_event.user_id
     db.delete(db_event)
+    _refresh_busy_days(db, user_id, [(db_event.start_time, db_event.end_time)])
+    _bump_data_version(db, user_id)
     db.commit()
+    _events_changed(user_id, deleted=[event_id])
     return True
 
-def create_training_plan(db: Session, plan: schemas.TrainingPlanCreate, user_id: int):
-    # Create the training plan
+def _add_training_plan(db: Session, plan: schemas.TrainingPlanCreate, user_id: int) -> models.TrainingPlan:
+    """Stage a training plan and its preferences in the current transaction without committing."""
     db_plan = models.TrainingPlan(
         title=plan.title,
         description=plan.description,
@@ -116,29 +521,61 @@ def create_training_plan(db: Session, plan: schemas.TrainingPlanCreate, user_id:
         status=plan.status,
         user_id=user_id
     )
+    db_plan.preferences = models.PlanPreferences(**plan.preferences.model_dump())
     db.add(db_plan)
+    db.flush()
+    return db_plan
+
+def create_training_plan(db: Session, plan: schemas.TrainingPlanCreate, user_id: int):
+    # Create the training plan and its preferences together
+    db_plan = _add_training_plan(db, plan, user_id)
+    _bump_data_version(db, user_id)
     db.commit()
     db.refresh(db_plan)
-    
-    # Create the preferences
-    db_preferences = models.PlanPreferences(
-        training_plan_id=db_plan.id,
-        **plan.preferences.model_dump()
-    )
-    db.add(db_preferences)
-    db.commit()
-    db.refresh(db_preferences)
-    
     return db_plan
 
 def get_training_plan(db: Session, plan_id: int):
-    return db.query(models.TrainingPlan).filter(models.TrainingPlan.id == plan_id).first()
+    # Preferences are part of every plan response, so join them in the same query
+    return db.query(models.TrainingPlan).options(
+        joinedload(models.TrainingPlan.preferences)
+    ).filter(models.TrainingPlan.id == plan_id).first()
 
-def get_user_training_plans(db: Session, user_id: int):
-    return db.query(models.TrainingPlan).filter(models.TrainingPlan.user_id == user_id).all()
+def get_user_training_plans(db: Session, user_id: int, include_events: bool = False):
+    """
+    All of a user's plans with preferences joined in. With include_events, every
+    plan's events and series are loaded too, in a few extra queries for all
+    plans together, and each plan's series occurrences are listed with its events.
+    """
+    query = db.query(models.TrainingPlan).options(joinedload(models.TrainingPlan.preferences))
+    if include_events:
+        query = query.options(
+            selectinload(models.TrainingPlan.events),
+            selectinload(models.TrainingPlan.series).selectinload(models.EventSeries.exceptions)
+        )
+    plans = query.filter(models.TrainingPlan.user_id == user_id).all()
+    return [_with_series_events(plan) for plan in plans] if include_events else plans
+
+def _with_series_events(plan: models.TrainingPlan) -> schemas.TrainingPlanWithEvents:
+    """A plan with its stored events and the occurrences of its (finite) series, from loaded relationships."""
+    events = [schemas.Event.model_validate(event) for event in plan.events]
+    for series in plan.series:
+        exceptions = {exception.recurrence_id for exception in series.exceptions}
+        events.extend(schemas.Event(**row) for row in _series_rows(series, exceptions))
+    return schemas.TrainingPlanWithEvents.model_construct(**dict(schemas.TrainingPlan.model_validate(plan)),
+                                                          events=events)
 
 def get_training_plan_events(db: Session, plan_id: int):
-    return db.query(models.Event).filter(models.Event.training_plan_id == plan_id).all()
+    events = [schemas.Event.model_validate(event) for event in
+              db.query(models.Event).filter(models.Event.training_plan_id == plan_id).all()]
+    events.extend(schemas.Event(**row) for row in
+                  expand_series(db, None, None, models.EventSeries.training_plan_id == plan_id))
+    return events
+
+def get_training_plan_events_json(db: Session, plan_id: int) -> bytes:
+    """get_training_plan_events as ready-to-send JSON, encoded from column tuples."""
+    rows = db.execute(select(*EVENT_COLUMNS).where(models.Event.training_plan_id == plan_id)).all()
+    rows.extend(_as_tuples(expand_series(db, None, None, models.EventSeries.training_plan_id == plan_id)))
+    return dumps_rows(EVENT_FIELDS, rows)
 
 def update_training_plan_status(db: Session, plan_id: int, status: schemas.TrainingPlanStatus):
     db_plan = get_training_plan(db, plan_id)
@@ -148,88 +585,406 @@ def update_training_plan_status(db: Session, plan_id: int, status: schemas.Train
     # Convert the schema enum value to the models enum
     model_status = models.TrainingPlanStatus(status.value)
     db_plan.status = model_status
+    _bump_data_version(db, db_plan.user_id)
     db.commit()
     db.refresh(db_plan)
     return db_plan
 
+def _plan_events(db: Session, plan_id: int) -> List[tuple]:
+    """(id, start_time, end_time) of a plan's events."""
+    return db.execute(
+        select(models.Event.id, models.Event.start_time, models.Event.end_time)
+        .where(models.Event.training_plan_id == plan_id)
+    ).all()
+
+def _plan_has_series(db: Session, plan_id: int) -> bool:
+    return db.scalar(
+        select(models.EventSeries.id).where(models.EventSeries.training_plan_id == plan_id).limit(1)
+    ) is not None
+
 def delete_training_plan(db: Session, plan_id: int):
-    db_plan = get_training_plan(db, plan_id)
-    if not db_plan:
+    # One statement; the database cascades to the plan's events, series and preferences
+    plan_events = _plan_events(db, plan_id)
+    has_series = _plan_has_series(db, plan_id)
+    user_id = db.execute(
+        delete(models.TrainingPlan).where(models.TrainingPlan.id == plan_id)
+        .returning(models.TrainingPlan.user_id).execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    if user_id is not None:
+        _refresh_busy_days(db, user_id, [(start_time, end_time) for _, start_time, end_time in plan_events])
+        _bump_data_version(db, user_id)
+    db.commit()
+    if user_id is None:
         return False
+    # Clients cannot tell which listed occurrences came from the plan's series
+    _events_changed(user_id, deleted=[event_id for event_id, _, _ in plan_events], reset=has_series)
+    return True
+
+# Recurring event series
+def _session_rows(start: datetime, workout_type: str, difficulty_level: str, prep_minutes: int,
+                  duration_minutes: int, cooldown_minutes: int) -> List[dict]:
+    """Prep, workout and cooldown event rows for one plan session starting at `start`."""
+    rows = []
+    if prep_minutes > 0:
+        rows.append(dict(
+            title=f"Prep - {workout_type.title()}",
+            description="Preparation time",
+            start_time=start,
+            end_time=start + timedelta(minutes=prep_minutes),
+            event_type="prep",
+            workout_type=workout_type,
+            difficulty_level=difficulty_level
+        ))
     
-    # Delete associated events
-    db.query(models.Event).filter(models.Event.training_plan_id == plan_id).delete()
-    
-    # Delete associated preferences
-    db.query(models.PlanPreferences).filter(models.PlanPreferences.training_plan_id == plan_id).delete()
+    workout_start = start + timedelta(minutes=prep_minutes)
+    rows.append(dict(
+        title=f"{workout_type.title()} Workout",
+        description=f"{difficulty_level.title()} {workout_type} workout",
+        start_time=workout_start,
+        end_time=workout_start + timedelta(minutes=duration_minutes),
+        event_type="workout",
+        workout_type=workout_type,
+        difficulty_level=difficulty_level
+    ))
     
-    # Delete the plan
-    db.delete(db_plan)
+    if cooldown_minutes > 0:
+        cooldown_start = workout_start + timedelta(minutes=duration_minutes)
+        rows.append(dict(
+            title=f"Cooldown - {workout_type.title()}",
+            description="Cooldown time",
+            start_time=cooldown_start,
+            end_time=cooldown_start + timedelta(minutes=cooldown_minutes),
+            event_type="cooldown",
+            workout_type=workout_type,
+            difficulty_level=difficulty_level
+        ))
+    return rows
+
+def _series_length(series: models.EventSeries) -> timedelta:
+    return timedelta(minutes=(series.prep_minutes or 0) + series.duration_minutes + (series.cooldown_minutes or 0))
+
+def _series_ends_at(series: models.EventSeries) -> Optional[datetime]:
+    last_start = RecurrenceRule.parse(series.rrule).last_start(series.start_time)
+    return last_start + _series_length(series) if last_start is not None else None
+
+def _occurrence_rows(series: models.EventSeries, index: int, start: datetime) -> List[dict]:
+    """The events of one occurrence of a series, keyed like EVENT_FIELDS, with no id."""
+    if series.workout_types:
+        workout_type = series.workout_types[index % len(series.workout_types)]
+        rows = _session_rows(start, workout_type, series.difficulty_level, series.prep_minutes,
+                             series.duration_minutes, series.cooldown_minutes)
+    else:
+        rows = [dict(
+            title=series.title,
+            description=series.description,
+            start_time=start,
+            end_time=start + timedelta(minutes=series.duration_minutes),
+            event_type=series.event_type,
+            workout_type=None,
+            difficulty_level=series.difficulty_level
+        )]
+    for row in rows:
+        row.update(id=None, user_id=series.user_id, training_plan_id=series.training_plan_id,
+                   series_id=series.id, recurrence_id=start,
+                   created_at=series.created_at, updated_at=series.updated_at)
+    return rows
+
+def _series_rows(series: models.EventSeries, exceptions: set, start_date: Optional[datetime] = None,
+                 end_date: Optional[datetime] = None) -> List[dict]:
+    """
+    Events of the occurrences not in `exceptions` that lie within [start_date,
+    end_date], like the stored-event window queries. Only a series that ends
+    can be expanded without an end_date.
+    """
+    rule = RecurrenceRule.parse(series.rrule)
+    # An occurrence starting this much before the window can still have events inside it
+    after = start_date - _series_length(series) if start_date is not None else None
+    rows = []
+    for index, start in rule.occurrences(series.start_time, after=after, before=end_date):
+        if start in exceptions:
+            continue
+        rows.extend(
+            row for row in _occurrence_rows(series, index, start)
+            if (start_date is None or row["start_time"] >= start_date)
+            and (end_date is None or row["end_time"] <= end_date)
+        )
+    return rows
+
+def expand_series(db: Session, start_date: Optional[datetime], end_date: Optional[datetime],
+                  *criteria) -> List[dict]:
+    """
+    Events generated by the series matching `criteria` within [start_date,
+    end_date] (None for no bound; series without an end need end_date), as
+    dicts keyed like EVENT_FIELDS. Reads only the series overlapping the
+    window and their exceptions in it, so the cost follows the window, not
+    how long the series runs.
+    """
+    query = select(models.EventSeries).where(*criteria)
+    if end_date is not None:
+        query = query.where(models.EventSeries.start_time < end_date)
+    if start_date is not None:
+        query = query.where(or_(models.EventSeries.ends_at.is_(None), models.EventSeries.ends_at > start_date))
+    series_list = db.scalars(query.order_by(models.EventSeries.id)).all()
+    if not series_list:
+        return []
+
+    exception_query = select(models.EventSeriesException.series_id, models.EventSeriesException.recurrence_id).where(
+        models.EventSeriesException.series_id.in_([series.id for series in series_list])
+    )
+    if start_date is not None:
+        longest = max(_series_length(series) for series in series_list)
+        exception_query = exception_query.where(models.EventSeriesException.recurrence_id >= start_date - longest)
+    if end_date is not None:
+        exception_query = exception_query.where(models.EventSeriesException.recurrence_id < end_date)
+    exceptions = {}
+    for series_id, recurrence_id in db.execute(exception_query):
+        exceptions.setdefault(series_id, set()).add(recurrence_id)
+
+    rows = []
+    for series in series_list:
+        rows.extend(_series_rows(series, exceptions.get(series.id, set()), start_date, end_date))
+    return rows
+
+def _as_tuples(rows: List[dict]) -> List[tuple]:
+    return [tuple(row[field] for field in EVENT_FIELDS) for row in rows]
+
+def get_event_series(db: Session, series_id: int) -> Optional[models.EventSeries]:
+    return db.get(models.EventSeries, series_id)
+
+def create_event_series(db: Session, series: schemas.EventSeriesCreate, user_id: int) -> models.EventSeries:
+    """Store a recurring event as one row; reads expand its occurrences."""
+    db_series = models.EventSeries(**series.model_dump(), prep_minutes=0, cooldown_minutes=0, user_id=user_id)
+    db_series.ends_at = _series_ends_at(db_series)
+    db.add(db_series)
+    _bump_data_version(db, user_id)
+    db.commit()
+    db.refresh(db_series)
+    # Possibly endless, so clients refetch their window rather than receive the occurrences
+    _events_changed(user_id, reset=True)
+    return db_series
+
+def delete_event_series(db: Session, series_id: int):
+    # The database cascades to the series' exceptions and override events
+    overrides = db.execute(
+        select(models.Event.start_time, models.Event.end_time).where(models.Event.series_id == series_id)
+    ).all()
+    user_id = db.execute(
+        delete(models.EventSeries).where(models.EventSeries.id == series_id)
+        .returning(models.EventSeries.user_id).execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    if user_id is not None:
+        _refresh_busy_days(db, user_id, overrides)
+        _bump_data_version(db, user_id)
     db.commit()
+    if user_id is None:
+        return False
+    _events_changed(user_id, reset=True)
+    return True
+
+def _occurrence_index(db: Session, series: models.EventSeries, recurrence_id: datetime) -> Optional[int]:
+    """Index of the series occurrence starting at recurrence_id, or None if it has none that is still generated."""
+    rule = RecurrenceRule.parse(series.rrule)
+    for index, _ in rule.occurrences(series.start_time, after=recurrence_id,
+                                     before=recurrence_id + timedelta(microseconds=1)):
+        excepted = db.scalar(select(models.EventSeriesException.series_id).where(
+            models.EventSeriesException.series_id == series.id,
+            models.EventSeriesException.recurrence_id == recurrence_id
+        ))
+        return index if excepted is None else None
+    return None
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def update_series_occurrence(db: Session, series_id: int, recurrence_id: datetime, event: schemas.EventUpdate,
+                             event_type: Optional[str] = None) -> Optional[List[schemas.Event]]:
+    """
+    Edit one occurrence of a series. Its events are stored as override rows
+    (series_id and recurrence_id set) with the update applied to the one of
+    `event_type` (by default the workout of a plan session, or the only
+    event), and the occurrence becomes an exception so it is no longer
+    generated. Returns the stored events, or None if the series has no such
+    occurrence; raises ValueError if the occurrence has no `event_type` event.
+    """
+    series = get_event_series(db, series_id)
+    recurrence_id = _as_utc(recurrence_id)
+    index = _occurrence_index(db, series, recurrence_id) if series else None
+    if index is None:
+        return None
+
+    rows = [
+        {field: value for field, value in row.items() if field not in ("id", "user_id", "created_at", "updated_at")}
+        for row in _occurrence_rows(series, index, recurrence_id)
+    ]
+    wanted = event_type or ("workout" if len(rows) > 1 else rows[0]["event_type"])
+    target = next((row for row in rows if row["event_type"] == wanted), None)
+    if target is None:
+        raise ValueError(f"The occurrence has no {wanted!r} event")
+    target.update(event.model_dump(exclude_unset=True))
+
+    user_id = series.user_id
+    try:
+        created = _insert_events(db, rows, user_id)
+        db.add(models.EventSeriesException(series_id=series_id, recurrence_id=recurrence_id))
+        series.updated_at = func.now()
+        _refresh_busy_days(db, user_id, [(row["start_time"], row["end_time"]) for row in rows])
+        _bump_data_version(db, user_id)
+        result = [schemas.Event.model_validate(db_event) for db_event in created]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    # The generated occurrence has no id to list as deleted
+    _events_changed(user_id, reset=True)
+    return result
+
+def delete_series_occurrence(db: Session, series_id: int, recurrence_id: datetime) -> bool:
+    """Cancel one occurrence of a series by adding an exception for it."""
+    series = get_event_series(db, series_id)
+    recurrence_id = _as_utc(recurrence_id)
+    if series is None or _occurrence_index(db, series, recurrence_id) is None:
+        return False
+    user_id = series.user_id
+    db.add(models.EventSeriesException(series_id=series_id, recurrence_id=recurrence_id))
+    series.updated_at = func.now()
+    _bump_data_version(db, user_id)
+    db.commit()
+    _events_changed(user_id, reset=True)
     return True
 
 # Plan generation helper functions
+def _busy_intervals_query(user_id: int, start_date: datetime, end_date: datetime):
+    return select(models.Event.start_time, models.Event.end_time).where(
+        models.Event.user_id == user_id,
+        models.Event.start_time >= start_date,
+        models.Event.end_time <= end_date
+    ).order_by(models.Event.start_time)
+
+def get_busy_intervals(db: Session, user_id: int, start_date: datetime, end_date: datetime,
+                       cached: bool = True) -> List[Tuple[datetime, datetime]]:
+    """
+    Sorted (start, end) pairs of the user's events in a window. Memoized until
+    this process sees the user's events change, so repeated plan previews over
+    the same window read the calendar once; writes by other processes are only
+    seen once the entry expires, so pass cached=False before booking anything.
+    """
+    cache_key = busy_cache.key(user_id, start_date, end_date)
+    intervals = busy_cache.get(cache_key) if cached else None
+    if intervals is None:
+        intervals = [tuple(row) for row in db.execute(_busy_intervals_query(user_id, start_date, end_date))]
+        intervals = _with_series_intervals(db, user_id, start_date, end_date, intervals)
+        busy_cache.set(cache_key, intervals)
+    return intervals
+
+def _with_series_intervals(db: Session, user_id: int, start_date: datetime, end_date: datetime,
+                           intervals: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    """`intervals` plus the user's series occurrences in the window, sorted by start."""
+    occurrences = expand_series(db, start_date, end_date, models.EventSeries.user_id == user_id)
+    if not occurrences:
+        return intervals
+    return sorted(intervals + [(row["start_time"], row["end_time"]) for row in occurrences])
+
 def find_available_time_slots(db: Session, user_id: int, start_date: datetime, end_date: datetime, 
-                             duration_minutes: int, preferred_times: List[str]) -> List[dict]:
+                             duration_minutes: int, preferred_times: List[str],
+                             mode: str = "interval", resolution_minutes: int = 1, cached: bool = True) -> List[dict]:
     """
     Find available time slots for a user within a date range.
     Returns a list of available slots with start and end times.
+
+    `mode="bitmap"` searches the whole range with numpy in one batch, which
+    is much faster for plans spanning months (see freebusy.find_free_slots).
+    `mode="summary"` reads one busy_days row per day instead of the events,
+    rounding busy time out to whole 5-minute blocks: for durations in whole
+    multiples of 5 minutes the slots are the same as interval mode's (slots
+    start on the hour, so their edges fall on block edges), otherwise a slot
+    ending less than 5 minutes before an event can be reported busy. It also
+    sees events that straddle the edges of the range, which interval mode
+    (reading only events wholly inside it) misses.
+
+    Busy time may come from the busy-interval cache, which only this process
+    invalidates; pass cached=False when the slots will be booked.
     """
-    # Get existing events in the date range
-    existing_events = get_user_events_by_date(db, user_id, start_date, end_date)
-    
-    available_slots = []
-    current_date = start_date.date()
-    end_date_only = end_date.date()
-    
-    # Time preferences mapping
-    time_ranges = {
-        'morning': (6, 12),
-        'afternoon': (12, 18),
-        'evening': (18, 22)
-    }
-    
-    while current_date <= end_date_only:
-        for time_preference in preferred_times:
-            if time_preference in time_ranges:
-                start_hour, end_hour = time_ranges[time_preference]
-                
-                # Check each hour slot in the preferred time range
-                for hour in range(start_hour, end_hour):
-                    # Create timezone-aware datetime objects
-                    slot_start = datetime.combine(current_date, datetime.min.time().replace(hour=hour))
-                    
-                    # Make the datetime timezone-aware to match database datetimes
-                    if slot_start.tzinfo is None:
-                        slot_start = slot_start.replace(tzinfo=start_date.tzinfo or timezone.utc)
-                    
-                    slot_end = slot_start + timedelta(minutes=duration_minutes)
-                    
-                    # Check if this slot conflicts with existing events
-                    conflicts = False
-                    for event in existing_events:
-                        if (slot_start < event.end_time and slot_end > event.start_time):
-                            conflicts = True
-                            break
-                    
-                    if not conflicts:
-                        available_slots.append({
-                            'start_time': slot_start,
-                            'end_time': slot_end,
-                            'date': current_date,
-                            'time_preference': time_preference
-                        })
-        
-        current_date += timedelta(days=1)
-    
-    return available_slots
+    if mode == "summary":
+        intervals = get_busy_intervals_from_summary(db, user_id, start_date, end_date, cached=cached)
+        mode = "interval"
+    else:
+        intervals = get_busy_intervals(db, user_id, start_date, end_date, cached=cached)
+    return find_free_slots(
+        intervals,
+        start_date, end_date, duration_minutes, preferred_times,
+        mode=mode, resolution_minutes=resolution_minutes
+    )
 
-def create_training_plan_with_events(db: Session, user_id: int, 
-                                   request: schemas.PlanGenerationRequest) -> schemas.PlanGenerationResponse:
+def get_group_busy_intervals(db: Session, user_ids: List[int], start_date: datetime,
+                             end_date: datetime) -> Dict[int, List[Tuple[datetime, datetime]]]:
     """
-    Generate a complete training plan with events based on user preferences.
+    (start, end) pairs of every listed user's events overlapping a window,
+    by user id, read with one query over all of them, plus their series
+    occurrences in the window.
     """
-    # Create the training plan
+    busy = {user_id: [] for user_id in user_ids}
+    rows = db.execute(
+        select(models.Event.user_id, models.Event.start_time, models.Event.end_time)
+        .where(
+            models.Event.user_id.in_(busy),
+            models.Event.start_time < end_date,
+            models.Event.end_time > start_date
+        )
+        .order_by(models.Event.user_id, models.Event.start_time)
+    )
+    for user_id, start_time, end_time in rows:
+        busy[user_id].append((start_time, end_time))
+    for row in expand_series(db, start_date, end_date, models.EventSeries.user_id.in_(busy)):
+        busy[row["user_id"]].append((row["start_time"], row["end_time"]))
+    return busy
+
+def find_group_time_slots(db: Session, request: schemas.GroupSlotRequest) -> List[schemas.GroupSlot]:
+    """Common free slots of a group of users, ranked by how many of them are free (see freebusy.find_group_slots)."""
+    start_date, end_date = (
+        value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+        for value in (request.start_date, request.end_date)
+    )
+    busy = get_group_busy_intervals(db, request.user_ids, start_date, end_date)
+    slots = find_group_slots(
+        busy, start_date, end_date, request.duration, request.time_of_day,
+        min_available=request.min_available, step_minutes=request.step_minutes, limit=request.limit
+    )
+    return [schemas.GroupSlot(**slot) for slot in slots]
+
+def get_existing_user_ids(db: Session, user_ids: Iterable[int]) -> set:
+    return set(db.scalars(select(models.User.id).where(models.User.id.in_(set(user_ids)))))
+
+def _generate_plan(db: Session, user_id: int, request: schemas.PlanGenerationRequest, cached: bool = True):
+    """
+    Work out the plan and event rows for a request without writing anything.
+    Returns (plan_data, event_rows, workout_count, series), where series is
+    what _add_plan_series writes for a recurring plan and None otherwise.
+    """
+    total_duration = request.prep_time + request.duration + request.cooldown_time
+    available_slots = find_available_time_slots(
+        db, user_id, request.start_date, request.end_date, 
+        total_duration, [request.time_of_day], mode=PLAN_SLOT_SEARCH_MODE, cached=cached
+    )
+    return plan_for_slots(request, available_slots)
+
+def plan_busy_window(request: schemas.PlanGenerationRequest) -> Tuple[datetime, datetime]:
+    """The window whose busy time slot search for `request` can run into (a day of margin each side)."""
+    slot_tz = request.start_date.tzinfo or timezone.utc
+    return (datetime.combine(request.start_date.date() - timedelta(days=1), time(), tzinfo=slot_tz),
+            datetime.combine(request.end_date.date() + timedelta(days=2), time(), tzinfo=slot_tz))
+
+def plan_for_busy(request: schemas.PlanGenerationRequest, intervals: List[Tuple[datetime, datetime]]):
+    """
+    _generate_plan for busy intervals already read (covering plan_busy_window).
+    Touches no database, so batches can run it in worker processes.
+    """
+    total_duration = request.prep_time + request.duration + request.cooldown_time
+    available_slots = find_free_slots(intervals, request.start_date, request.end_date,
+                                      total_duration, [request.time_of_day])
+    return plan_for_slots(request, available_slots)
+
+def plan_for_slots(request: schemas.PlanGenerationRequest, available_slots: List[dict]):
+    """The _generate_plan result for a request, given its free slots."""
     plan_data = schemas.TrainingPlanCreate(
         title=f"Training Plan - {request.start_date.strftime('%Y-%m-%d')}",
         description="Auto-generated training plan",
@@ -247,76 +1002,372 @@ def create_training_plan_with_events(db: Session, user_id: int,
         )
     )
     
-    training_plan = create_training_plan(db, plan_data, user_id)
-    
-    # Find available time slots
-    total_duration = request.prep_time + request.duration + request.cooldown_time
-    available_slots = find_available_time_slots(
-        db, user_id, request.start_date, request.end_date, 
-        total_duration, [request.time_of_day]
-    )
-    
     # Filter by preferred days if specified
+    preferred_day_indices = range(7)
     if request.days_of_week:
         day_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
         preferred_day_indices = [day_names.index(day.lower()) for day in request.days_of_week if day.lower() in day_names]
         available_slots = [slot for slot in available_slots if slot['start_time'].weekday() in preferred_day_indices]
     
-    # Select the best slots based on frequency
-    selected_slots = available_slots[:request.frequency]
+    if request.recurring:
+        series, sessions = _plan_series(request, available_slots, preferred_day_indices)
+    else:
+        # Frequency is per week: spread that many sessions over each week of the plan
+        selected_slots = select_weekly_slots(available_slots, request.frequency)
+        series, sessions = None, list(enumerate(slot['start_time'] for slot in selected_slots))
     
-    # Create events for each selected slot
-    created_events = []
-    for i, slot in enumerate(selected_slots):
+    # Build prep, workout and cooldown rows for each selected slot
+    event_rows = []
+    for i, start in sessions:
         workout_type = request.workout_types[i % len(request.workout_types)]
-        
-        # Create prep event
-        if request.prep_time > 0:
-            prep_event = create_event(db, schemas.EventCreate(
-                title=f"Prep - {workout_type.title()}",
-                description="Preparation time",
-                start_time=slot['start_time'],
-                end_time=slot['start_time'] + timedelta(minutes=request.prep_time),
-                event_type="prep",
-                workout_type=workout_type,
-                difficulty_level=request.difficulty_level,
-                training_plan_id=training_plan.id
-            ), user_id)
-            created_events.append(prep_event)
-        
-        # Create main workout event
-        workout_start = slot['start_time'] + timedelta(minutes=request.prep_time)
-        workout_event = create_event(db, schemas.EventCreate(
-            title=f"{workout_type.title()} Workout",
-            description=f"{request.difficulty_level.title()} {workout_type} workout",
-            start_time=workout_start,
-            end_time=workout_start + timedelta(minutes=request.duration),
-            event_type="workout",
-            workout_type=workout_type,
-            difficulty_level=request.difficulty_level,
-            training_plan_id=training_plan.id
-        ), user_id)
-        created_events.append(workout_event)
-        
-        # Create cooldown event
-        if request.cooldown_time > 0:
-            cooldown_start = workout_start + timedelta(minutes=request.duration)
-            cooldown_event = create_event(db, schemas.EventCreate(
-                title=f"Cooldown - {workout_type.title()}",
-                description="Cooldown time",
-                start_time=cooldown_start,
-                end_time=cooldown_start + timedelta(minutes=request.cooldown_time),
-                event_type="cooldown",
-                workout_type=workout_type,
-                difficulty_level=request.difficulty_level,
-                training_plan_id=training_plan.id
-            ), user_id)
-            created_events.append(cooldown_event)
+        event_rows.extend(_session_rows(start, workout_type, request.difficulty_level,
+                                        request.prep_time, request.duration, request.cooldown_time))
     
-    message = f"Created {len(selected_slots)} workout sessions with {len(created_events)} total events"
+    return plan_data, event_rows, len(sessions), series
+
+def _plan_series(request: schemas.PlanGenerationRequest, available_slots: List[dict],
+                 preferred_days: Iterable[int]):
+    """
+    Lay a recurring plan out as one series: `frequency` of the preferred
+    weekdays spread over the week, at the hour of the preferred time of day
+    that is free on the most of them, from the first free one to the end of
+    the plan, with the days that clash as exceptions. Returns ((series
+    values, exception starts) or None if nothing is free, [(occurrence
+    index, start) of each session]).
+    """
+    weekdays = set(spread_days(sorted(set(preferred_days)), request.frequency, cyclic=True))
+    free_by_hour = {}
+    for slot in available_slots:
+        if slot['start_time'].weekday() in weekdays:
+            free_by_hour.setdefault(slot['start_time'].hour, set()).add(slot['start_time'])
+    if not free_by_hour:
+        return None, []
+    free = free_by_hour[max(sorted(free_by_hour), key=lambda hour: len(free_by_hour[hour]))]
+
+    # Occurrences repeat in UTC, where the slot hour may fall on the next or previous day
+    first = min(free)
+    shift = (first.astimezone(timezone.utc).date() - first.date()).days
+    days = tuple(sorted((day + shift) % 7 for day in weekdays))
+    rule = RecurrenceRule("DAILY") if len(days) == 7 else RecurrenceRule("WEEKLY", byday=days)
+
+    # Slot search covered every day up to and including end_date's
+    horizon = datetime.combine(request.end_date.date() + timedelta(days=1), time(), tzinfo=first.tzinfo)
+    sessions, exceptions = [], []
+    for index, start in rule.occurrences(first, before=horizon):
+        if start in free:
+            sessions.append((index, start))
+        else:
+            exceptions.append(start)
+    # The rule stops at the last free occurrence
+    count = sessions[-1][0] + 1
+    exceptions = [start for start in exceptions if start < sessions[-1][1]]
+
+    total_duration = timedelta(minutes=request.prep_time + request.duration + request.cooldown_time)
+    series = dict(
+        event_type="workout",
+        workout_types=request.workout_types,
+        difficulty_level=request.difficulty_level,
+        start_time=first.astimezone(timezone.utc),
+        prep_minutes=request.prep_time,
+        duration_minutes=request.duration,
+        cooldown_minutes=request.cooldown_time,
+        rrule=str(RecurrenceRule(rule.freq, byday=rule.byday, count=count)),
+        ends_at=sessions[-1][1] + total_duration
+    )
+    return (series, exceptions), sessions
+
+def _add_plan_series(db: Session, training_plan: models.TrainingPlan, user_id: int, series: dict,
+                     exceptions: List[datetime]) -> List[schemas.Event]:
+    """Stage a plan's series and its exceptions without committing; returns the events it generates."""
+    db_series = models.EventSeries(**series, title=training_plan.title, description=training_plan.description,
+                                   user_id=user_id, training_plan_id=training_plan.id)
+    db_series.exceptions = [models.EventSeriesException(recurrence_id=start) for start in exceptions]
+    db.add(db_series)
+    db.flush()
+    db.refresh(db_series)
+    return [schemas.Event(**row) for row in _series_rows(db_series, set(exceptions))]
+
+def preview_training_plan(db: Session, user_id: int,
+                          request: schemas.PlanGenerationRequest) -> schemas.PlanPreview:
+    """The plan and events create_training_plan_with_events would write for this request."""
+    plan_data, event_rows, workout_count, _ = _generate_plan(db, user_id, request)
+    return schemas.PlanPreview(
+        training_plan=plan_data,
+        events=[schemas.EventCreate(**row) for row in event_rows],
+        message=f"Would create {workout_count} workout sessions with {len(event_rows)} total events"
+    )
+
+def create_training_plan_with_events(db: Session, user_id: int, 
+                                   request: schemas.PlanGenerationRequest) -> schemas.PlanGenerationResponse:
+    """
+    Generate a complete training plan with events based on user preferences.
+
+    The plan, its preferences and every generated event are written in a
+    single transaction, so a failure part-way leaves nothing behind. With
+    `recurring`, the sessions are written as one series row instead.
+    """
+    # Never from the busy-interval cache: other processes' writes do not invalidate it
+    plan_data, event_rows, workout_count, series = _generate_plan(db, user_id, request, cached=False)
     
-    return schemas.PlanGenerationResponse(
-        training_plan=training_plan,
-        events=created_events,
-        message=message
-    )
\ No newline at end of file
+    try:
+        training_plan = _add_training_plan(db, plan_data, user_id)
+        if series is not None:
+            # One series row however many sessions the plan has
+            created_events = _add_plan_series(db, training_plan, user_id, *series)
+        else:
+            for row in event_rows:
+                row["training_plan_id"] = training_plan.id
+            created_events = _insert_events(db, event_rows, user_id)
+            _refresh_busy_days(db, user_id, [(row["start_time"], row["end_time"]) for row in event_rows])
+        
+        # Build the response from the returned rows before commit expires them
+        message = f"Created {workout_count} workout sessions with {len(created_events)} total events"
+        response = schemas.PlanGenerationResponse(
+            training_plan=training_plan,
+            events=created_events,
+            message=message
+        )
+        _bump_data_version(db, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    
+    _events_changed(user_id, upserted=response.events)
+    return response
+
+def create_generated_training_plans(db: Session, plans: List[tuple]) -> List[int]:
+    """
+    Write many generated plans, given as (user_id, plan_data, event_rows,
+    series) with the last three from _generate_plan, in one transaction with
+    one multi-row INSERT per table. Returns the new plan ids in order; on
+    failure nothing is written and the error is raised.
+    """
+    if not plans:
+        return []
+    try:
+        plan_ids = list(db.scalars(
+            insert(models.TrainingPlan).returning(models.TrainingPlan.id, sort_by_parameter_order=True),
+            [dict(plan_data.model_dump(exclude={"preferences"}), user_id=user_id)
+             for user_id, plan_data, _, _ in plans]
+        ))
+        db.execute(insert(models.PlanPreferences), [
+            dict(plan_data.preferences.model_dump(), training_plan_id=plan_id)
+            for plan_id, (_, plan_data, _, _) in zip(plan_ids, plans)
+        ])
+
+        event_rows = [
+            dict(row, user_id=user_id, training_plan_id=plan_id)
+            for plan_id, (user_id, _, rows, series) in zip(plan_ids, plans) if series is None
+            for row in rows
+        ]
+        if event_rows:
+            # Core insert: the rows need no ORM bookkeeping, and there can be tens of thousands
+            db.execute(insert(models.Event.__table__), event_rows)
+
+        recurring = [(plan_id, user_id, plan_data, series)
+                     for plan_id, (user_id, plan_data, _, series) in zip(plan_ids, plans) if series is not None]
+        if recurring:
+            series_ids = list(db.scalars(
+                insert(models.EventSeries).returning(models.EventSeries.id, sort_by_parameter_order=True),
+                [dict(values, title=plan_data.title, description=plan_data.description,
+                      user_id=user_id, training_plan_id=plan_id)
+                 for plan_id, user_id, plan_data, (values, _) in recurring]
+            ))
+            exception_rows = [
+                {"series_id": series_id, "recurrence_id": start}
+                for series_id, (_, _, _, (_, exceptions)) in zip(series_ids, recurring)
+                for start in exceptions
+            ]
+            if exception_rows:
+                db.execute(insert(models.EventSeriesException), exception_rows)
+
+        _refresh_many_busy_days(db, {
+            user_id: [(row["start_time"], row["end_time"]) for row in rows]
+            for user_id, _, rows, series in plans if series is None
+        })
+        _bump_data_version(db, *(user_id for user_id, _, _, _ in plans))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # Event ids were not read back, so subscribers refetch
+    for user_id in {user_id for user_id, _, _, _ in plans}:
+        _events_changed(user_id, reset=True)
+    return plan_ids
+
+# Calendar sync operations
+def create_calendar_connection(db: Session, user_id: int,
+                               connection: schemas.CalendarConnectionCreate) -> models.CalendarConnection:
+    db_connection = models.CalendarConnection(**connection.model_dump(), user_id=user_id)
+    db.add(db_connection)
+    db.commit()
+    db.refresh(db_connection)
+    return db_connection
+
+def get_calendar_connections(db: Session, user_id: Optional[int] = None,
+                             provider: Optional[str] = None) -> List[models.CalendarConnection]:
+    query = db.query(models.CalendarConnection)
+    if user_id is not None:
+        query = query.filter(models.CalendarConnection.user_id == user_id)
+    if provider is not None:
+        query = query.filter(models.CalendarConnection.provider == provider)
+    return query.order_by(models.CalendarConnection.id).all()
+
+def _upsert_statement(db: Session):
+    """INSERT ... ON CONFLICT (calendar_connection_id, external_id) DO UPDATE for the session's dialect."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    events = models.Event.__table__
+    statement = dialect_insert(events)
+    return statement.on_conflict_do_update(
+        index_elements=[events.c.calendar_connection_id, events.c.external_id],
+        set_={
+            **{column: statement.excluded[column] for column in ("title", "description", "start_time", "end_time")},
+            "updated_at": func.now(),
+        }
+    )
+
+def apply_calendar_changes(db: Session, connection_id: int, user_id: int, upserts: List[dict],
+                           cancelled_ids: List[str]) -> Tuple[int, int]:
+    """
+    Write one page of changes from an external calendar: `upserts` are event
+    rows keyed by external_id, `cancelled_ids` the external ids deleted there.
+    One bulk upsert and one delete. Returns (upserted, deleted).
+    """
+    events = models.Event.__table__
+    deleted = 0
+    try:
+        # Where the events being replaced or removed were, for busy_days
+        spans = [(row["start_time"], row["end_time"]) for row in upserts]
+        touched_ids = [row["external_id"] for row in upserts] + list(cancelled_ids)
+        if touched_ids:
+            spans += db.execute(select(events.c.start_time, events.c.end_time).where(
+                events.c.calendar_connection_id == connection_id,
+                events.c.external_id.in_(touched_ids)
+            )).all()
+        upserted_rows = []
+        if upserts:
+            upserted_rows = db.execute(_upsert_statement(db).returning(*EVENT_COLUMNS), [
+                {**row, "user_id": user_id, "calendar_connection_id": connection_id} for row in upserts
+            ]).all()
+        deleted_ids = []
+        if cancelled_ids:
+            deleted_ids = db.execute(delete(events).where(
+                events.c.calendar_connection_id == connection_id,
+                events.c.external_id.in_(cancelled_ids)
+            ).returning(events.c.id)).scalars().all()
+        _refresh_busy_days(db, user_id, spans)
+        if upserted_rows or deleted_ids:
+            _bump_data_version(db, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if upserted_rows or deleted_ids:
+        _events_changed(user_id, upserted=(schemas.Event(**dict(zip(EVENT_FIELDS, row))) for row in upserted_rows),
+                        deleted=deleted_ids)
+    return len(upserts), len(deleted_ids)
+
+def finish_calendar_sync(db: Session, connection_id: int, user_id: int, sync_token: str,
+                         credentials: Optional[dict] = None, keep_external_ids: Optional[set] = None) -> int:
+    """
+    Store the token for the next incremental sync. After a full sync, pass
+    every external id it returned as `keep_external_ids` to drop imported
+    events that no longer exist. Returns the number of events dropped.
+    """
+    events = models.Event.__table__
+    removed = []
+    try:
+        if keep_external_ids is not None:
+            stale = delete(events).where(events.c.calendar_connection_id == connection_id)
+            if keep_external_ids:
+                stale = stale.where(events.c.external_id.not_in(keep_external_ids))
+            removed = db.execute(stale.returning(events.c.id, events.c.start_time, events.c.end_time)).all()
+            _refresh_busy_days(db, user_id, [(start_time, end_time) for _, start_time, end_time in removed])
+            if removed:
+                _bump_data_version(db, user_id)
+        values = {"sync_token": sync_token, "last_synced_at": datetime.now(timezone.utc)}
+        if credentials is not None:
+            values["credentials"] = credentials
+        db.query(models.CalendarConnection).filter(
+            models.CalendarConnection.id == connection_id
+        ).update(values, synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if removed:
+        _events_changed(user_id, deleted=[event_id for event_id, _, _ in removed])
+    return len(removed)
+
+# Idempotency keys
+def get_idempotency_key(db: Session, user_id: int, scope: str, key: str) -> Optional[models.IdempotencyKey]:
+    # Always re-read: callers poll this while another request finishes
+    return db.execute(
+        select(models.IdempotencyKey).where(
+            models.IdempotencyKey.user_id == user_id,
+            models.IdempotencyKey.scope == scope,
+            models.IdempotencyKey.key == key
+        ).execution_options(populate_existing=True)
+    ).scalar_one_or_none()
+
+def claim_idempotency_key(db: Session, user_id: int, scope: str, key: str, request_hash: str,
+                          claim_token: str, lease_seconds: float) -> Optional[models.IdempotencyKey]:
+    """
+    Try to take a key for a new request. Returns None when the caller now owns
+    it (under `claim_token`) and should do the work, otherwise the record
+    another request holds.
+
+    An unfinished claim expires after `lease_seconds`, so a request that died
+    mid-way does not block the key for the full TTL; the lease must outlast
+    the slowest request, or a retry could run the work a second time.
+    """
+    now = datetime.now(timezone.utc)
+    db.query(models.IdempotencyKey).filter(models.IdempotencyKey.expires_at <= now).delete(synchronize_session=False)
+    db.add(models.IdempotencyKey(
+        user_id=user_id,
+        scope=scope,
+        key=key,
+        request_hash=request_hash,
+        claim_token=claim_token,
+        expires_at=now + timedelta(seconds=lease_seconds)
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # The unique primary key serializes concurrent claims; the loser reads the winner's row
+        db.rollback()
+        return get_idempotency_key(db, user_id, scope, key)
+    return None
+
+def _claimed_idempotency_key(db: Session, user_id: int, scope: str, key: str, claim_token: str):
+    # Only the row this claim took: after its lease lapsed the key may belong to a retry
+    return db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.user_id == user_id,
+        models.IdempotencyKey.scope == scope,
+        models.IdempotencyKey.key == key,
+        models.IdempotencyKey.claim_token == claim_token
+    )
+
+def complete_idempotency_key(db: Session, user_id: int, scope: str, key: str, claim_token: str,
+                             status_code: int, response_body: str, ttl_seconds: float):
+    _claimed_idempotency_key(db, user_id, scope, key, claim_token).update({
+        models.IdempotencyKey.status_code: status_code,
+        models.IdempotencyKey.response_body: response_body,
+        models.IdempotencyKey.expires_at: datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+    }, synchronize_session=False)
+    db.commit()
+
+def release_idempotency_key(db: Session, user_id: int, scope: str, key: str, claim_token: str):
+    """Drop a claim after its request failed so a retry can run again."""
+    # Discard whatever the failed work left in the session first
+    db.rollback()
+    _claimed_idempotency_key(db, user_id, scope, key, claim_token).delete(synchronize_session=False)
+    db.commit()
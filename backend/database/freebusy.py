@@ -0,0 +1,341 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import accumulate
+from math import ceil
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the bitmap slot search mode
+    np = None
+
+# Preferred time of day -> [start hour, end hour) searched for slots
+TIME_OF_DAY_RANGES = {
+    'morning': (6, 12),
+    'afternoon': (12, 18),
+    'evening': (18, 22)
+}
+
+SLOT_SEARCH_MODES = ("interval", "bitmap")
+
+# Daily busy summaries: one bit per 5-minute block of a UTC day
+BLOCK_MINUTES = 5
+BLOCKS_PER_DAY = 24 * 60 // BLOCK_MINUTES
+DAY_MASK_BYTES = BLOCKS_PER_DAY // 8
+
+class FreeBusy:
+    """
+    Sorted index over a user's busy intervals.
+
+    Intervals are sorted by start time once, alongside a running maximum of
+    their end times, so "does [start, end) overlap anything?" becomes a single
+    binary search instead of a scan over every event. Empty intervals (end at
+    or before start) block nothing, as in the bitmap and busy_days summaries.
+    This is the one difference from the per-event scan slot search used to
+    do, where an instant event blocked any slot it fell strictly inside.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[datetime, datetime]]):
+        ordered = sorted(
+            (start, end) for start, end in intervals
+            if start is not None and end is not None and end > start
+        )
+        self._starts: List[datetime] = [start for start, _ in ordered]
+        self._max_ends: List[datetime] = list(accumulate((end for _, end in ordered), max))
+
+    @classmethod
+    def from_events(cls, events) -> "FreeBusy":
+        return cls((event.start_time, event.end_time) for event in events)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        """Return True if no busy interval overlaps [start, end)."""
+        # Only intervals starting before `end` can overlap; of those, the one
+        # reaching furthest decides whether any of them extends past `start`.
+        count = bisect_left(self._starts, end)
+        return count == 0 or self._max_ends[count - 1] <= start
+
+class BusyBitmap:
+    """
+    Busy time as one boolean per `resolution_minutes` block from `origin` to `horizon`.
+
+    Events are rounded outwards to whole blocks, so a block is busy if any
+    event touches it. Requires numpy.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[datetime, datetime]], origin: datetime,
+                 horizon: datetime, resolution_minutes: int = 1):
+        if np is None:
+            raise RuntimeError("numpy is required for bitmap slot search")
+        if resolution_minutes < 1:
+            raise ValueError("resolution_minutes must be at least 1")
+
+        self.origin = origin
+        self.resolution_minutes = resolution_minutes
+        block_seconds = resolution_minutes * 60
+        size = max(ceil((horizon - origin).total_seconds() / block_seconds), 0)
+
+        spans = np.array(
+            [((start - origin).total_seconds(), (end - origin).total_seconds())
+             for start, end in intervals
+             if start is not None and end is not None and end > start],
+            dtype=np.float64
+        ).reshape(-1, 2)
+
+        # Mark every event at once: +1 where it starts, -1 where it ends, and
+        # a running sum gives the number of events covering each block.
+        first = np.clip(np.floor(spans[:, 0] / block_seconds), 0, size).astype(np.int64)
+        last = np.clip(np.ceil(spans[:, 1] / block_seconds), 0, size).astype(np.int64)
+        edges = np.zeros(size + 1, dtype=np.int64)
+        np.add.at(edges, first, 1)
+        np.add.at(edges, last, -1)
+        self.busy = np.cumsum(edges[:-1]) > 0
+
+    def free_window_starts(self, duration_minutes: int):
+        """Boolean array, True at every block where `duration_minutes` of free time begins."""
+        width = -(-duration_minutes // self.resolution_minutes)
+        size = len(self.busy)
+        busy_before = np.concatenate(([0], np.cumsum(self.busy, dtype=np.int64)))
+
+        free = np.zeros(size, dtype=bool)
+        if width <= size:
+            fits = size - width + 1
+            free[:fits] = busy_before[width:] == busy_before[:fits]
+        return free
+
+def find_free_slots(intervals: Iterable[Tuple[datetime, datetime]], start_date: datetime,
+                    end_date: datetime, duration_minutes: int, preferred_times: List[str],
+                    mode: str = "interval", resolution_minutes: int = 1) -> List[dict]:
+    """
+    Find hourly slots in the preferred times of day that don't overlap any busy interval.
+
+    `mode="interval"` checks each candidate against a FreeBusy index.
+    `mode="bitmap"` marks busy time into a numpy array and checks every
+    candidate in one pass, which is much faster over long ranges; events are
+    rounded out to `resolution_minutes` blocks, so it can only be stricter
+    than interval mode (identical for events on minute boundaries at the
+    default resolution).
+    """
+    if mode not in SLOT_SEARCH_MODES:
+        raise ValueError(f"Unknown slot search mode: {mode}")
+
+    slot_tz = start_date.tzinfo or timezone.utc
+    # Bitmap offsets are absolute minutes, which only line up with wall-clock
+    # hours under a fixed UTC offset; zone-aware (DST) ranges use interval mode.
+    if mode == "bitmap" and slot_tz.utcoffset(None) is not None:
+        return _bitmap_free_slots(intervals, start_date.date(), end_date.date(), slot_tz,
+                                  duration_minutes, preferred_times, resolution_minutes)
+
+    busy = FreeBusy(intervals)
+    available_slots = []
+    current_date = start_date.date()
+    end_date_only = end_date.date()
+    duration = timedelta(minutes=duration_minutes)
+
+    while current_date <= end_date_only:
+        for time_preference in preferred_times:
+            if time_preference in TIME_OF_DAY_RANGES:
+                start_hour, end_hour = TIME_OF_DAY_RANGES[time_preference]
+
+                # Check each hour slot in the preferred time range
+                for hour in range(start_hour, end_hour):
+                    # Timezone-aware to match database datetimes
+                    slot_start = datetime.combine(current_date, datetime.min.time().replace(hour=hour), tzinfo=slot_tz)
+                    slot_end = slot_start + duration
+
+                    if busy.is_free(slot_start, slot_end):
+                        available_slots.append({
+                            'start_time': slot_start,
+                            'end_time': slot_end,
+                            'date': current_date,
+                            'time_preference': time_preference
+                        })
+
+        current_date += timedelta(days=1)
+
+    return available_slots
+
+def _bitmap_free_slots(intervals, first_day: date, last_day: date, slot_tz, duration_minutes: int,
+                       preferred_times: List[str], resolution_minutes: int) -> List[dict]:
+    if 60 % resolution_minutes:
+        raise ValueError("resolution_minutes must divide an hour")
+
+    candidates = [
+        (time_preference, hour)
+        for time_preference in preferred_times if time_preference in TIME_OF_DAY_RANGES
+        for hour in range(*TIME_OF_DAY_RANGES[time_preference])
+    ]
+    day_count = (last_day - first_day).days + 1
+    if day_count <= 0 or not candidates:
+        return []
+
+    origin = datetime.combine(first_day, datetime.min.time(), tzinfo=slot_tz)
+    horizon = origin + timedelta(days=day_count, minutes=duration_minutes)
+    bitmap = BusyBitmap(intervals, origin, horizon, resolution_minutes)
+    free = bitmap.free_window_starts(duration_minutes)
+
+    # Block index of every candidate slot, one row per day in date order and
+    # one column per (preference, hour) in the order the interval mode visits them.
+    candidate_minutes = np.array([hour * 60 for _, hour in candidates], dtype=np.int64)
+    offsets = (np.arange(day_count, dtype=np.int64)[:, None] * 1440 + candidate_minutes[None, :]) // resolution_minutes
+    day_indices, candidate_indices = np.nonzero(free[offsets])
+
+    duration = timedelta(minutes=duration_minutes)
+    available_slots = []
+    for day_index, candidate_index in zip(day_indices.tolist(), candidate_indices.tolist()):
+        time_preference, hour = candidates[candidate_index]
+        slot_date = first_day + timedelta(days=day_index)
+        slot_start = datetime.combine(slot_date, datetime.min.time().replace(hour=hour), tzinfo=slot_tz)
+        available_slots.append({
+            'start_time': slot_start,
+            'end_time': slot_start + duration,
+            'date': slot_date,
+            'time_preference': time_preference
+        })
+    return available_slots
+
+def utc_day_start(day: date) -> datetime:
+    return datetime.combine(day, time(), tzinfo=timezone.utc)
+
+def _as_utc(value: datetime) -> datetime:
+    # Naive datetimes are stored and compared as UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def utc_days(start: datetime, end: datetime) -> List[date]:
+    """The UTC days [start, end) touches."""
+    start, end = _as_utc(start), _as_utc(end)
+    if end <= start:
+        return []
+    first = start.date()
+    last = (end - timedelta(microseconds=1)).date()
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+def busy_day_masks(intervals: Iterable[Tuple[datetime, datetime]], days=None) -> dict:
+    """
+    Busy bitmask per UTC day: bit i is set if any interval overlaps the i-th
+    5-minute block of the day. Only `days` are computed when given, otherwise
+    every day an interval touches.
+    """
+    wanted = set(days) if days is not None else None
+    block = timedelta(minutes=BLOCK_MINUTES)
+    masks = {}
+    for start, end in intervals:
+        if start is None or end is None:
+            continue
+        start, end = _as_utc(start), _as_utc(end)
+        for day in utc_days(start, end):
+            if wanted is not None and day not in wanted:
+                continue
+            day_start = utc_day_start(day)
+            first = max(start - day_start, timedelta(0)) // block
+            last = -(-min(end - day_start, timedelta(days=1)) // block)
+            masks[day] = masks.get(day, 0) | (((1 << (last - first)) - 1) << first)
+    return masks
+
+def encode_day_mask(mask: int) -> bytes:
+    return mask.to_bytes(DAY_MASK_BYTES, "little")
+
+def decode_day_mask(blocks: bytes) -> int:
+    return int.from_bytes(blocks, "little")
+
+def busy_day_intervals(day_masks: Iterable[Tuple[date, int]]) -> List[Tuple[datetime, datetime]]:
+    """Turn (day, mask) pairs, in day order, back into merged busy intervals."""
+    block = timedelta(minutes=BLOCK_MINUTES)
+    intervals = []
+    for day, mask in day_masks:
+        day_start = utc_day_start(day)
+        while mask:
+            low = (mask & -mask).bit_length() - 1
+            shifted = mask >> low
+            run = (shifted ^ (shifted + 1)).bit_length() - 1
+            mask &= ~(((1 << run) - 1) << low)
+            start, end = day_start + low * block, day_start + (low + run) * block
+            if intervals and intervals[-1][1] == start:
+                intervals[-1] = (intervals[-1][0], end)
+            else:
+                intervals.append((start, end))
+    return intervals
+
+def merge_busy(intervals: Iterable[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    """
+    Disjoint busy spans in start order covering `intervals`; overlapping or
+    touching spans are joined and empty ones dropped.
+    """
+    merged = []
+    for start, end in sorted((start, end) for start, end in intervals
+                             if start is not None and end is not None and end > start):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def _blocked_starts(spans: List[Tuple[datetime, datetime]], duration: timedelta) -> List[Tuple[datetime, datetime]]:
+    """
+    Disjoint open intervals (start, end) of the slot starts that one user's
+    disjoint spans rule out for slots of `duration`: a span [a, b) blocks
+    every slot starting after a - duration and before b.
+    """
+    blocked = []
+    for start, end in spans:
+        if blocked and start - duration < blocked[-1][1]:
+            blocked[-1] = (blocked[-1][0], end)
+        else:
+            blocked.append((start - duration, end))
+    return blocked
+
+def find_group_slots(busy_by_user: Dict[int, Iterable[Tuple[datetime, datetime]]], start_date: datetime,
+                     end_date: datetime, duration_minutes: int, preferred_times: List[str],
+                     min_available: Optional[int] = None, step_minutes: int = 30, limit: int = 20) -> List[dict]:
+    """
+    Slots of `duration_minutes` within [start_date, end_date], starting every
+    `step_minutes` in the preferred times of day, when at least `min_available`
+    of the users (default: all) are free. Ranked by how many are free, then
+    by start time. Only counts are returned, never who is busy.
+    """
+    spans = {user_id: merge_busy(intervals) for user_id, intervals in busy_by_user.items()}
+    user_count = len(spans)
+    required = user_count if min_available is None else min_available
+    duration = timedelta(minutes=duration_minutes)
+
+    # Each user's blocked ranges are disjoint and sorted, so a k-way merge of
+    # their edges (O(n log k) for n spans across k users) gives every range's
+    # edges in order, and the users busy for a slot starting at t are the
+    # ranges opened before t minus those closed by t
+    blocked = [_blocked_starts(user_spans, duration) for user_spans in spans.values()]
+    opens = list(heapq.merge(*([start for start, _ in ranges] for ranges in blocked)))
+    closes = list(heapq.merge(*([end for _, end in ranges] for ranges in blocked)))
+
+    slot_tz = start_date.tzinfo or timezone.utc
+    step = timedelta(minutes=step_minutes)
+    candidates = []
+    current_date = start_date.date()
+    while current_date <= end_date.date():
+        midnight = datetime.combine(current_date, time(), tzinfo=slot_tz)
+        for time_preference in dict.fromkeys(preferred_times):
+            if time_preference not in TIME_OF_DAY_RANGES:
+                continue
+            start_hour, end_hour = TIME_OF_DAY_RANGES[time_preference]
+            slot_start = midnight + timedelta(hours=start_hour)
+            while slot_start < midnight + timedelta(hours=end_hour):
+                slot_end = slot_start + duration
+                if start_date <= slot_start and slot_end <= end_date:
+                    available = user_count - (bisect_left(opens, slot_start) - bisect_right(closes, slot_start))
+                    if available >= required:
+                        candidates.append((-available, slot_start, slot_end, time_preference))
+                slot_start += step
+        current_date += timedelta(days=1)
+
+    return [
+        {
+            'start_time': slot_start,
+            'end_time': slot_end,
+            'time_preference': time_preference,
+            'available_count': -negative_available
+        }
+        for negative_available, slot_start, slot_end, time_preference in heapq.nsmallest(limit, candidates)
+    ]
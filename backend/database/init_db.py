@@ -1,9 +1,10 @@
 from .database import engine, Base
-from . import models
+from . import models, migrations
 
 def init_db():
-    # Create tables
+    # Create tables, then bring existing ones up to date
     Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
 
 if __name__ == "__main__":
     print("Creating database tables...")
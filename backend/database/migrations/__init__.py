@@ -0,0 +1,66 @@
+"""
+Versioned schema migrations.
+
+Base.metadata.create_all only creates missing tables, so changes to tables
+that already exist ship here as numbered modules (v0001_*.py, v0002_*.py, ...).
+Each module defines a `description` and an `upgrade(connection)` function, and
+may set `transactional = False` for statements such as
+CREATE INDEX CONCURRENTLY that cannot run inside a transaction. Applied
+versions are recorded in the schema_migrations table.
+
+Apply pending migrations from the backend directory with:
+    python -m database.migrations
+"""
+import importlib
+import pkgutil
+import re
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import func
+
+_VERSION_MODULE = re.compile(r"^v(\d{4})_\w+$")
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now())
+)
+
+def available_migrations():
+    """Return (version, module) pairs for every migration in this package, in order."""
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        match = _VERSION_MODULE.match(module_info.name)
+        if match:
+            module = importlib.import_module(f"{__name__}.{module_info.name}")
+            migrations.append((int(match.group(1)), module))
+    return sorted(migrations, key=lambda migration: migration[0])
+
+def applied_versions(engine: Engine):
+    with engine.begin() as connection:
+        schema_migrations.create(connection, checkfirst=True)
+        return set(connection.scalars(select(schema_migrations.c.version)))
+
+def upgrade(engine: Engine = None):
+    """Apply every pending migration in version order. Returns the versions applied."""
+    if engine is None:
+        from ..database import engine
+
+    applied = applied_versions(engine)
+    newly_applied = []
+    for version, module in available_migrations():
+        if version in applied:
+            continue
+
+        if getattr(module, "transactional", True):
+            with engine.begin() as connection:
+                module.upgrade(connection)
+                connection.execute(insert(schema_migrations).values(version=version, description=module.description))
+        else:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                module.upgrade(connection)
+                connection.execute(insert(schema_migrations).values(version=version, description=module.description))
+        newly_applied.append(version)
+    return newly_applied
@@ -0,0 +1,9 @@
+from . import upgrade
+
+if __name__ == "__main__":
+    print("Applying database migrations...")
+    applied = upgrade()
+    if applied:
+        print(f"Applied migrations: {', '.join(str(version) for version in applied)}")
+    else:
+        print("Database is up to date.")
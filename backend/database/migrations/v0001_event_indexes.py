@@ -0,0 +1,17 @@
+from sqlalchemy import text
+
+description = "Composite time window and training plan indexes on events"
+
+# Built CONCURRENTLY on PostgreSQL so existing tables stay writable
+transactional = False
+
+INDEXES = {
+    "ix_events_user_id_start_time": "events (user_id, start_time)",
+    "ix_events_user_id_end_time": "events (user_id, end_time)",
+    "ix_events_training_plan_id": "events (training_plan_id)",
+}
+
+def upgrade(connection):
+    concurrently = "CONCURRENTLY " if connection.dialect.name == "postgresql" else ""
+    for name, target in INDEXES.items():
+        connection.execute(text(f"CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {target}"))
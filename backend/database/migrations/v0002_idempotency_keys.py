@@ -0,0 +1,6 @@
+from .. import models
+
+description = "Idempotency keys table"
+
+def upgrade(connection):
+    models.IdempotencyKey.__table__.create(connection, checkfirst=True)
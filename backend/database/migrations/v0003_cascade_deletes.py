@@ -0,0 +1,39 @@
+from sqlalchemy import inspect, text
+
+description = "ON DELETE CASCADE on event, plan, preference and idempotency key foreign keys"
+
+# (table, column, referenced table)
+FOREIGN_KEYS = [
+    ("training_plans", "user_id", "users"),
+    ("events", "user_id", "users"),
+    ("events", "training_plan_id", "training_plans"),
+    ("plan_preferences", "training_plan_id", "training_plans"),
+    ("idempotency_keys", "user_id", "users"),
+]
+
+# Each statement commits on its own, so the ALTER's ACCESS EXCLUSIVE lock is
+# released before VALIDATE scans the table under a weaker lock
+transactional = False
+
+def upgrade(connection):
+    # SQLite cannot alter constraints; its (throwaway benchmark) databases get
+    # the cascades from create_all when they are recreated
+    if connection.dialect.name != "postgresql":
+        return
+
+    inspector = inspect(connection)
+    for table, column, referred_table in FOREIGN_KEYS:
+        for foreign_key in inspector.get_foreign_keys(table):
+            if foreign_key["constrained_columns"] == [column] and foreign_key["referred_table"] == referred_table:
+                if (foreign_key.get("options") or {}).get("ondelete", "").upper() == "CASCADE":
+                    break
+                name = foreign_key["name"]
+                # NOT VALID makes the ALTER skip the full-table check, so its lock is
+                # brief; VALIDATE then checks the rows while reads and writes go on
+                connection.execute(text(
+                    f"ALTER TABLE {table} DROP CONSTRAINT {name}, "
+                    f"ADD CONSTRAINT {name} FOREIGN KEY ({column}) "
+                    f"REFERENCES {referred_table} (id) ON DELETE CASCADE NOT VALID"
+                ))
+                connection.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}"))
+                break
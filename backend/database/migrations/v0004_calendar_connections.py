@@ -0,0 +1,25 @@
+from sqlalchemy import inspect, text
+from .. import models
+
+description = "Calendar connections and imported event columns"
+
+# The unique index is built CONCURRENTLY on PostgreSQL so events stay writable
+transactional = False
+
+def upgrade(connection):
+    models.CalendarConnection.__table__.create(connection, checkfirst=True)
+
+    columns = {column["name"] for column in inspect(connection).get_columns("events")}
+    if "calendar_connection_id" not in columns:
+        connection.execute(text(
+            "ALTER TABLE events ADD COLUMN calendar_connection_id INTEGER "
+            "REFERENCES calendar_connections (id) ON DELETE CASCADE"
+        ))
+    if "external_id" not in columns:
+        connection.execute(text("ALTER TABLE events ADD COLUMN external_id VARCHAR"))
+
+    concurrently = "CONCURRENTLY " if connection.dialect.name == "postgresql" else ""
+    connection.execute(text(
+        f"CREATE UNIQUE INDEX {concurrently}IF NOT EXISTS ix_events_calendar_connection_id_external_id "
+        f"ON events (calendar_connection_id, external_id)"
+    ))
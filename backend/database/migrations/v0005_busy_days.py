@@ -0,0 +1,8 @@
+from sqlalchemy.orm import Session
+from .. import crud, models
+
+description = "Daily busy bitmask summaries, built from existing events"
+
+def upgrade(connection):
+    models.BusyDay.__table__.create(connection, checkfirst=True)
+    crud.rebuild_busy_days(Session(bind=connection))
@@ -0,0 +1,23 @@
+from sqlalchemy import inspect, text
+from .. import models
+
+description = "Recurring event series, their exceptions and override event columns"
+
+# The series index is built CONCURRENTLY on PostgreSQL so events stay writable
+transactional = False
+
+def upgrade(connection):
+    models.EventSeries.__table__.create(connection, checkfirst=True)
+    models.EventSeriesException.__table__.create(connection, checkfirst=True)
+
+    columns = {column["name"] for column in inspect(connection).get_columns("events")}
+    if "series_id" not in columns:
+        connection.execute(text(
+            "ALTER TABLE events ADD COLUMN series_id INTEGER "
+            "REFERENCES event_series (id) ON DELETE CASCADE"
+        ))
+    if "recurrence_id" not in columns:
+        connection.execute(text("ALTER TABLE events ADD COLUMN recurrence_id TIMESTAMP WITH TIME ZONE"))
+
+    concurrently = "CONCURRENTLY " if connection.dialect.name == "postgresql" else ""
+    connection.execute(text(f"CREATE INDEX {concurrently}IF NOT EXISTS ix_events_series_id ON events (series_id)"))
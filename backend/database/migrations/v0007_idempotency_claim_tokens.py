@@ -0,0 +1,8 @@
+from sqlalchemy import inspect, text
+
+description = "Owner token on idempotency key claims"
+
+def upgrade(connection):
+    columns = {column["name"] for column in inspect(connection).get_columns("idempotency_keys")}
+    if "claim_token" not in columns:
+        connection.execute(text("ALTER TABLE idempotency_keys ADD COLUMN claim_token VARCHAR(32)"))
@@ -0,0 +1,8 @@
+from sqlalchemy import inspect, text
+
+description = "Per-user data version counter for ETags"
+
+def upgrade(connection):
+    columns = {column["name"] for column in inspect(connection).get_columns("users")}
+    if "data_version" not in columns:
+        connection.execute(text("ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0"))
@@ -1,10 +1,32 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, JSON, Enum
+from sqlalchemy import Boolean, Column, Date, ForeignKey, Integer, LargeBinary, String, DateTime, Text, JSON, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
+from datetime import timezone
 import enum
 
 from .database import Base
 
+class UTCDateTime(TypeDecorator):
+    """
+    DateTime(timezone=True) that always reads back timezone-aware values.
+
+    PostgreSQL already does this. SQLite (used for local benchmarks) stores
+    no offset, so values are written as UTC and read back tagged as UTC.
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None and dialect.name == "sqlite":
+            value = value.astimezone(timezone.utc)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
 class User(Base):
     __tablename__ = "users"
 
@@ -13,12 +35,18 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Incremented by every transaction that changes the user's events, series
+    # or plans; conditional GETs build their ETags from it
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(UTCDateTime, server_default=func.now())
+    updated_at = Column(UTCDateTime, onupdate=func.now())
 
-    # Relationships
-    events = relationship("Event", back_populates="user")
-    training_plans = relationship("TrainingPlan", back_populates="user")
+    # Relationships; the database deletes children through ON DELETE CASCADE,
+    # so passive_deletes keeps the ORM from loading them first
+    events = relationship("Event", back_populates="user", cascade="all, delete", passive_deletes=True)
+    training_plans = relationship("TrainingPlan", back_populates="user", cascade="all, delete", passive_deletes=True)
+    calendar_connections = relationship("CalendarConnection", back_populates="user", cascade="all, delete",
+                                        passive_deletes=True)
 
 class TrainingPlanStatus(enum.Enum):
     draft = "draft"
@@ -32,43 +60,97 @@ class TrainingPlan(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     description = Column(Text, nullable=True)
-    start_date = Column(DateTime(timezone=True))
-    end_date = Column(DateTime(timezone=True))
+    start_date = Column(UTCDateTime)
+    end_date = Column(UTCDateTime)
     status = Column(Enum(TrainingPlanStatus), default=TrainingPlanStatus.active)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    created_at = Column(UTCDateTime, server_default=func.now())
+    updated_at = Column(UTCDateTime, onupdate=func.now())
 
     # Relationships
     user = relationship("User", back_populates="training_plans")
-    events = relationship("Event", back_populates="training_plan")
-    preferences = relationship("PlanPreferences", back_populates="training_plan", uselist=False)
+    events = relationship("Event", back_populates="training_plan", cascade="all, delete", passive_deletes=True)
+    preferences = relationship("PlanPreferences", back_populates="training_plan", uselist=False,
+                               cascade="all, delete", passive_deletes=True)
+    series = relationship("EventSeries", back_populates="training_plan", cascade="all, delete", passive_deletes=True)
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Per-user time window lookups (calendar views, slot search)
+        Index("ix_events_user_id_start_time", "user_id", "start_time"),
+        Index("ix_events_user_id_end_time", "user_id", "end_time"),
+        # Upsert target for events imported from an external calendar
+        Index("ix_events_calendar_connection_id_external_id", "calendar_connection_id", "external_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     description = Column(Text, nullable=True)
-    start_time = Column(DateTime(timezone=True))
-    end_time = Column(DateTime(timezone=True))
-    user_id = Column(Integer, ForeignKey("users.id"))
-    training_plan_id = Column(Integer, ForeignKey("training_plans.id"), nullable=True)  # Nullable for manual events
+    start_time = Column(UTCDateTime)
+    end_time = Column(UTCDateTime)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    training_plan_id = Column(Integer, ForeignKey("training_plans.id", ondelete="CASCADE"), nullable=True, index=True)  # Nullable for manual events
     event_type = Column(String, nullable=True)  # 'workout', 'prep', 'cooldown', etc.
     workout_type = Column(String, nullable=True)  # 'cycling', 'running', etc.
     difficulty_level = Column(String, nullable=True)  # 'easy', 'moderate', 'hard', 'expert'
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Set on events imported from an external calendar; null for the app's own events
+    calendar_connection_id = Column(Integer, ForeignKey("calendar_connections.id", ondelete="CASCADE"), nullable=True)
+    external_id = Column(String, nullable=True)  # the provider's event id
+    # Set on events that replace one occurrence of a series (an override): the
+    # series and the original start of the occurrence they replace
+    series_id = Column(Integer, ForeignKey("event_series.id", ondelete="CASCADE"), nullable=True, index=True)
+    recurrence_id = Column(UTCDateTime, nullable=True)
+    created_at = Column(UTCDateTime, server_default=func.now())
+    updated_at = Column(UTCDateTime, onupdate=func.now())
 
     # Relationships
     user = relationship("User", back_populates="events")
     training_plan = relationship("TrainingPlan", back_populates="events")
 
+class EventSeries(Base):
+    """
+    Recurring events stored as one row: a template, the first occurrence's
+    start and a recurrence rule (see recurrence.py), expanded only for the
+    windows that are read. A series with workout_types expands each
+    occurrence into a plan session (prep, workout and cooldown events, the
+    workout type rotating per occurrence); otherwise into one event.
+    """
+    __tablename__ = "event_series"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    training_plan_id = Column(Integer, ForeignKey("training_plans.id", ondelete="CASCADE"), nullable=True, index=True)
+    title = Column(String)
+    description = Column(Text, nullable=True)
+    event_type = Column(String, nullable=True)
+    workout_types = Column(JSON, nullable=True)
+    difficulty_level = Column(String, nullable=True)
+    start_time = Column(UTCDateTime)  # start of the first occurrence
+    prep_minutes = Column(Integer, default=0)
+    duration_minutes = Column(Integer)
+    cooldown_minutes = Column(Integer, default=0)
+    rrule = Column(String(255))
+    # End of the last occurrence, or null if the rule never ends; bounds window queries
+    ends_at = Column(UTCDateTime, nullable=True)
+    created_at = Column(UTCDateTime, server_default=func.now())
+    updated_at = Column(UTCDateTime, onupdate=func.now())
+
+    training_plan = relationship("TrainingPlan", back_populates="series")
+    exceptions = relationship("EventSeriesException", cascade="all, delete", passive_deletes=True)
+
+class EventSeriesException(Base):
+    """An occurrence of a series that is not generated: cancelled, or replaced by override events."""
+    __tablename__ = "event_series_exceptions"
+
+    series_id = Column(Integer, ForeignKey("event_series.id", ondelete="CASCADE"), primary_key=True)
+    recurrence_id = Column(UTCDateTime, primary_key=True)  # original start of the occurrence
+
 class PlanPreferences(Base):
     __tablename__ = "plan_preferences"
 
     id = Column(Integer, primary_key=True, index=True)
-    training_plan_id = Column(Integer, ForeignKey("training_plans.id"))
+    training_plan_id = Column(Integer, ForeignKey("training_plans.id", ondelete="CASCADE"))
     frequency = Column(Integer)  # workouts per week
     time_of_day = Column(String)  # 'morning', 'afternoon', 'evening'
     duration = Column(Integer)  # workout duration in minutes
@@ -77,8 +159,56 @@ class PlanPreferences(Base):
     workout_types = Column(JSON)  # list of workout types
     difficulty_level = Column(String)  # 'easy', 'moderate', 'hard', 'expert'
     days_of_week = Column(JSON)  # preferred days of week
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(UTCDateTime, server_default=func.now())
+    updated_at = Column(UTCDateTime, onupdate=func.now())
 
     # Relationships
     training_plan = relationship("TrainingPlan", back_populates="preferences")
+
+class IdempotencyKey(Base):
+    """The stored outcome of a POST sent with an Idempotency-Key header."""
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    scope = Column(String, primary_key=True)  # method and path, e.g. 'POST /calendar/events'
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64))  # a reused key must come with the same request
+    # Random token of the request holding the claim; only it may complete or release the key
+    claim_token = Column(String(32), nullable=True)
+    status_code = Column(Integer, nullable=True)  # null while the first request is still running
+    response_body = Column(Text, nullable=True)
+    created_at = Column(UTCDateTime, server_default=func.now())
+    expires_at = Column(UTCDateTime, index=True)
+
+class CalendarConnection(Base):
+    """An external calendar whose events are imported into a user's events."""
+    __tablename__ = "calendar_connections"
+    __table_args__ = (
+        Index("ix_calendar_connections_user_id_provider_calendar_id", "user_id", "provider", "calendar_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    provider = Column(String)  # 'google'
+    calendar_id = Column(String, default="primary")
+    credentials = Column(JSON)  # provider-specific, e.g. Google authorized user info
+    sync_token = Column(String, nullable=True)  # null until the first full sync completes
+    last_synced_at = Column(UTCDateTime, nullable=True)
+    created_at = Column(UTCDateTime, server_default=func.now())
+    updated_at = Column(UTCDateTime, onupdate=func.now())
+
+    # Relationships
+    user = relationship("User", back_populates="calendar_connections")
+    events = relationship("Event", cascade="all, delete", passive_deletes=True)
+
+class BusyDay(Base):
+    """
+    A user's busy time for one UTC day as a bitmask of 5-minute blocks
+    (see freebusy.busy_day_masks), kept in step with their events so slot
+    search can read one small row per day. Days with nothing busy have no row.
+    """
+    __tablename__ = "busy_days"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    blocks = Column(LargeBinary)
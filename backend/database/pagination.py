@@ -0,0 +1,28 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List
+
+# Keyset pagination: a cursor is the sort key of the last row on the previous
+# page, made opaque so clients treat it as a token rather than build their own.
+
+def encode_cursor(*key: Any) -> str:
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor: str, *types: type) -> List[Any]:
+    """Decode a cursor into values of the given types; raises ValueError if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Invalid cursor")
+
+    key = []
+    for value, value_type in zip(values, types):
+        try:
+            key.append(datetime.fromisoformat(value) if value_type is datetime else value_type(value))
+        except (ValueError, TypeError) as e:
+            raise ValueError("Invalid cursor") from e
+    return key
@@ -0,0 +1,163 @@
+"""
+Recurrence rules for event series, expanded lazily for whichever window is read.
+
+Supports the subset of RFC 5545 RRULE the planner needs:
+
+    FREQ=DAILY or FREQ=WEEKLY, INTERVAL=n, BYDAY=MO,WE,... (weekly only),
+    and at most one of COUNT=n or UNTIL=YYYYMMDDTHHMMSSZ
+
+Every occurrence is at the series start's time of day in UTC. The series
+start is the first occurrence, so for weekly rules it must fall on one of
+the BYDAY days.
+"""
+from dataclasses import dataclass, replace
+from datetime import datetime, time, timedelta, timezone
+from typing import Iterator, Optional, Tuple
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+FREQUENCIES = ("DAILY", "WEEKLY")
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    freq: str
+    interval: int = 1
+    byday: Tuple[int, ...] = ()  # weekdays, Monday = 0
+    count: Optional[int] = None
+    until: Optional[datetime] = None
+
+    def __post_init__(self):
+        if self.freq not in FREQUENCIES:
+            raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+        if self.interval < 1:
+            raise ValueError("INTERVAL must be at least 1")
+        if self.byday and self.freq != "WEEKLY":
+            raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+        if self.count is not None and self.until is not None:
+            raise ValueError("COUNT and UNTIL cannot both be set")
+        if self.count is not None and self.count < 1:
+            raise ValueError("COUNT must be at least 1")
+        object.__setattr__(self, "byday", tuple(sorted(set(self.byday))))
+
+    @classmethod
+    def parse(cls, text: str) -> "RecurrenceRule":
+        parts = {}
+        for part in text.strip().removeprefix("RRULE:").split(";"):
+            name, _, value = part.partition("=")
+            if not value:
+                raise ValueError(f"Malformed rule part {part!r}")
+            parts[name.upper()] = value.upper()
+
+        unsupported = set(parts) - {"FREQ", "INTERVAL", "BYDAY", "COUNT", "UNTIL"}
+        if unsupported:
+            raise ValueError(f"Unsupported rule parts: {', '.join(sorted(unsupported))}")
+        if "FREQ" not in parts:
+            raise ValueError("FREQ is required")
+        try:
+            return cls(
+                freq=parts["FREQ"],
+                interval=int(parts.get("INTERVAL", 1)),
+                byday=tuple(_weekday(day) for day in parts["BYDAY"].split(",")) if "BYDAY" in parts else (),
+                count=int(parts["COUNT"]) if "COUNT" in parts else None,
+                until=_parse_until(parts["UNTIL"]) if "UNTIL" in parts else None
+            )
+        except ValueError as e:
+            raise ValueError(f"Invalid rule {text!r}: {e}") from None
+
+    def __str__(self) -> str:
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.byday:
+            parts.append("BYDAY=" + ",".join(WEEKDAYS[day] for day in self.byday))
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        if self.until is not None:
+            parts.append(f"UNTIL={self.until.strftime('%Y%m%dT%H%M%SZ')}")
+        return ";".join(parts)
+
+    def check_start(self, dtstart: datetime) -> None:
+        """Raise ValueError unless `dtstart` can start a series with this rule."""
+        if self.byday and _as_utc(dtstart).weekday() not in self.byday:
+            raise ValueError("The series start must fall on one of the BYDAY days")
+        if next(self.occurrences(dtstart), None) is None:
+            raise ValueError("The rule has no occurrences")
+
+    def occurrences(self, dtstart: datetime, after: Optional[datetime] = None,
+                    before: Optional[datetime] = None) -> Iterator[Tuple[int, datetime]]:
+        """
+        (index, start) of each occurrence starting in [after, before), where
+        index counts occurrences from the series start. Skips straight to
+        `after`, so reading a window late in a long series costs the same as
+        reading the first one. Never ends for an open rule without `before`.
+        """
+        dtstart = _as_utc(dtstart)
+        if self.freq == "DAILY":
+            step = timedelta(days=self.interval)
+            index = max(0, -(-(after - dtstart) // step)) if after is not None else 0
+            while self._includes(index, dtstart + index * step, before):
+                yield index, dtstart + index * step
+                index += 1
+            return
+
+        days = self.byday or (dtstart.weekday(),)
+        first_week_days = [day for day in days if day >= dtstart.weekday()]
+        week_start = dtstart - timedelta(days=dtstart.weekday())
+        period = timedelta(weeks=self.interval)
+        period_index = max(0, (after - week_start) // period) if after is not None else 0
+        while True:
+            if period_index == 0:
+                week_days, first_index = first_week_days, 0
+            else:
+                week_days, first_index = days, len(first_week_days) + (period_index - 1) * len(days)
+            for position, day in enumerate(week_days):
+                start = week_start + period_index * period + timedelta(days=day)
+                if after is not None and start < after:
+                    continue
+                if not self._includes(first_index + position, start, before):
+                    return
+                yield first_index + position, start
+            period_index += 1
+
+    def last_start(self, dtstart: datetime) -> Optional[datetime]:
+        """Start of the final occurrence, or None if the rule never ends."""
+        if self.count is not None:
+            return self._nth(_as_utc(dtstart), self.count - 1)
+        if self.until is None:
+            return None
+        # The last occurrence lies within one period before UNTIL
+        lookback = timedelta(weeks=self.interval) if self.freq == "WEEKLY" else timedelta(days=self.interval)
+        last = None
+        for _, start in replace(self, until=None).occurrences(dtstart, after=self.until - lookback,
+                                                               before=self.until + timedelta(microseconds=1)):
+            last = start
+        return last
+
+    def _nth(self, dtstart: datetime, index: int) -> datetime:
+        if self.freq == "DAILY":
+            return dtstart + timedelta(days=index * self.interval)
+        days = self.byday or (dtstart.weekday(),)
+        first_week_days = [day for day in days if day >= dtstart.weekday()]
+        week_start = dtstart - timedelta(days=dtstart.weekday())
+        if index < len(first_week_days):
+            return week_start + timedelta(days=first_week_days[index])
+        period_index, position = divmod(index - len(first_week_days), len(days))
+        return week_start + (period_index + 1) * timedelta(weeks=self.interval) + timedelta(days=days[position])
+
+    def _includes(self, index: int, start: datetime, before: Optional[datetime]) -> bool:
+        return ((self.count is None or index < self.count)
+                and (self.until is None or start <= self.until)
+                and (before is None or start < before))
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def _weekday(value: str) -> int:
+    if value not in WEEKDAYS:
+        raise ValueError(f"unknown weekday {value!r}")
+    return WEEKDAYS.index(value)
+
+def _parse_until(value: str) -> datetime:
+    if "T" in value:
+        return datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc)
+    # A date UNTIL includes the whole day
+    return datetime.combine(datetime.strptime(value, "%Y%m%d").date(), time.max, tzinfo=timezone.utc)
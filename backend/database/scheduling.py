@@ -0,0 +1,61 @@
+"""
+Choosing which free slots become a training plan's sessions.
+
+PlanPreferences.frequency is workouts per week, so every ISO week of the
+plan gets up to that many sessions, at most one a day, spread over the
+week's free days so there are rest days between them where the week
+allows (including the gap from the previous week's last session).
+"""
+from itertools import combinations, groupby
+from typing import List, Optional, Sequence, Tuple
+
+DAYS_PER_WEEK = 7
+
+def spread_days(days: Sequence[int], count: int, previous: Optional[int] = None,
+                cyclic: bool = False) -> Tuple[int, ...]:
+    """
+    Pick `count` of the sorted day numbers `days` for `count` sessions a
+    week: the largest smallest gap between them (up to the even spacing of
+    7 / count days), then the gaps closest to that spacing, then the
+    earliest days. `previous` is the day of the session before them. With
+    `cyclic`, days are weekdays repeating every week, so the gap from the
+    last one round to the first counts too.
+
+    Tries every choice, which stays cheap because the days come from one
+    week (at most 35 choices).
+    """
+    if count <= 0:
+        return ()
+    if count >= len(days):
+        return tuple(days)
+
+    target = DAYS_PER_WEEK / count
+    best, best_key = (), None
+    for chosen in combinations(days, count):
+        gaps = [later - earlier for earlier, later in zip(chosen, chosen[1:])]
+        if previous is not None:
+            gaps.append(chosen[0] - previous)
+        if cyclic:
+            gaps.append(chosen[0] + DAYS_PER_WEEK - chosen[-1])
+        key = (min(min(gaps, default=0), int(target)), -sum((gap - target) ** 2 for gap in gaps))
+        if best_key is None or key > best_key:
+            best, best_key = chosen, key
+    return best
+
+def select_weekly_slots(slots: List[dict], frequency: int) -> List[dict]:
+    """
+    Up to `frequency` of `slots` (from find_free_slots, in date order) per
+    ISO week, on different days spread by spread_days, using each day's
+    first slot. One pass over the slots, so year-long plans stay fast.
+    """
+    selected = []
+    previous = None
+    for _, week_slots in groupby(slots, key=lambda slot: slot['start_time'].isocalendar()[:2]):
+        first_by_day = {}
+        for slot in week_slots:
+            first_by_day.setdefault(slot['start_time'].toordinal(), slot)
+        days = spread_days(sorted(first_by_day), frequency, previous)
+        selected.extend(first_by_day[day] for day in days)
+        if days:
+            previous = days[-1]
+    return selected
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
+from .recurrence import RecurrenceRule
 
 # User schemas
 class UserBase(BaseModel):
@@ -29,6 +30,10 @@ class UserInDB(UserBase):
 class User(UserInDB):
     pass
 
+class UserPage(BaseModel):
+    items: List[User]
+    next_cursor: Optional[str] = None
+
 # Training Plan Status Enum
 class TrainingPlanStatus(str, Enum):
     DRAFT = "draft"
@@ -94,15 +99,25 @@ class EventCreate(EventBase):
     training_plan_id: Optional[int] = None
 
 class Event(EventBase):
-    id: int
+    id: Optional[int] = None  # null for occurrences generated from a series
     user_id: int
     training_plan_id: Optional[int] = None
+    # Set on series occurrences and on the stored events that override one
+    series_id: Optional[int] = None
+    recurrence_id: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class TrainingPlanWithEvents(TrainingPlan):
+    events: List[Event]
+
+class EventPage(BaseModel):
+    items: List[Event]
+    next_cursor: Optional[str] = None
+
 class EventUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -112,6 +127,107 @@ class EventUpdate(BaseModel):
     workout_type: Optional[str] = None
     difficulty_level: Optional[str] = None
 
+# Recurring event series schemas
+class EventSeriesCreate(BaseModel):
+    title: str
+    description: Optional[str] = None
+    event_type: Optional[str] = None
+    difficulty_level: Optional[str] = None
+    start_time: datetime  # first occurrence
+    duration_minutes: int = Field(gt=0)
+    rrule: str  # e.g. "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=12"; see database/recurrence.py
+
+    @field_validator("rrule")
+    @classmethod
+    def normalize_rrule(cls, value: str) -> str:
+        return str(RecurrenceRule.parse(value))
+
+    @model_validator(mode="after")
+    def check_start(self):
+        RecurrenceRule.parse(self.rrule).check_start(self.start_time)
+        return self
+
+class EventSeries(BaseModel):
+    id: int
+    user_id: int
+    training_plan_id: Optional[int] = None
+    title: str
+    description: Optional[str] = None
+    event_type: Optional[str] = None
+    workout_types: Optional[List[str]] = None
+    difficulty_level: Optional[str] = None
+    start_time: datetime
+    prep_minutes: int
+    duration_minutes: int
+    cooldown_minutes: int
+    rrule: str
+    ends_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class EventSeriesExport(EventSeries):
+    """A series as the export writes it, with the original starts of the occurrences it no longer generates."""
+    exceptions: List[datetime] = Field(default_factory=list)
+
+# Batch event schemas
+MAX_EVENT_BATCH = 1000
+
+class EventBatchUpdate(EventUpdate):
+    id: int
+
+class EventBatchRequest(BaseModel):
+    create: List[EventCreate] = Field(default_factory=list, max_length=MAX_EVENT_BATCH)
+    update: List[EventBatchUpdate] = Field(default_factory=list, max_length=MAX_EVENT_BATCH)
+    delete: List[int] = Field(default_factory=list, max_length=MAX_EVENT_BATCH)
+
+class EventBatchItemResult(BaseModel):
+    id: Optional[int] = None
+    status: int  # HTTP status of this item on its own: 201, 200, 204, 403 or 404
+    event: Optional[Event] = None
+    error: Optional[str] = None
+
+class EventBatchResponse(BaseModel):
+    created: List[EventBatchItemResult]
+    updated: List[EventBatchItemResult]
+    deleted: List[EventBatchItemResult]
+
+# Change stream schemas
+class CalendarChange(BaseModel):
+    """One committed write to a user's events, as pushed by GET /calendar/changes."""
+    user_id: int
+    upserted: List[Event] = Field(default_factory=list)  # created or updated
+    deleted: List[int] = Field(default_factory=list)
+    # Too much changed (or the client fell behind) to describe; refetch instead
+    reset: bool = False
+
+# Calendar sync schemas
+class CalendarConnectionCreate(BaseModel):
+    provider: str = "google"
+    calendar_id: str = "primary"
+    credentials: dict  # provider-specific, e.g. Google authorized user info from the OAuth flow
+
+class CalendarConnection(BaseModel):
+    id: int
+    user_id: int
+    provider: str
+    calendar_id: str
+    last_synced_at: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class CalendarSyncResult(BaseModel):
+    connection_id: int
+    user_id: int
+    full_sync: bool = False
+    upserted: int = 0
+    deleted: int = 0
+    error: Optional[str] = None
+
 # Plan Generation Request schema
 class PlanGenerationRequest(BaseModel):
     start_date: datetime
@@ -124,6 +240,48 @@ class PlanGenerationRequest(BaseModel):
     workout_types: List[str]
     difficulty_level: str
     days_of_week: List[str]
+    # Store the sessions as one recurring series at a fixed time instead of one row per event
+    recurring: bool = False
+
+# Batch plan generation schemas
+MAX_PLAN_BATCH = 1000
+
+class PlanBatchRequest(BaseModel):
+    user_ids: List[int] = Field(min_length=1, max_length=MAX_PLAN_BATCH)
+    request: PlanGenerationRequest  # the same preferences for every user
+
+class PlanBatchItemResult(BaseModel):
+    user_id: int
+    status: int  # HTTP status of this user's plan on its own: 201, 400 or 404
+    training_plan_id: Optional[int] = None
+    workout_count: int = 0
+    event_count: int = 0
+    error: Optional[str] = None
+
+class PlanBatchResponse(BaseModel):
+    results: List[PlanBatchItemResult]
+    created: int
+    failed: int
+
+# Group slot search schemas
+MAX_GROUP_SIZE = 200
+
+class GroupSlotRequest(BaseModel):
+    user_ids: List[int] = Field(min_length=1, max_length=MAX_GROUP_SIZE)
+    start_date: datetime
+    end_date: datetime
+    duration: int = Field(gt=0)  # minutes
+    time_of_day: List[str] = Field(default_factory=lambda: ["morning", "afternoon", "evening"])
+    # Also return slots where only this many of the users are free; defaults to everyone
+    min_available: Optional[int] = Field(None, ge=1)
+    step_minutes: int = Field(30, ge=5, le=240)
+    limit: int = Field(20, ge=1, le=200)
+
+class GroupSlot(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    time_preference: str
+    available_count: int
 
 # Plan Generation Response schema
 class PlanGenerationResponse(BaseModel):
@@ -131,6 +289,28 @@ class PlanGenerationResponse(BaseModel):
     events: List[Event]
     message: str
 
+# Plan preview schema: what create-training-plan would write, unsaved
+class PlanPreview(BaseModel):
+    training_plan: TrainingPlanCreate
+    events: List[EventCreate]
+    message: str
+
+# Background plan generation job schemas
+class PlanJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class PlanJob(BaseModel):
+    id: str
+    user_id: int
+    status: PlanJobStatus
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    result: Optional[PlanGenerationResponse] = None
+    error: Optional[str] = None
+
 #planner schemas
 class Preferences(BaseModel):
     start_date: datetime
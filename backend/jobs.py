@@ -0,0 +1,153 @@
+"""
+Background plan generation.
+
+POST /planner/create-training-plan?background=true hands the request to a
+PlanJobQueue and returns a job id straight away; the job runs
+create_training_plan_with_events on a worker with its own database session,
+and GET /planner/jobs/{job_id} reports its status and result.
+
+Jobs live in the memory of the API process that accepted them, so with
+several API workers a client has to poll the worker that created the job.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from database import cache, changes, crud, schemas
+from database.database import SessionLocal
+
+# "thread" runs jobs on a thread pool in the API process, "process" on a pool
+# of separate processes (better when slot search is CPU bound)
+PLAN_JOB_EXECUTOR = os.getenv("PLAN_JOB_EXECUTOR", "thread")
+PLAN_JOB_WORKERS = int(os.getenv("PLAN_JOB_WORKERS", "2"))
+# Jobs queued or running at once before new ones are rejected
+PLAN_JOB_MAX_PENDING = int(os.getenv("PLAN_JOB_MAX_PENDING", "100"))
+# How long finished jobs can still be polled
+PLAN_JOB_RETENTION_SECONDS = float(os.getenv("PLAN_JOB_RETENTION_SECONDS", "3600"))
+
+class QueueFullError(Exception):
+    pass
+
+def generate_plan(user_id: int, request_json: str) -> str:
+    """
+    Worker entry point. Takes and returns JSON so the same function works
+    across a process boundary.
+    """
+    request = schemas.PlanGenerationRequest.model_validate_json(request_json)
+    db = SessionLocal()
+    try:
+        return crud.create_training_plan_with_events(db, user_id, request).model_dump_json()
+    finally:
+        db.close()
+
+class _Job:
+    __slots__ = ("id", "user_id", "future", "created_at", "finished_at", "finished_monotonic")
+
+    def __init__(self, user_id: int, future: Future):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.future = future
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at = None
+        self.finished_monotonic = None
+
+class PlanJobQueue:
+    def __init__(self, executor_kind: str = PLAN_JOB_EXECUTOR, workers: int = PLAN_JOB_WORKERS,
+                 max_pending: int = PLAN_JOB_MAX_PENDING, retention_seconds: float = PLAN_JOB_RETENTION_SECONDS):
+        if executor_kind not in ("thread", "process"):
+            raise ValueError(f"PLAN_JOB_EXECUTOR must be 'thread' or 'process', not {executor_kind!r}")
+        self.executor_kind = executor_kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self._executor = None
+        self._jobs: Dict[str, _Job] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created on first use so importing the app never starts workers
+        if self._executor is None:
+            if self.executor_kind == "process":
+                # Spawned, not forked: children must not share the parent's DB connections
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="plan-job")
+        return self._executor
+
+    def submit(self, user_id: int, request: schemas.PlanGenerationRequest) -> schemas.PlanJob:
+        with self._lock:
+            self._purge_expired()
+            pending = sum(1 for job in self._jobs.values() if not job.future.done())
+            if pending >= self.max_pending:
+                raise QueueFullError(f"{pending} plan generation jobs already pending")
+
+            future = self._get_executor().submit(generate_plan, user_id, request.model_dump_json())
+            job = _Job(user_id, future)
+            self._jobs[job.id] = job
+        future.add_done_callback(lambda _: self._finished(job))
+        return self._describe(job)
+
+    def get(self, job_id: str) -> Optional[schemas.PlanJob]:
+        with self._lock:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+        return self._describe(job) if job is not None else None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _finished(self, job: _Job):
+        job.finished_at = datetime.now(timezone.utc)
+        job.finished_monotonic = time.monotonic()
+        if self.executor_kind != "process":
+            return
+        # A process worker only invalidated its own copy of the calendar cache,
+        # and only its own subscribers (none) heard about the new events
+        cache.invalidate_user(job.user_id)
+        if not changes.broker.shared and not job.future.cancelled() and job.future.exception() is None:
+            result = schemas.PlanGenerationResponse.model_validate_json(job.future.result())
+            changes.publish_events(job.user_id, upserted=result.events)
+
+    def _purge_expired(self):
+        cutoff = time.monotonic() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_monotonic is not None and job.finished_monotonic < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _describe(self, job: _Job) -> schemas.PlanJob:
+        future = job.future
+        result = error = None
+        if future.cancelled():
+            status = schemas.PlanJobStatus.FAILED
+            error = "Cancelled"
+        elif future.done():
+            exception = future.exception()
+            if exception is None:
+                status = schemas.PlanJobStatus.SUCCEEDED
+                result = schemas.PlanGenerationResponse.model_validate_json(future.result())
+            else:
+                status = schemas.PlanJobStatus.FAILED
+                error = f"Failed to create training plan: {exception}"
+        elif future.running():
+            status = schemas.PlanJobStatus.RUNNING
+        else:
+            status = schemas.PlanJobStatus.QUEUED
+
+        return schemas.PlanJob(
+            id=job.id,
+            user_id=job.user_id,
+            status=status,
+            created_at=job.created_at,
+            finished_at=job.finished_at,
+            result=result,
+            error=error
+        )
+
+plan_jobs = PlanJobQueue()
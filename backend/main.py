@@ -1,15 +1,26 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from api import (
+    admin_router,
     calendar_router,
+    export_router,
     user_router,
     planner_router
 )
 from database.init_db import init_db
+from database.cache import busy_cache, event_cache, event_json_cache
+from database.changes import broker as change_broker
+from jobs import plan_jobs
+import plan_batch
+import metrics
 
 async def lifespan(app: FastAPI):
      #init_db()
     yield
+    plan_jobs.shutdown()
+    plan_batch.shutdown()
 
 app = FastAPI(title="Training Planner App", 
               description="API for managing training planner data",
@@ -25,9 +36,46 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    stats = metrics.RequestStats()
+    token = metrics.current_request_stats.set(stats)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.current_request_stats.reset(token)
+    
+    # Label by route template rather than raw path to keep series bounded
+    route = request.scope.get("route")
+    route_path = route.path if route is not None else "unmatched"
+    metrics.http_request_duration.observe(time.perf_counter() - started, request.method, route_path, response.status_code)
+    metrics.http_request_queries.observe(stats.queries, request.method, route_path)
+    metrics.http_request_db_time.observe(stats.db_seconds, request.method, route_path)
+    return response
+
 app.include_router(user_router.router, prefix="/user", tags=["user"])
 app.include_router(calendar_router.router, prefix="/calendar", tags=["calendar"])
+app.include_router(export_router.router, prefix="/export", tags=["export"])
 app.include_router(planner_router.router, prefix="/planner", tags=["planner"])
+app.include_router(admin_router.router, prefix="/admin", tags=["admin"])
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    cache_lines = [
+        "# HELP calendar_cache_lookups_total Calendar window cache lookups by cache and result",
+        "# TYPE calendar_cache_lookups_total counter",
+    ]
+    for cache in (event_cache, event_json_cache, busy_cache):
+        cache_stats = cache.stats()
+        cache_lines.append(f'calendar_cache_lookups_total{{cache="{cache.namespace}",result="hit"}} {cache_stats["hits"]}')
+        cache_lines.append(f'calendar_cache_lookups_total{{cache="{cache.namespace}",result="miss"}} {cache_stats["misses"]}')
+    cache_lines += [
+        "# HELP calendar_change_streams Open GET /calendar/changes streams in this worker",
+        "# TYPE calendar_change_streams gauge",
+        f"calendar_change_streams {change_broker.subscriber_count()}",
+    ]
+    return PlainTextResponse(metrics.render_metrics(cache_lines), media_type="text/plain; version=0.0.4")
 
 @app.get("/healthcheck")
 async def healthcheck():
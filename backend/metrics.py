@@ -0,0 +1,126 @@
+"""
+In-process request and SQL metrics, exposed in Prometheus text format at /metrics.
+
+The HTTP middleware in main.py opens a RequestStats for each request; the
+engine hooks in database/database.py add every query's count and time to it.
+"""
+import logging
+import os
+import threading
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Statements slower than this many milliseconds are logged; unset disables the log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0")) or None
+
+slow_query_logger = logging.getLogger("sql.slow")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labelvalues -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues) -> None:
+        with self._lock:
+            series = self._series.setdefault(labelvalues, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labelvalues, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    le = _labels(self.labelnames + ("le",), labelvalues + (_format_bound(bound),))
+                    lines.append(f"{self.name}_bucket{le} {count}")
+                inf = _labels(self.labelnames + ("le",), labelvalues + ("+Inf",))
+                lines.append(f"{self.name}_bucket{inf} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labelvalues)} {series[-2]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {series[-1]}")
+        return lines
+
+def _format_bound(bound: float) -> str:
+    return str(int(bound)) if float(bound).is_integer() else str(bound)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ("method", "route", "status")
+)
+http_request_queries = Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request",
+    ("method", "route"), buckets=QUERY_COUNT_BUCKETS
+)
+http_request_db_time = Histogram(
+    "http_request_db_seconds", "Time spent in SQL per HTTP request",
+    ("method", "route")
+)
+db_query_duration = Histogram("db_query_duration_seconds", "SQL statement latency")
+db_slow_queries = Counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS")
+
+REGISTRY = [http_request_duration, http_request_queries, http_request_db_time, db_query_duration, db_slow_queries]
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+# Stats for the request being handled; worker threads inherit the context
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+def record_query(statement: str, seconds: float) -> None:
+    db_query_duration.observe(seconds)
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+    if SLOW_QUERY_MS is not None and seconds * 1000 >= SLOW_QUERY_MS:
+        db_slow_queries.inc()
+        slow_query_logger.warning("Slow query (%.1f ms): %s", seconds * 1000, " ".join(statement.split())[:1000])
+
+def render_metrics(extra_lines: Iterable[str] = ()) -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,119 @@
+"""
+Generate training plans for many users at once, e.g. a coach's whole squad
+at the start of a training block.
+
+All the users' events in the plan window are read with one query, slot
+selection runs on a pool of worker processes (it is CPU bound and touches no
+database), and the plans are written back in chunks of users, each chunk in
+one transaction with one multi-row INSERT per table. A chunk that fails is
+retried one user at a time, so one bad user only fails their own plan.
+Run it from the backend directory with:
+    python -m plan_batch request.json
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from database import crud, schemas
+
+# Worker processes for slot selection; 1 selects in the calling process
+PLAN_BATCH_WORKERS = int(os.getenv("PLAN_BATCH_WORKERS", str(os.cpu_count() or 1)))
+# Users whose plans are written per transaction
+PLAN_BATCH_CHUNK_SIZE = int(os.getenv("PLAN_BATCH_CHUNK_SIZE", "100"))
+
+_executor = None
+
+def _get_executor() -> ProcessPoolExecutor:
+    # Created on first use and kept, so each batch doesn't pay for starting workers
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(PLAN_BATCH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def plan_users(request: schemas.PlanGenerationRequest, busy: List[Tuple[int, list]]) -> List[tuple]:
+    """
+    Worker entry point: (user_id, plan or None, error or None) for each
+    (user_id, busy intervals) pair, the plan as crud.plan_for_busy returns it.
+    """
+    results = []
+    for user_id, intervals in busy:
+        try:
+            results.append((user_id, crud.plan_for_busy(request, intervals), None))
+        except Exception as e:
+            results.append((user_id, None, str(e) or type(e).__name__))
+    return results
+
+def _plan_all(request: schemas.PlanGenerationRequest, busy: Dict[int, list], workers: int) -> List[tuple]:
+    items = list(busy.items())
+    if workers <= 1 or len(items) <= 1:
+        return plan_users(request, items)
+    # A few tasks per worker keeps them evenly loaded without pickling the request per user
+    size = -(-len(items) // (workers * 4))
+    executor = _get_executor()
+    futures = [executor.submit(plan_users, request, items[i:i + size]) for i in range(0, len(items), size)]
+    return [result for future in futures for result in future.result()]
+
+def _write(db: Session, planned: List[tuple], results: Dict[int, schemas.PlanBatchItemResult]):
+    """Write (user_id, plan) pairs in one transaction, falling back to one user per transaction."""
+    plans = [(user_id, plan_data, event_rows, series) for user_id, (plan_data, event_rows, _, series) in planned]
+    try:
+        plan_ids = crud.create_generated_training_plans(db, plans)
+    except Exception as e:
+        if len(planned) > 1:
+            for item in planned:
+                _write(db, [item], results)
+        else:
+            user_id = planned[0][0]
+            results[user_id] = schemas.PlanBatchItemResult(
+                user_id=user_id, status=400, error=f"Failed to create training plan: {e}"
+            )
+        return
+
+    for plan_id, (user_id, (_, event_rows, workout_count, _)) in zip(plan_ids, planned):
+        results[user_id] = schemas.PlanBatchItemResult(
+            user_id=user_id, status=201, training_plan_id=plan_id,
+            workout_count=workout_count, event_count=len(event_rows)
+        )
+
+def create_training_plans(db: Session, batch: schemas.PlanBatchRequest, workers: Optional[int] = None,
+                          chunk_size: Optional[int] = None) -> schemas.PlanBatchResponse:
+    """Generate and write `batch.request`'s plan for each of `batch.user_ids`, with a result per user."""
+    request = batch.request
+    user_ids = list(dict.fromkeys(batch.user_ids))
+    existing = crud.get_existing_user_ids(db, user_ids)
+    results = {
+        user_id: schemas.PlanBatchItemResult(user_id=user_id, status=404, error="User not found")
+        for user_id in user_ids if user_id not in existing
+    }
+
+    busy = {}
+    if existing:
+        window_start, window_end = crud.plan_busy_window(request)
+        busy = crud.get_group_busy_intervals(db, [user_id for user_id in user_ids if user_id in existing],
+                                             window_start, window_end)
+        # Release the read transaction while the workers run
+        db.rollback()
+
+    planned = []
+    for user_id, plan, error in _plan_all(request, busy, PLAN_BATCH_WORKERS if workers is None else workers):
+        if error is not None:
+            results[user_id] = schemas.PlanBatchItemResult(
+                user_id=user_id, status=400, error=f"Failed to create training plan: {error}"
+            )
+        else:
+            planned.append((user_id, plan))
+
+    chunk_size = chunk_size or PLAN_BATCH_CHUNK_SIZE
+    for i in range(0, len(planned), chunk_size):
+        _write(db, planned[i:i + chunk_size], results)
+
+    ordered = [results[user_id] for user_id in user_ids]
+    created = sum(1 for result in ordered if result.status == 201)
+    return schemas.PlanBatchResponse(results=ordered, created=created, failed=len(ordered) - created)
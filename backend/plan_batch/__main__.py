@@ -0,0 +1,30 @@
+import argparse
+import sys
+from database.database import SessionLocal
+from database import schemas
+from . import PLAN_BATCH_CHUNK_SIZE, PLAN_BATCH_WORKERS, create_training_plans, shutdown
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate training plans for many users at once.")
+    parser.add_argument("request", help="JSON file with user_ids and the plan request (see PlanBatchRequest); - for stdin")
+    parser.add_argument("--workers", type=int, default=PLAN_BATCH_WORKERS, help="slot selection processes")
+    parser.add_argument("--chunk-size", type=int, default=PLAN_BATCH_CHUNK_SIZE, help="users written per transaction")
+    args = parser.parse_args()
+
+    with (sys.stdin if args.request == "-" else open(args.request)) as request_file:
+        batch = schemas.PlanBatchRequest.model_validate_json(request_file.read())
+
+    db = SessionLocal()
+    try:
+        response = create_training_plans(db, batch, workers=args.workers, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+        shutdown()
+    for result in response.results:
+        if result.error:
+            print(f"user {result.user_id}: error ({result.status}): {result.error}")
+        else:
+            print(f"user {result.user_id}: plan {result.training_plan_id}, "
+                  f"{result.workout_count} workouts, {result.event_count} events")
+    print(f"{response.created} created, {response.failed} failed")
+    sys.exit(1 if response.failed else 0)
@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+# Point the engine at a throwaway SQLite file before anything imports database.database
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ["DATABASE_MODE"] = "sync"
+
+import pytest
+from sqlalchemy import select
+from database import cache, crud, models, schemas
+from database.database import Base, SessionLocal, engine
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        # The next test reuses the same user ids, so nothing cached for them may survive
+        session.rollback()
+        for user_id in session.scalars(select(models.User.id)):
+            cache.invalidate_user(user_id)
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def user(db):
+    return crud.create_user(db, schemas.UserCreate(email="athlete@example.com", username="athlete", password="secret"))
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from database import crud, schemas
+from database.async_crud import run_crud
+from database.database import engine
+
+MONDAY = datetime(2025, 1, 6, tzinfo=timezone.utc)
+
+def run_async(fn, *args, **kwargs):
+    """run_crud on an AsyncSession over the test database; returns (result, event loop thread id)."""
+    async def call():
+        async_engine = create_async_engine(engine.url.set(drivername="sqlite+aiosqlite"))
+        try:
+            async with async_sessionmaker(async_engine, expire_on_commit=False)() as db:
+                return await run_crud(db, fn, *args, **kwargs), threading.get_ident()
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(call())
+
+def test_plan_generation_runs_off_the_event_loop(db, user, monkeypatch):
+    threads = []
+    plan_for_slots = crud.plan_for_slots
+
+    def recording(*args):
+        threads.append(threading.get_ident())
+        return plan_for_slots(*args)
+
+    monkeypatch.setattr(crud, "plan_for_slots", recording)
+    request = schemas.PlanGenerationRequest(
+        start_date=MONDAY, end_date=MONDAY + timedelta(days=6), frequency=2, time_of_day="morning", duration=60,
+        prep_time=0, cooldown_time=0, workout_types=["running"], difficulty_level="easy", days_of_week=[]
+    )
+
+    preview, loop_thread = run_async(crud.preview_training_plan, user.id, request)
+    response, loop_thread = run_async(crud.create_training_plan_with_events, user.id, request)
+
+    assert len(threads) == 2 and loop_thread not in threads
+    assert [event.start_time for event in response.events] == [event.start_time for event in preview.events]
+    db.expire_all()
+    assert len(crud.get_training_plan_events(db, response.training_plan.id)) == len(preview.events)
+
+def test_crud_functions_work_on_async_sessions(db, user):
+    event = schemas.EventCreate(title="Run", start_time=MONDAY, end_time=MONDAY + timedelta(hours=1))
+    created, _ = run_async(crud.create_event_series, schemas.EventSeriesCreate(
+        title="Swim", start_time=MONDAY, duration_minutes=30, rrule="FREQ=DAILY;COUNT=2"
+    ), user.id)
+    body, _ = run_async(crud.get_user_events_by_date_json, user.id, MONDAY, MONDAY + timedelta(days=2))
+    assert created.id is not None and body.count(b'"Swim"') == 2
+    assert run_async(crud.create_event, event, user.id)[0].title == "Run"
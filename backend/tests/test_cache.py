@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+import pytest
+from database import cache
+from database.cache import EventWindowCache, LRUCache
+
+DAY = datetime(2025, 1, 6, tzinfo=timezone.utc)
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+def test_idle_counters_are_dropped_after_their_entries_expire(clock):
+    backend = LRUCache(max_entries=10, ttl_seconds=60)
+    for user_id in range(1000):
+        backend.incr(f"generation:{user_id}")
+    assert len(backend._counters) == 1000
+
+    clock.now += 119
+    assert backend.counter("generation:5") == 1
+    clock.now += 2
+    # Every other counter went unused for over twice the TTL
+    backend.counter("generation:new")
+    assert set(backend._counters) == {"generation:5", "generation:new"}
+    assert backend.counter("generation:6") == 0
+
+def test_a_dropped_counter_resurrects_no_entries(clock):
+    windows = EventWindowCache(LRUCache(max_entries=10, ttl_seconds=60))
+    key = windows.key(1, DAY, DAY)
+    windows.set(key, ["stale"])
+    windows.invalidate_user(1)
+    assert windows.get(windows.key(1, DAY, DAY)) is None
+
+    # Long enough to forget the counter, so its generation restarts at 0...
+    clock.now += 121
+    windows.invalidate_user(2)
+    assert windows.key(1, DAY, DAY) == key
+    # ...but the entry stored under it expired first
+    assert windows.get(key) is None
+
+def test_counters_in_use_are_kept(clock):
+    backend = LRUCache(ttl_seconds=60)
+    backend.incr("generation:1")
+    for _ in range(10):
+        clock.now += 100
+        assert backend.counter("generation:1") == 1
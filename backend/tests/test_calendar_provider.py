@@ -0,0 +1,14 @@
+import pytest
+from calendar_sync import CalendarProvider, FakeCalendarProvider, PageRequest
+
+def test_incomplete_provider_fails_when_created():
+    class NoPages(CalendarProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        NoPages()
+
+def test_fake_provider_implements_the_interface():
+    provider = FakeCalendarProvider()
+    [page] = provider.fetch_pages([PageRequest("primary")])
+    assert page.events == [] and page.next_sync_token == "0:0"
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select
+from calendar_sync import ExternalEvent, FakeCalendarProvider, sync_calendars
+from database import crud, models, schemas
+
+START = datetime(2025, 3, 3, 9, tzinfo=timezone.utc)
+
+def external(external_id: str, hours: int = 0, title: str = None) -> ExternalEvent:
+    start = START + timedelta(hours=hours)
+    return ExternalEvent(external_id, title=title or external_id, start_time=start, end_time=start + timedelta(hours=1))
+
+@pytest.fixture
+def provider():
+    return FakeCalendarProvider(page_size=2)
+
+@pytest.fixture
+def connection(db, user):
+    return crud.create_calendar_connection(
+        db, user.id, schemas.CalendarConnectionCreate(provider="fake", credentials={})
+    )
+
+def sync(db, provider):
+    [result] = sync_calendars(db, providers={"fake": provider})
+    db.expire_all()
+    return result
+
+def imported(db, connection) -> dict:
+    return {event.external_id: event.title for event in db.scalars(
+        select(models.Event).where(models.Event.calendar_connection_id == connection.id)
+    )}
+
+def test_first_sync_imports_everything_over_several_pages(db, user, connection, provider):
+    for index in range(5):
+        provider.put_event("primary", external(f"e{index}", hours=index))
+
+    result = sync(db, provider)
+    assert result.full_sync and result.error is None
+    assert result.upserted == 5 and result.deleted == 0
+    assert imported(db, connection) == {f"e{index}": f"e{index}" for index in range(5)}
+    # Three pages of at most two events, each fetched in its own round
+    assert provider.batches == [1, 1, 1]
+    assert db.get(models.CalendarConnection, connection.id).sync_token == "0:5"
+    # Imported events block time like any other
+    assert crud.get_busy_intervals(db, user.id, START, START + timedelta(days=1))[0] == (
+        START, START + timedelta(hours=1)
+    )
+
+def test_incremental_sync_applies_only_the_changes(db, user, connection, provider):
+    provider.put_event("primary", external("kept"))
+    provider.put_event("primary", external("edited"))
+    provider.put_event("primary", external("cancelled"))
+    sync(db, provider)
+
+    provider.put_event("primary", external("edited", hours=2, title="moved"))
+    provider.cancel_event("primary", "cancelled")
+    provider.put_event("primary", external("new", hours=4))
+    result = sync(db, provider)
+
+    assert not result.full_sync
+    assert (result.upserted, result.deleted) == (2, 1)
+    assert imported(db, connection) == {"kept": "kept", "edited": "moved", "new": "new"}
+    assert db.get(models.CalendarConnection, connection.id).sync_token == "0:6"
+
+def test_nothing_changed_is_an_empty_incremental_sync(db, user, connection, provider):
+    provider.put_event("primary", external("only"))
+    sync(db, provider)
+    result = sync(db, provider)
+    assert not result.full_sync and (result.upserted, result.deleted) == (0, 0)
+    assert imported(db, connection) == {"only": "only"}
+
+def test_expired_token_falls_back_to_a_full_sync_that_drops_stale_events(db, user, connection, provider):
+    for external_id in ("a", "b", "c"):
+        provider.put_event("primary", external(external_id))
+    sync(db, provider)
+
+    # While the token is expired, "b" is deleted; the full listing no longer mentions it
+    provider.cancel_event("primary", "b")
+    provider.put_event("primary", external("d"))
+    provider.expire_sync_tokens()
+    result = sync(db, provider)
+
+    assert result.full_sync and result.error is None
+    assert result.deleted == 1
+    assert imported(db, connection) == {"a": "a", "c": "c", "d": "d"}
+    assert db.get(models.CalendarConnection, connection.id).sync_token == "1:5"
+
+def test_full_sync_of_an_emptied_calendar_removes_every_imported_event(db, user, connection, provider):
+    provider.put_event("primary", external("a"))
+    sync(db, provider)
+    provider.cancel_event("primary", "a")
+    provider.expire_sync_tokens()
+
+    result = sync(db, provider)
+    assert result.deleted == 1 and imported(db, connection) == {}
+
+def test_events_of_other_calendars_and_users_are_untouched(db, user, connection, provider):
+    own = crud.create_event(db, schemas.EventCreate(
+        title="Dentist", start_time=START, end_time=START + timedelta(hours=1), event_type="personal"
+    ), user.id)
+    provider.put_event("primary", external("a"))
+    provider.expire_sync_tokens()
+    sync(db, provider)
+
+    provider.cancel_event("primary", "a")
+    provider.expire_sync_tokens()
+    sync(db, provider)
+    assert crud.get_event(db, own.id) is not None
+
+def test_provider_errors_are_reported_per_connection(db, user, connection):
+    class Failing(FakeCalendarProvider):
+        def fetch_pages(self, requests):
+            return [RuntimeError("calendar unavailable") for _ in requests]
+
+    result = sync(db, Failing())
+    assert result.error == "calendar unavailable"
+    assert db.get(models.CalendarConnection, connection.id).sync_token is None
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from database import crud, schemas
+
+START = datetime(2025, 3, 3, 9, tzinfo=timezone.utc)
+
+def event(title: str, hours: int = 0) -> schemas.EventCreate:
+    start = START + timedelta(hours=hours)
+    return schemas.EventCreate(title=title, start_time=start, end_time=start + timedelta(hours=1), event_type="personal")
+
+@pytest.fixture
+def other_user(db):
+    return crud.create_user(db, schemas.UserCreate(email="coach@example.com", username="coach", password="secret"))
+
+def apply(db, user_id, **batch) -> schemas.EventBatchResponse:
+    response = crud.apply_event_batch(db, user_id, schemas.EventBatchRequest(**batch))
+    db.expire_all()
+    return response
+
+def statuses(results):
+    return [(result.id, result.status) for result in results]
+
+def test_create_update_and_delete_in_one_batch(db, user):
+    kept, moved, removed = (crud.create_event(db, event(title, hours), user.id).id
+                            for title, hours in (("kept", 0), ("moved", 2), ("removed", 4)))
+
+    response = apply(
+        db, user.id,
+        create=[event("new", 6), event("newer", 8)],
+        update=[{"id": kept, "title": "renamed"},
+                {"id": moved, "start_time": START + timedelta(hours=10), "end_time": START + timedelta(hours=11)}],
+        delete=[removed]
+    )
+
+    assert [result.status for result in response.created] == [201, 201]
+    assert [result.event.title for result in response.created] == ["new", "newer"]
+    assert statuses(response.updated) == [(kept, 200), (moved, 200)]
+    assert response.updated[0].event.title == "renamed"
+    assert response.updated[0].event.start_time == START
+    assert response.updated[1].event.title == "moved"
+    assert response.updated[1].event.start_time == START + timedelta(hours=10)
+    assert statuses(response.deleted) == [(removed, 204)]
+
+    titles = {stored.title: stored.start_time for stored in crud.get_user_events_by_date(
+        db, user.id, START, START + timedelta(days=1)
+    )}
+    assert titles == {
+        "renamed": START,
+        "new": START + timedelta(hours=6),
+        "newer": START + timedelta(hours=8),
+        "moved": START + timedelta(hours=10),
+    }
+    # busy_days follows every kind of change
+    summary = crud.get_busy_intervals_from_summary(db, user.id, START, START + timedelta(hours=12))
+    assert [(start - START, end - START) for start, end in summary] == [
+        (timedelta(hours=hours), timedelta(hours=hours + 1)) for hours in (0, 6, 8, 10)
+    ]
+
+def test_updates_setting_different_fields_are_applied_in_their_own_groups(db, user):
+    events = [crud.create_event(db, event(f"e{index}", index), user.id) for index in range(4)]
+
+    response = apply(db, user.id, update=[
+        {"id": events[0].id, "title": "a"},
+        {"id": events[1].id, "description": "only the description"},
+        {"id": events[2].id, "title": "c"},
+        {"id": events[3].id, "title": "d", "difficulty_level": "hard"},
+    ])
+
+    assert [result.status for result in response.updated] == [200] * 4
+    stored = [crud.get_event(db, stored_event.id) for stored_event in events]
+    assert [(stored_event.title, stored_event.description, stored_event.difficulty_level) for stored_event in stored] == [
+        ("a", None, None), ("e1", "only the description", None), ("c", None, None), ("d", None, "hard")
+    ]
+
+def test_other_users_events_are_refused_without_failing_the_rest(db, user, other_user):
+    mine = crud.create_event(db, event("mine"), user.id)
+    theirs = crud.create_event(db, event("theirs"), other_user.id)
+    their_other = crud.create_event(db, event("their other", 2), other_user.id)
+
+    response = apply(db, user.id, update=[{"id": theirs.id, "title": "hijacked"}, {"id": mine.id, "title": "ok"}],
+                     delete=[their_other.id])
+
+    assert statuses(response.updated) == [(theirs.id, 403), (mine.id, 200)]
+    assert response.updated[0].error == "Not authorized to modify this event"
+    assert statuses(response.deleted) == [(their_other.id, 403)]
+    assert crud.get_event(db, theirs.id).title == "theirs"
+    assert crud.get_event(db, their_other.id) is not None
+    assert crud.get_event(db, mine.id).title == "ok"
+
+def test_missing_events_are_not_found(db, user):
+    mine = crud.create_event(db, event("mine"), user.id).id
+    response = apply(db, user.id, update=[{"id": mine + 100, "title": "ghost"}], delete=[mine + 101, mine])
+
+    assert statuses(response.updated) == [(mine + 100, 404)]
+    assert response.updated[0].error == "Event not found"
+    assert statuses(response.deleted) == [(mine + 101, 404), (mine, 204)]
+    assert crud.get_event(db, mine) is None
+
+def test_an_id_deleted_twice_is_only_deleted_once(db, user):
+    mine = crud.create_event(db, event("mine"), user.id).id
+    response = apply(db, user.id, delete=[mine, mine])
+    assert statuses(response.deleted) == [(mine, 204), (mine, 404)]
+    assert crud.get_event(db, mine) is None
+
+def test_a_failing_batch_writes_nothing(db, user, monkeypatch):
+    mine = crud.create_event(db, event("mine"), user.id)
+
+    def fail(*args):
+        raise RuntimeError("busy_days unavailable")
+
+    monkeypatch.setattr(crud, "_refresh_busy_days", fail)
+    with pytest.raises(RuntimeError):
+        apply(db, user.id, create=[event("new", 2)], update=[{"id": mine.id, "title": "renamed"}], delete=[mine.id])
+    monkeypatch.undo()
+
+    db.expire_all()
+    assert [stored.title for stored in crud.get_user_events_by_date(db, user.id, START, START + timedelta(days=1))] \
+        == ["mine"]
@@ -0,0 +1,74 @@
+import json
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert
+from database import crud, models, schemas
+
+START = datetime(2025, 1, 6, tzinfo=timezone.utc)
+END = START + timedelta(days=7)
+
+def read_window(db, user):
+    version = crud.get_user_data_version(db, user.id)
+    return [event["title"] for event in json.loads(crud.get_user_events_by_date_json(db, user.id, START, END,
+                                                                                     version=version))]
+
+def run(hours: int = 7, title: str = "Run") -> schemas.EventCreate:
+    return schemas.EventCreate(title=title, start_time=START + timedelta(hours=hours),
+                               end_time=START + timedelta(hours=hours + 1))
+
+def test_cached_body_follows_version_when_cache_missed_a_write(db, user):
+    crud.create_event(db, run(), user.id)
+    assert read_window(db, user) == ["Run"]
+
+    # Written by another worker: this process's cache was never invalidated
+    db.execute(insert(models.Event), [dict(title="Swim", user_id=user.id, start_time=START + timedelta(hours=9),
+                                           end_time=START + timedelta(hours=10))])
+    crud._bump_data_version(db, user.id)
+    db.commit()
+
+    assert sorted(read_window(db, user)) == ["Run", "Swim"]
+
+def test_every_write_moves_the_version_on(db, user):
+    versions = [crud.get_user_data_version(db, user.id)]
+
+    def changed():
+        db.expire_all()
+        versions.append(crud.get_user_data_version(db, user.id))
+        return versions[-1] > versions[-2]
+
+    event = crud.create_event(db, run(), user.id)
+    assert changed()
+    # Within the same second as the create: timestamps alone could not tell these apart
+    crud.update_event(db, event.id, schemas.EventUpdate(title="Long run"))
+    assert changed()
+    assert read_window(db, user) == ["Long run"]
+    crud.update_event(db, event.id, schemas.EventUpdate(title="Tempo run"))
+    assert changed()
+    assert read_window(db, user) == ["Tempo run"]
+
+    series = crud.create_event_series(db, schemas.EventSeriesCreate(
+        title="Swim", start_time=START + timedelta(hours=18), duration_minutes=60, rrule="FREQ=DAILY;COUNT=3"
+    ), user.id)
+    assert changed()
+    crud.delete_series_occurrence(db, series.id, START + timedelta(days=1, hours=18))
+    assert changed()
+    crud.update_series_occurrence(db, series.id, START + timedelta(hours=18), schemas.EventUpdate(title="Open water"))
+    assert changed()
+    assert sorted(read_window(db, user)) == ["Open water", "Swim", "Tempo run"]
+
+    crud.apply_event_batch(db, user.id, schemas.EventBatchRequest(delete=[event.id]))
+    assert changed()
+    crud.delete_event_series(db, series.id)
+    assert changed()
+    assert read_window(db, user) == []
+
+def test_a_failed_or_empty_write_keeps_the_version(db, user):
+    before = crud.get_user_data_version(db, user.id)
+    assert crud.update_event(db, 12345, schemas.EventUpdate(title="Nothing")) is None
+    assert not crud.delete_event(db, 12345)
+    assert crud.get_user_data_version(db, user.id) == before
+
+def test_versions_are_per_user(db, user):
+    other = crud.create_user(db, schemas.UserCreate(email="coach@example.com", username="coach", password="secret"))
+    crud.create_event(db, run(), user.id)
+    assert crud.get_user_data_version(db, other.id) == 0
+    assert crud.get_user_data_version(db, 12345) == 0
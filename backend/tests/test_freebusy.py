@@ -0,0 +1,203 @@
+import random
+from datetime import datetime, timedelta, timezone
+import pytest
+from database.freebusy import (
+    FreeBusy, TIME_OF_DAY_RANGES, busy_day_intervals, busy_day_masks, find_free_slots, find_group_slots
+)
+
+START = datetime(2025, 3, 3, tzinfo=timezone.utc)
+TIMES = ["morning", "afternoon", "evening"]
+
+def brute_force_slots(intervals, start_date, end_date, duration_minutes, preferred_times):
+    """Every candidate hour checked against every non-empty interval."""
+    slots = []
+    day = start_date.date()
+    while day <= end_date.date():
+        for time_preference in preferred_times:
+            for hour in range(*TIME_OF_DAY_RANGES[time_preference]):
+                slot_start = datetime.combine(day, datetime.min.time().replace(hour=hour), tzinfo=start_date.tzinfo)
+                slot_end = slot_start + timedelta(minutes=duration_minutes)
+                if not any(start < slot_end and end > slot_start and end > start for start, end in intervals):
+                    slots.append(slot_start)
+        day += timedelta(days=1)
+    return slots
+
+def summary_intervals(intervals):
+    return busy_day_intervals(sorted(busy_day_masks(intervals).items()))
+
+def random_calendar(rng, days, count, block_minutes=5):
+    intervals = []
+    for _ in range(count):
+        start = START + timedelta(minutes=block_minutes * rng.randrange(days * 24 * 60 // block_minutes))
+        intervals.append((start, start + timedelta(minutes=block_minutes * rng.randrange(1, 36))))
+    return intervals
+
+def starts(slots):
+    return [slot["start_time"] for slot in slots]
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("offset_hours", [0, 2, -5])
+def test_interval_summary_and_brute_force_agree(seed, offset_hours):
+    rng = random.Random(seed)
+    tz = timezone(timedelta(hours=offset_hours))
+    intervals = random_calendar(rng, 21, rng.randrange(0, 120))
+    start_date, end_date = START.astimezone(tz), (START + timedelta(days=20)).astimezone(tz)
+    duration = rng.choice([30, 45, 60, 95])
+
+    expected = brute_force_slots(intervals, start_date, end_date, duration, TIMES)
+    assert starts(find_free_slots(intervals, start_date, end_date, duration, TIMES)) == expected
+    # Events on 5-minute boundaries lose nothing to the summary's rounding
+    assert starts(find_free_slots(summary_intervals(intervals), start_date, end_date, duration, TIMES)) == expected
+
+@pytest.mark.parametrize("seed", range(20))
+def test_bitmap_matches_interval_search(seed):
+    pytest.importorskip("numpy")
+    rng = random.Random(seed)
+    intervals = random_calendar(rng, 30, rng.randrange(0, 200), block_minutes=1)
+    end_date = START + timedelta(days=29)
+    duration = rng.choice([20, 60, 90])
+
+    interval_slots = find_free_slots(intervals, START, end_date, duration, TIMES)
+    assert find_free_slots(intervals, START, end_date, duration, TIMES, mode="bitmap") == interval_slots
+    # Coarser blocks round events outwards, so they can only find fewer slots
+    coarse = starts(find_free_slots(intervals, START, end_date, duration, TIMES, mode="bitmap", resolution_minutes=15))
+    assert set(coarse) <= set(starts(interval_slots))
+
+# An instant event and one ending before it starts, both inside the 9:00 and 10:00 slots
+EMPTY_INTERVALS = [
+    (START + timedelta(hours=9, minutes=30), START + timedelta(hours=9, minutes=30)),
+    (START + timedelta(hours=10, minutes=30), START + timedelta(hours=10)),
+]
+EVERY_MORNING_HOUR = [START + timedelta(hours=hour) for hour in range(6, 12)]
+
+def test_empty_intervals_block_nothing():
+    end_date = START + timedelta(hours=23)
+    assert FreeBusy(EMPTY_INTERVALS).is_free(START + timedelta(hours=9), START + timedelta(hours=10))
+    assert starts(find_free_slots(EMPTY_INTERVALS, START, end_date, 60, ["morning"])) == EVERY_MORNING_HOUR
+    assert starts(find_free_slots(summary_intervals(EMPTY_INTERVALS), START, end_date, 60,
+                                  ["morning"])) == EVERY_MORNING_HOUR
+
+def test_empty_intervals_block_nothing_in_bitmap_mode():
+    pytest.importorskip("numpy")
+    end_date = START + timedelta(hours=23)
+    assert starts(find_free_slots(EMPTY_INTERVALS, START, end_date, 60, ["morning"],
+                                  mode="bitmap")) == EVERY_MORNING_HOUR
+
+def brute_force_group_slots(busy_by_user, start_date, end_date, duration_minutes, preferred_times,
+                            min_available, step_minutes, limit):
+    """Every candidate start checked against every user's every interval, ranked like find_group_slots."""
+    duration, step = timedelta(minutes=duration_minutes), timedelta(minutes=step_minutes)
+    slots = []
+    day = start_date.date()
+    while day <= end_date.date():
+        midnight = datetime.combine(day, datetime.min.time(), tzinfo=start_date.tzinfo)
+        for time_preference in preferred_times:
+            start_hour, end_hour = TIME_OF_DAY_RANGES[time_preference]
+            slot_start = midnight + timedelta(hours=start_hour)
+            while slot_start < midnight + timedelta(hours=end_hour):
+                slot_end = slot_start + duration
+                if start_date <= slot_start and slot_end <= end_date:
+                    available = sum(
+                        not any(start < slot_end and end > slot_start and end > start for start, end in intervals)
+                        for intervals in busy_by_user.values()
+                    )
+                    if available >= min_available:
+                        slots.append({'start_time': slot_start, 'end_time': slot_end,
+                                      'time_preference': time_preference, 'available_count': available})
+                slot_start += step
+        day += timedelta(days=1)
+    slots.sort(key=lambda slot: (-slot['available_count'], slot['start_time']))
+    return slots[:limit]
+
+def random_group(rng, users, days):
+    busy = {}
+    for user_id in range(users):
+        intervals = random_calendar(rng, days, rng.choice([0, 0, 5, 20, 60]))
+        # Back-to-back events, which must merge without blocking the slot they touch
+        for _ in range(rng.randrange(3)):
+            start = START + timedelta(minutes=5 * rng.randrange(days * 24 * 12))
+            middle = start + timedelta(minutes=5 * rng.randrange(1, 12))
+            intervals += [(start, middle), (middle, middle + timedelta(minutes=5 * rng.randrange(1, 12)))]
+        rng.shuffle(intervals)
+        busy[user_id] = intervals
+    return busy
+
+@pytest.mark.parametrize("seed", range(40))
+def test_group_slots_match_brute_force(seed):
+    rng = random.Random(seed)
+    users = rng.randrange(1, 9)
+    busy = random_group(rng, users, 7)
+    start_date = START + timedelta(minutes=5 * rng.randrange(12 * 12))
+    end_date = START + timedelta(days=6, hours=rng.randrange(24))
+    duration = rng.choice([15, 30, 60, 90])
+    step = rng.choice([15, 30, 60])
+    min_available = rng.randrange(1, users + 1)
+    limit = rng.choice([5, 20, 1000])
+    times = rng.sample(TIMES, rng.randrange(1, 4))
+
+    expected = brute_force_group_slots(busy, start_date, end_date, duration, times, min_available, step, limit)
+    assert find_group_slots(busy, start_date, end_date, duration, times, min_available=min_available,
+                            step_minutes=step, limit=limit) == expected
+
+def test_group_slots_count_users_with_no_events_as_free():
+    busy = {1: [], 2: [(START + timedelta(hours=6), START + timedelta(hours=7))], 3: []}
+    slots = find_group_slots(busy, START, START + timedelta(hours=8), 60, ["morning"], min_available=1,
+                             step_minutes=60, limit=3)
+    assert [(slot['start_time'].hour, slot['available_count']) for slot in slots] == [(7, 3), (6, 2)]
+    # Everyone by default: only the slot after user 2's event
+    assert starts(find_group_slots(busy, START, START + timedelta(hours=8), 60, ["morning"],
+                                   step_minutes=60)) == [START + timedelta(hours=7)]
+
+def original_slots(intervals, start_date, end_date, duration_minutes, preferred_times):
+    """The per-event scan slot search started out as, kept to pin what changed since."""
+    available_slots = []
+    current_date = start_date.date()
+    while current_date <= end_date.date():
+        for time_preference in preferred_times:
+            start_hour, end_hour = TIME_OF_DAY_RANGES[time_preference]
+            for hour in range(start_hour, end_hour):
+                slot_start = datetime.combine(current_date, datetime.min.time().replace(hour=hour),
+                                              tzinfo=start_date.tzinfo or timezone.utc)
+                slot_end = slot_start + timedelta(minutes=duration_minutes)
+                if not any(slot_start < end and slot_end > start for start, end in intervals):
+                    available_slots.append({'start_time': slot_start, 'end_time': slot_end, 'date': current_date,
+                                            'time_preference': time_preference})
+        current_date += timedelta(days=1)
+    return available_slots
+
+@pytest.mark.parametrize("seed", range(20))
+def test_interval_mode_matches_the_original_search(seed):
+    rng = random.Random(seed)
+    intervals = random_calendar(rng, 14, rng.randrange(0, 150), block_minutes=1)
+    end_date = START + timedelta(days=13)
+    duration = rng.choice([25, 32, 60, 97])
+    assert find_free_slots(intervals, START, end_date, duration, TIMES) == original_slots(
+        intervals, START, end_date, duration, TIMES
+    )
+
+@pytest.mark.parametrize("seed", range(20))
+def test_summary_matches_the_original_search_for_whole_blocks(seed):
+    rng = random.Random(seed)
+    intervals = random_calendar(rng, 14, rng.randrange(0, 150), block_minutes=1)
+    end_date = START + timedelta(days=13)
+    for duration in (30, 45, 60):
+        assert find_free_slots(summary_intervals(intervals), START, end_date, duration, TIMES) == original_slots(
+            intervals, START, end_date, duration, TIMES
+        )
+    # Other durations can only lose slots to the rounding
+    summary = starts(find_free_slots(summary_intervals(intervals), START, end_date, 32, TIMES))
+    assert set(summary) <= set(starts(original_slots(intervals, START, end_date, 32, TIMES)))
+
+def test_known_differences_from_the_original_search():
+    end_date = START + timedelta(hours=23)
+    nine = START + timedelta(hours=9)
+    # A 57-minute 9:00 slot ends 1 minute before a 9:58 event, inside the event's first 5-minute block
+    next_event = [(nine + timedelta(minutes=58), nine + timedelta(minutes=90))]
+    assert nine in starts(original_slots(next_event, START, end_date, 57, ["morning"]))
+    assert nine in starts(find_free_slots(next_event, START, end_date, 57, ["morning"]))
+    assert nine not in starts(find_free_slots(summary_intervals(next_event), START, end_date, 57, ["morning"]))
+
+    # An instant event used to block the slot around it; no mode does now
+    instant = EMPTY_INTERVALS[:1]
+    assert nine not in starts(original_slots(instant, START, end_date, 60, ["morning"]))
+    assert nine in starts(find_free_slots(instant, START, end_date, 60, ["morning"]))
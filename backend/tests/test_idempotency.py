@@ -0,0 +1,88 @@
+import asyncio
+import json
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from api.idempotency import idempotent
+from database import crud
+
+SCOPE = "POST /calendar/events"
+
+def make_request(body: dict) -> Request:
+    encoded = json.dumps(body).encode()
+
+    async def receive():
+        return {"type": "http.request", "body": encoded, "more_body": False}
+
+    return Request({"type": "http", "method": "POST", "path": "/calendar/events",
+                    "query_string": b"user_id=1", "headers": []}, receive)
+
+def run_idempotent(db, user, body, key, work):
+    return asyncio.run(idempotent(make_request(body), db, user.id, key, work, dict, status_code=201))
+
+def counting_work(calls):
+    async def work():
+        calls.append(1)
+        return {"created": len(calls)}
+    return work
+
+def test_first_request_runs_and_retries_replay(db, user):
+    calls = []
+    first = run_idempotent(db, user, {"title": "Run"}, "k1", counting_work(calls))
+    retry = run_idempotent(db, user, {"title": "Run"}, "k1", counting_work(calls))
+
+    assert len(calls) == 1
+    assert first.status_code == retry.status_code == 201
+    assert retry.body == first.body
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+
+def test_reused_key_with_different_body_is_rejected(db, user):
+    run_idempotent(db, user, {"title": "Run"}, "k1", counting_work([]))
+    with pytest.raises(HTTPException) as error:
+        run_idempotent(db, user, {"title": "Swim"}, "k1", counting_work([]))
+    assert error.value.status_code == 422
+
+def test_failed_request_releases_key(db, user):
+    async def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        run_idempotent(db, user, {"title": "Run"}, "k1", fail)
+    calls = []
+    run_idempotent(db, user, {"title": "Run"}, "k1", counting_work(calls))
+    assert len(calls) == 1
+
+def test_without_key_work_always_runs(db, user):
+    calls = []
+    run_idempotent(db, user, {"title": "Run"}, None, counting_work(calls))
+    run_idempotent(db, user, {"title": "Run"}, None, counting_work(calls))
+    assert len(calls) == 2
+
+def claim(db, user, token, lease_seconds=60):
+    # Each request has its own session; forget the rows the previous one loaded
+    db.expunge_all()
+    return crud.claim_idempotency_key(db, user.id, SCOPE, "k1", "hash", token, lease_seconds)
+
+def test_claim_is_held_until_completed(db, user):
+    assert claim(db, user, "owner") is None
+
+    held = claim(db, user, "other")
+    assert held.status_code is None
+    assert held.claim_token == "owner"
+
+    crud.complete_idempotency_key(db, user.id, SCOPE, "k1", "owner", 201, '{"id": 1}', 60)
+    done = claim(db, user, "other")
+    assert (done.status_code, done.response_body) == (201, '{"id": 1}')
+
+def test_lapsed_claim_cannot_touch_the_retry_that_replaced_it(db, user):
+    # The original's lease lapses while it is still running and a retry takes the key
+    assert claim(db, user, "original", lease_seconds=0) is None
+    assert claim(db, user, "retry") is None
+
+    crud.complete_idempotency_key(db, user.id, SCOPE, "k1", "original", 201, '{"id": 1}', 60)
+    crud.release_idempotency_key(db, user.id, SCOPE, "k1", "original")
+
+    record = crud.get_idempotency_key(db, user.id, SCOPE, "k1")
+    assert record.claim_token == "retry"
+    assert record.status_code is None
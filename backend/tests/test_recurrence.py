@@ -0,0 +1,149 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+import pytest
+from api.export_router import _ndjson_events
+from database import crud, schemas
+from database.recurrence import RecurrenceRule
+
+def reference_occurrences(rule: RecurrenceRule, dtstart: datetime, horizon: datetime):
+    """Walk every day from the series start and keep the ones the rule selects."""
+    days = rule.byday or (dtstart.weekday(),)
+    first_monday = (dtstart - timedelta(days=dtstart.weekday())).date()
+    starts = []
+    day = dtstart
+    while day < horizon:
+        if rule.freq == "DAILY":
+            selected = (day - dtstart).days % rule.interval == 0
+        else:
+            week = (day.date() - first_monday).days // 7
+            selected = week % rule.interval == 0 and day.weekday() in days
+        if selected:
+            if rule.until is not None and day > rule.until:
+                break
+            starts.append(day)
+            if rule.count is not None and len(starts) == rule.count:
+                break
+        day += timedelta(days=1)
+    return list(enumerate(starts))
+
+def random_rule(rng: random.Random, dtstart: datetime) -> RecurrenceRule:
+    freq = rng.choice(["DAILY", "WEEKLY"])
+    byday = ()
+    if freq == "WEEKLY" and rng.random() < 0.8:
+        byday = tuple({dtstart.weekday()} | set(rng.sample(range(7), rng.randrange(0, 4))))
+    end = rng.choice(["none", "count", "until"])
+    return RecurrenceRule(
+        freq,
+        interval=rng.randrange(1, 4),
+        byday=byday,
+        count=rng.randrange(1, 40) if end == "count" else None,
+        until=dtstart + timedelta(days=rng.randrange(0, 200), hours=rng.randrange(0, 24)) if end == "until" else None
+    )
+
+@pytest.mark.parametrize("seed", range(200))
+def test_occurrences_match_day_by_day_reference(seed):
+    rng = random.Random(seed)
+    dtstart = datetime(2025, 1, 1, 7, 30, tzinfo=timezone.utc) + timedelta(days=rng.randrange(0, 14))
+    rule = random_rule(rng, dtstart)
+    horizon = dtstart + timedelta(days=300)
+    expected = reference_occurrences(rule, dtstart, horizon)
+
+    assert list(rule.occurrences(dtstart, before=horizon)) == expected
+
+    # A window later in the series keeps the indexes counted from its start
+    after = dtstart + timedelta(days=rng.randrange(0, 150), hours=rng.randrange(0, 24))
+    before = after + timedelta(days=rng.randrange(1, 60))
+    assert list(rule.occurrences(dtstart, after=after, before=before)) == [
+        (index, start) for index, start in expected if after <= start < before
+    ]
+
+    if rule.count is not None or rule.until is not None:
+        # Long enough for 40 weekly occurrences three weeks apart
+        every = reference_occurrences(rule, dtstart, dtstart + timedelta(days=1000))
+        assert rule.last_start(dtstart) == every[-1][1]
+    else:
+        assert rule.last_start(dtstart) is None
+
+@pytest.mark.parametrize("text", [
+    "FREQ=DAILY",
+    "FREQ=DAILY;INTERVAL=3;COUNT=10",
+    "FREQ=WEEKLY;BYDAY=MO,WE,FR",
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,SA;UNTIL=20250601T000000Z",
+])
+def test_parse_round_trips(text):
+    assert str(RecurrenceRule.parse(text)) == text
+    assert str(RecurrenceRule.parse("RRULE:" + text.lower())) == text
+
+def test_date_until_includes_the_whole_day():
+    rule = RecurrenceRule.parse("FREQ=DAILY;UNTIL=20250105")
+    dtstart = datetime(2025, 1, 1, 18, tzinfo=timezone.utc)
+    assert rule.last_start(dtstart) == datetime(2025, 1, 5, 18, tzinfo=timezone.utc)
+
+@pytest.mark.parametrize("text", [
+    "INTERVAL=2",
+    "FREQ=MONTHLY",
+    "FREQ=DAILY;BYDAY=MO",
+    "FREQ=DAILY;COUNT=3;UNTIL=20250101T000000Z",
+    "FREQ=DAILY;COUNT=0",
+    "FREQ=WEEKLY;BYDAY=XX",
+    "FREQ=WEEKLY;BYMONTH=1",
+    "FREQ",
+])
+def test_invalid_rules_are_rejected(text):
+    with pytest.raises(ValueError):
+        RecurrenceRule.parse(text)
+
+def test_check_start():
+    monday = datetime(2025, 1, 6, 7, tzinfo=timezone.utc)
+    RecurrenceRule.parse("FREQ=WEEKLY;BYDAY=MO,TH").check_start(monday)
+    with pytest.raises(ValueError):
+        RecurrenceRule.parse("FREQ=WEEKLY;BYDAY=TU,TH").check_start(monday)
+    with pytest.raises(ValueError):
+        RecurrenceRule.parse("FREQ=DAILY;UNTIL=20250101T000000Z").check_start(monday)
+
+def test_series_window_reads_apply_cancelled_and_edited_occurrences(db, user):
+    monday = datetime(2025, 1, 6, 7, tzinfo=timezone.utc)
+    series = crud.create_event_series(db, schemas.EventSeriesCreate(
+        title="Ride", start_time=monday, duration_minutes=60, rrule="FREQ=WEEKLY;BYDAY=MO,TH;COUNT=6"
+    ), user.id)
+    thursday = monday + timedelta(days=3)
+    next_monday = monday + timedelta(days=7)
+
+    assert crud.delete_series_occurrence(db, series.id, thursday)
+    moved = next_monday + timedelta(hours=2)
+    crud.update_series_occurrence(db, series.id, next_monday,
+                                  schemas.EventUpdate(start_time=moved, end_time=moved + timedelta(hours=1)))
+
+    events = crud.get_user_events_by_date(db, user.id, monday, monday + timedelta(days=28))
+    assert sorted((event.start_time, event.id is None) for event in events) == [
+        (monday, True),
+        (moved, False),  # the edited occurrence is a stored override
+        (monday + timedelta(days=10), True),
+        (monday + timedelta(days=14), True),
+        (monday + timedelta(days=17), True),
+    ]
+    assert all(event.series_id == series.id for event in events)
+
+def test_paging_lists_stored_events_and_the_export_keeps_series(db, user):
+    monday = datetime(2025, 1, 6, 7, tzinfo=timezone.utc)
+    series = crud.create_event_series(db, schemas.EventSeriesCreate(
+        title="Ride", start_time=monday, duration_minutes=60, rrule="FREQ=WEEKLY;BYDAY=MO"
+    ), user.id)
+    crud.create_event(db, schemas.EventCreate(title="Dentist", start_time=monday + timedelta(hours=3),
+                                              end_time=monday + timedelta(hours=4)), user.id)
+    cancelled = monday + timedelta(days=7)
+    edited = monday + timedelta(days=14)
+    crud.delete_series_occurrence(db, series.id, cancelled)
+    crud.update_series_occurrence(db, series.id, edited, schemas.EventUpdate(title="Long ride"))
+
+    # The series never ends, so pages hold the stored rows only
+    page = crud.get_user_events_page(db, user.id)
+    assert [(event.title, event.series_id) for event in page.items] == [("Dentist", None), ("Long ride", series.id)]
+    assert page.next_cursor is None
+
+    lines = [json.loads(line) for chunk in _ndjson_events(user.id) for line in chunk.splitlines()]
+    assert [line["title"] for line in lines] == ["Dentist", "Long ride", "Ride"]
+    exported = schemas.EventSeriesExport.model_validate(lines[-1])
+    assert (exported.id, exported.rrule) == (series.id, "FREQ=WEEKLY;BYDAY=MO")
+    assert exported.exceptions == [cancelled, edited]
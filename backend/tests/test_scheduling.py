@@ -0,0 +1,78 @@
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import combinations
+import pytest
+from database.scheduling import DAYS_PER_WEEK, select_weekly_slots, spread_days
+
+def gaps(chosen, previous=None, cyclic=False):
+    result = [later - earlier for earlier, later in zip(chosen, chosen[1:])]
+    if previous is not None:
+        result.append(chosen[0] - previous)
+    if cyclic:
+        result.append(chosen[0] + DAYS_PER_WEEK - chosen[-1])
+    return result
+
+def slot(day: datetime, hour: int) -> dict:
+    start = day.replace(hour=hour)
+    return {"start_time": start, "end_time": start + timedelta(hours=1)}
+
+def test_spread_days_small_cases():
+    assert spread_days([0, 1, 2], 0) == ()
+    assert spread_days([1, 4], 3) == (1, 4)
+    assert spread_days(range(7), 3) == (0, 2, 4)
+    assert spread_days(range(7), 2, cyclic=True) == (0, 3)
+    # Three sessions a week keep a rest day between them when the week allows
+    assert min(gaps(spread_days([0, 1, 2, 3, 4], 3))) == 2
+
+def test_spread_days_rests_after_the_previous_week():
+    # Last session on the Sunday before (day -1): Monday would be back to back
+    assert spread_days(range(7), 2, previous=-1)[0] >= 1
+    assert spread_days(range(7), 3, previous=-1) == (1, 3, 5)
+
+@pytest.mark.parametrize("seed", range(100))
+def test_spread_days_gets_the_best_smallest_gap(seed):
+    rng = random.Random(seed)
+    days = sorted(rng.sample(range(7), rng.randrange(1, 8)))
+    count = rng.randrange(1, 8)
+    previous = rng.choice([None, -1, -2, -3])
+    cyclic = previous is None and rng.random() < 0.5
+
+    chosen = spread_days(days, count, previous, cyclic=cyclic)
+    assert list(chosen) == sorted(set(chosen)) and set(chosen) <= set(days)
+    assert len(chosen) == min(count, len(days))
+    if count < len(days):
+        cap = int(DAYS_PER_WEEK / count)
+        best = max(min(min(gaps(option, previous, cyclic), default=0), cap) for option in combinations(days, count))
+        assert min(min(gaps(chosen, previous, cyclic), default=0), cap) == best
+
+def test_select_weekly_slots_groups_by_iso_week():
+    # Monday 30 December 2024 is in ISO week 1 of 2025, together with 1-5 January
+    first = datetime(2024, 12, 23, tzinfo=timezone.utc)
+    slots = [slot(first + timedelta(days=offset), hour) for offset in range(21) for hour in (7, 9)]
+
+    selected = select_weekly_slots(slots, 2)
+    weeks = {}
+    for chosen in selected:
+        weeks.setdefault(chosen["start_time"].isocalendar()[:2], []).append(chosen["start_time"])
+    assert sorted(weeks) == [(2024, 52), (2025, 1), (2025, 2)]
+    assert all(len(starts) == 2 for starts in weeks.values())
+    # One session a day, at that day's first free slot
+    assert all(chosen["start_time"].hour == 7 for chosen in selected)
+    assert len({chosen["start_time"].date() for chosen in selected}) == len(selected)
+
+def test_select_weekly_slots_rests_across_the_week_boundary():
+    monday = datetime(2025, 1, 6, tzinfo=timezone.utc)
+    # Week one is free only on Sunday; week two on every day
+    slots = [slot(monday + timedelta(days=6), 7)] + [slot(monday + timedelta(days=7 + offset), 7) for offset in range(7)]
+
+    selected = [chosen["start_time"] for chosen in select_weekly_slots(slots, 2)]
+    assert selected[0] == monday + timedelta(days=6, hours=7)
+    assert (selected[1].date() - selected[0].date()).days >= 2
+    assert len(selected) == 3
+
+def test_select_weekly_slots_caps_sessions_per_week():
+    monday = datetime(2025, 1, 6, tzinfo=timezone.utc)
+    slots = [slot(monday + timedelta(days=offset), 7) for offset in range(28)]
+    selected = select_weekly_slots(slots, 3)
+    assert len(selected) == 12
+    assert select_weekly_slots(slots, 7) == slots
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import insert
+from database import crud, models, schemas
+
+MONDAY = datetime(2025, 1, 6, tzinfo=timezone.utc)
+
+def plan_request(**overrides) -> schemas.PlanGenerationRequest:
+    values = dict(
+        start_date=MONDAY, end_date=MONDAY + timedelta(hours=23), frequency=1, time_of_day="morning",
+        duration=60, prep_time=0, cooldown_time=0, workout_types=["running"], difficulty_level="easy",
+        days_of_week=["monday"]
+    )
+    return schemas.PlanGenerationRequest(**{**values, **overrides})
+
+def write_from_another_worker(db, user_id: int, start: datetime, end: datetime):
+    # Committed like crud does, but without invalidating this process's caches
+    db.execute(insert(models.Event), [dict(title="Meeting", user_id=user_id, start_time=start, end_time=end)])
+    crud._refresh_busy_days(db, user_id, [(start, end)])
+    db.commit()
+
+@pytest.mark.parametrize("mode", ["summary", "interval", "bitmap"])
+def test_creating_a_plan_reads_busy_time_written_since_a_preview(db, user, monkeypatch, mode):
+    if mode == "bitmap":
+        pytest.importorskip("numpy")
+    monkeypatch.setattr(crud, "PLAN_SLOT_SEARCH_MODE", mode)
+    preview = crud.preview_training_plan(db, user.id, plan_request())
+    assert [event.start_time for event in preview.events] == [MONDAY + timedelta(hours=6)]
+
+    write_from_another_worker(db, user.id, MONDAY + timedelta(hours=6), MONDAY + timedelta(hours=7))
+
+    response = crud.create_training_plan_with_events(db, user.id, plan_request())
+    assert [event.start_time for event in response.events] == [MONDAY + timedelta(hours=7)]
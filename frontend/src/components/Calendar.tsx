@@ -1,11 +1,11 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { format, startOfWeek, addDays, startOfDay, addHours, parseISO } from 'date-fns';
-import type { CalendarEvent, EventCreate, EventUpdate } from '../data/schemas.tsx';
+import type { CalendarChange, CalendarEvent, EventCreate, EventUpdate } from '../data/schemas.tsx';
 import { ENDPOINTS, buildApiUrl } from '../config/api';
 import { useCalendar } from '../context/CalendarContext';
 
 export default function Calendar() {
-  const { currentDate, setCurrentDate, weekStart, refreshTrigger } = useCalendar();
+  const { currentDate, setCurrentDate, weekStart } = useCalendar();
   const [events, setEvents] = useState<CalendarEvent[]>([]);
   const [isLoading, setIsLoading] = useState<boolean>(false);
   const [error, setError] = useState<string | null>(null);
@@ -141,7 +141,7 @@ export default function Calendar() {
           
           return (
             <div 
-              key={`${event.id}-${event.title}`}
+              key={`${event.id ?? `${event.series_id}-${event.recurrence_id}`}-${event.title}`}
               className={`absolute rounded p-1 text-xs text-paper cursor-pointer overflow-hidden z-10 ${getEventColor()}`}
               style={{
                 ...getEventStyle(event),
@@ -204,6 +204,22 @@ export default function Calendar() {
     }
   }, [currentDate]);
 
+  // Merge a change pushed by the server into the events of the week on screen
+  const applyChange = useCallback((change: CalendarChange) => {
+    const startDay = startOfWeek(currentDate);
+    const endDay = addDays(startDay, 7);
+    const touched = new Set<number | null>([...change.deleted, ...change.upserted.map(event => event.id)]);
+    touched.delete(null);
+    const inWeek = change.upserted.filter(event =>
+      parseISO(event.start_time) >= startDay && parseISO(event.end_time) <= endDay
+    );
+    setEvents(prev => [...prev.filter(event => !touched.has(event.id)), ...inWeek]);
+  }, [currentDate]);
+
+  // Latest handlers for the change stream, so switching weeks does not reopen it
+  const streamHandlers = useRef({ applyChange, refetch: fetchEventsByDateRange });
+  streamHandlers.current = { applyChange, refetch: fetchEventsByDateRange };
+
   const createEvent = async (eventData: EventCreate) => {
     try {
       setIsLoading(true);
@@ -226,9 +242,8 @@ export default function Calendar() {
       }
       
       const newEvent = await response.json();
-      // Instead of just adding to local state, refresh all events from API
-      // This ensures consistency between manual and generated events
-      await fetchEventsByDateRange();
+      // The change stream delivers it as well; applying it now avoids waiting for that
+      applyChange({ user_id: userId, upserted: [newEvent], deleted: [], reset: false });
       return newEvent;
     } catch (err) {
       setError('Error creating event: ' + (err instanceof Error ? err.message : String(err)));
@@ -317,12 +332,51 @@ export default function Calendar() {
     }
   };
 
+  // Occurrences of a recurring series have no id; they are edited through the series
+  const occurrenceUrl = (event: CalendarEvent) =>
+    buildApiUrl(`${ENDPOINTS.SERIES}/${event.series_id}/occurrences/${encodeURIComponent(event.recurrence_id ?? '')}`, userId);
+
+  const changeOccurrence = async (event: CalendarEvent, eventData?: EventUpdate) => {
+    try {
+      setIsLoading(true);
+      setError(null);
+      
+      const url = eventData && event.event_type
+        ? `${occurrenceUrl(event)}&event_type=${encodeURIComponent(event.event_type)}`
+        : occurrenceUrl(event);
+      const response = await fetch(url, {
+        method: eventData ? 'PUT' : 'DELETE',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: eventData ? JSON.stringify({ ...eventData }) : undefined,
+      });
+      
+      if (!response.ok) {
+        const errorText = await response.text();
+        throw new Error(`Failed to change occurrence: ${response.status} ${errorText}`);
+      }
+      
+      // The whole occurrence (e.g. prep, workout and cooldown) changes, so reload the week
+      await fetchEventsByDateRange();
+      return true;
+    } catch (err) {
+      setError('Error changing occurrence: ' + (err instanceof Error ? err.message : String(err)));
+      console.error('Error changing occurrence:', err);
+      return false;
+    } finally {
+      setIsLoading(false);
+    }
+  };
+
   const handleCreateEvent = async () => {
     if (newEvent.title.trim() === '') return;
     
     if (selectedEvent) {
       console.log('Updating event with ID:', selectedEvent.id);
-      const success = await updateEvent(selectedEvent.id, newEvent);
+      const success = selectedEvent.id === null
+        ? await changeOccurrence(selectedEvent, newEvent)
+        : await updateEvent(selectedEvent.id, newEvent);
       if (success) {
         setShowEventModal(false);
         setSelectedEvent(null);
@@ -340,17 +394,41 @@ export default function Calendar() {
     if (!selectedEvent) return;
     
     console.log('Deleting event with ID:', selectedEvent.id); // Debug log
-    const success = await deleteEvent(selectedEvent.id);
+    const success = selectedEvent.id === null
+      ? await changeOccurrence(selectedEvent)
+      : await deleteEvent(selectedEvent.id);
     if (success) {
       setShowEventModal(false);
       setSelectedEvent(null);
     }
   };
 
-  // Fetch events when component mounts, currentDate changes, or refresh is triggered
+  // Fetch events when component mounts or currentDate changes
   useEffect(() => {
     fetchEventsByDateRange();
-  }, [currentDate, fetchEventsByDateRange, refreshTrigger]);
+  }, [currentDate, fetchEventsByDateRange]);
+
+  // Apply changes from any tab or device (including generated plans) as the server pushes them
+  useEffect(() => {
+    const source = new EventSource(buildApiUrl(ENDPOINTS.CHANGES, userId));
+    let connected = false;
+    source.onopen = () => {
+      // Changes made while the stream was down are not replayed
+      if (connected) {
+        streamHandlers.current.refetch();
+      }
+      connected = true;
+    };
+    source.addEventListener('change', (message: MessageEvent) => {
+      const change: CalendarChange = JSON.parse(message.data);
+      if (change.reset) {
+        streamHandlers.current.refetch();
+      } else {
+        streamHandlers.current.applyChange(change);
+      }
+    });
+    return () => source.close();
+  }, [userId]);
 
   return (
     <div className="bg-paper border-2 border-gray-800 mx-4 mt-4 p-4">
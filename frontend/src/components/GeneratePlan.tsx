@@ -13,10 +13,11 @@ interface PlanGenerationRequest {
   workout_types: string[];
   difficulty_level: string;
   days_of_week: string[];
+  recurring: boolean;
 }
 
 export default function GeneratePlan() {
-  const { weekStart, weekEnd, triggerRefresh } = useCalendar();
+  const { weekStart, weekEnd } = useCalendar();
   const [preferences, setPreferences] = useState<PlanGenerationRequest>({
     start_date: weekStart.toISOString(),
     end_date: weekEnd.toISOString(),
@@ -27,7 +28,8 @@ export default function GeneratePlan() {
     cooldown_time: 15,
     workout_types: ['cycling'],
     difficulty_level: 'moderate',
-    days_of_week: []
+    days_of_week: [],
+    recurring: false
   });
 
   // Update preferences when week dates change
@@ -100,8 +102,7 @@ export default function GeneratePlan() {
       // Temporary debug: Log what was created
       console.log('🏋️ TrainingPlan: Generated events count:', result.events?.length || 0);
       
-      // Refresh the calendar to show new events using context
-      triggerRefresh();
+      // The calendar picks up the new events from its change stream
       
     } catch (err) {
       setError('Error generating plan: ' + (err instanceof Error ? err.message : String(err)));
@@ -243,6 +244,19 @@ export default function GeneratePlan() {
         </div>
       </div>
 
+      {/* Recurring */}
+      <div className="mb-6">
+        <label className="flex items-center">
+          <input
+            type="checkbox"
+            className="mr-2"
+            checked={preferences.recurring}
+            onChange={(e) => setPreferences(prev => ({ ...prev, recurring: e.target.checked }))}
+          />
+          <span className="text-sm">Same time every session (saved as a recurring series)</span>
+        </label>
+      </div>
+
       {/* Status Messages */}
       {message && (
         <div className="mb-4 p-3 bg-green-100 border border-green-400 text-green-700 rounded">
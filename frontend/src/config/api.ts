@@ -3,6 +3,8 @@ export const API_BASE_URL = 'http://127.0.0.1:8000';
 
 export const ENDPOINTS = {
   EVENTS: '/calendar/events',
+  CHANGES: '/calendar/changes',
+  SERIES: '/calendar/series',
 };
 
 export const buildApiUrl = (endpoint: string, userId: number): string => {
@@ -1,7 +1,7 @@
 
 // Types for our calendar events matching the backend schemas
 interface CalendarEvent {
-    id: number;
+    id: number | null; // null for occurrences generated from a recurring series
     title: string;
     start_time: string; // ISO string from backend
     end_time: string; // ISO string from backend
@@ -11,6 +11,8 @@ interface CalendarEvent {
     workout_type?: string;
     difficulty_level?: string;
     training_plan_id?: number;
+    series_id?: number | null;
+    recurrence_id?: string | null; // original start of the series occurrence
     created_at: string;
     updated_at?: string;
   }
@@ -38,5 +40,13 @@ interface EventUpdate {
     difficulty_level?: string;
 }
 
-export type { CalendarEvent, EventCreate, EventUpdate };
+// A change to the user's events pushed by the server's change stream
+interface CalendarChange {
+    user_id: number;
+    upserted: CalendarEvent[]; // created or updated
+    deleted: number[];
+    reset: boolean; // too much changed to describe; refetch instead
+}
+
+export type { CalendarChange, CalendarEvent, EventCreate, EventUpdate };
   
\ No newline at end of file